@@ -0,0 +1,196 @@
+"""
+FetchEngine 与 demo_async.web_crawler 的对比基准测试
+
+在独立进程中启动一个本地 aiohttp 测试服务器，监听 127.0.0.1 ~ 127.0.0.N 的同一端口（N 个"主机"），
+每个响应模拟 --latency 秒的延迟，返回 --body-kb KB 的响应体；--error-rate 比例的 URL
+第一次请求返回 503，用来检验重试。每种抓取方式在新的子进程中运行，记录:
+    - 请求/秒（按 URL 数计）、成功数、重试次数
+    - 峰值内存（子进程的 ru_maxrss）
+    - 服务器观察到的最大并发连接数（全局和单个主机）
+
+用法:
+    python bench_fetch_engine.py
+    python bench_fetch_engine.py --urls 10000 --hosts 4 --latency 0.01 --body-kb 20 --concurrency 100 --per-host 25
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import zlib
+from collections import Counter
+
+from aiohttp import web
+
+DEMO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_server(hosts, port, latency, body_kb, error_rate, ready_path):
+    """测试服务器：/page/<n> 返回约 body_kb KB 的页面，/stats 返回观察到的最大并发数"""
+    body = (b"<p>" + "测试页面正文".encode("utf-8") * 60 + b"</p>\n") * max(1, body_kb * 1024 // 1100)
+    active = Counter()
+    peak = Counter()
+    failed_once = set()
+
+    async def page(request):
+        host = request.host.split(":")[0]
+        active["*"] += 1
+        active[host] += 1
+        peak["*"] = max(peak["*"], active["*"])
+        peak[host] = max(peak[host], active[host])
+        try:
+            if latency:
+                await asyncio.sleep(latency)
+            path = request.path
+            # 按路径的哈希决定哪些 URL 第一次请求失败，每次运行都相同
+            if path not in failed_once and zlib.crc32(path.encode()) % 10000 < error_rate * 10000:
+                failed_once.add(path)
+                return web.Response(status=503, headers={"Retry-After": "0"})
+            return web.Response(body=body, content_type="text/html")
+        finally:
+            active["*"] -= 1
+            active[host] -= 1
+
+    async def stats(request):
+        result = {"peak": peak["*"], "peak_per_host": max((v for k, v in peak.items() if k != "*"), default=0)}
+        peak.clear()
+        failed_once.clear()
+        return web.json_response(result)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/page/{n}", page)
+        app.router.add_get("/stats", stats)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        for i in range(1, hosts + 1):
+            await web.TCPSite(runner, f"127.0.0.{i}", port, backlog=4096).start()
+        with open(ready_path, "w") as f:
+            f.write("ready")
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def make_urls(count, hosts, port):
+    return [f"http://127.0.0.{i % hosts + 1}:{port}/page/{i}" for i in range(count)]
+
+
+async def run_web_crawler(urls, args):
+    """demo_async.py 中的 web_crawler：一次 gather 所有请求，所有响应体保存在字典中"""
+    sys.path.insert(0, DEMO_DIR)
+    from demo_async import web_crawler
+
+    results = await web_crawler(urls)
+    ok = sum(1 for value in results.values() if isinstance(value, str))
+    return {"ok": ok, "retries": 0}
+
+
+async def run_fetch_engine(urls, args):
+    sys.path.insert(0, DEMO_DIR)
+    from fetch_engine import FetchEngine
+
+    ok = 0
+    async with FetchEngine(
+        concurrency=args.concurrency, per_host=args.per_host, timeout=30, retries=3, backoff=0.05
+    ) as engine:
+        async for result in engine.stream(urls):
+            ok += result.ok
+    return {"ok": ok, "retries": engine.stats["retries"]}
+
+
+def run_client(mode, urls_count, hosts, port, args):
+    """在当前进程中运行一种抓取方式，返回结果字典"""
+    import aiohttp
+
+    urls = make_urls(urls_count, hosts, port)
+    runner = run_fetch_engine if mode == "engine" else run_web_crawler
+
+    async def main():
+        start = time.perf_counter()
+        result = await runner(urls, args)
+        elapsed = time.perf_counter() - start
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/stats") as response:
+                server = await response.json()
+        return {
+            **result,
+            "seconds": round(elapsed, 2),
+            "requests_per_second": round(urls_count / elapsed),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "server_peak_connections": server["peak"],
+            "server_peak_per_host": server["peak_per_host"],
+        }
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FetchEngine 基准测试")
+    parser.add_argument("--urls", type=int, default=10000)
+    parser.add_argument("--hosts", type=int, default=4, help="测试服务器监听的主机数（127.0.0.1 ~ 127.0.0.N）")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=0.01, help="服务器每个响应的延迟（秒）")
+    parser.add_argument("--body-kb", type=int, default=20, help="每个响应体的大小（KB）")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="第一次请求返回 503 的 URL 比例")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--per-host", type=int, default=25)
+    parser.add_argument("--modes", default="web_crawler,engine", help="逗号分隔: web_crawler、engine")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--server", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--client", help=argparse.SUPPRESS)
+    parser.add_argument("--ready", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.server:
+        run_server(args.hosts, args.port, args.latency, args.body_kb, args.error_rate, args.ready)
+        return
+    if args.client:
+        print(json.dumps(run_client(args.client, args.urls, args.hosts, args.port, args)))
+        return
+
+    ready = f"/tmp/bench_fetch_engine_{os.getpid()}.ready"
+    common = [
+        "--urls", str(args.urls), "--hosts", str(args.hosts), "--port", str(args.port),
+        "--latency", str(args.latency), "--body-kb", str(args.body_kb), "--error-rate", str(args.error_rate),
+        "--concurrency", str(args.concurrency), "--per-host", str(args.per_host),
+    ]
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--server", "--ready", ready, *common])
+    results = {}
+    try:
+        while not os.path.exists(ready):
+            if server.poll() is not None:
+                sys.exit("测试服务器启动失败")
+            time.sleep(0.05)
+        print(
+            f"{args.urls:,} 个 URL，{args.hosts} 个主机，响应 {args.body_kb} KB、延迟 {args.latency * 1000:.0f} ms，"
+            f"{args.error_rate:.0%} 第一次返回 503；FetchEngine 并发 {args.concurrency}，每主机 {args.per_host}"
+        )
+        for mode in args.modes.split(","):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--client", mode, *common],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+    finally:
+        server.terminate()
+        if os.path.exists(ready):
+            os.remove(ready)
+
+    print(f"\n{'':<14}{'成功':>8}{'重试':>6}{'耗时(秒)':>10}{'请求/秒':>10}{'峰值内存(MB)':>14}{'服务器最大并发':>16}{'单主机最大并发':>16}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<14}{r['ok']:>8}{r['retries']:>6}{r['seconds']:>10.2f}{r['requests_per_second']:>10,}"
+            f"{r['peak_rss_mb']:>14.1f}{r['server_peak_connections']:>16}{r['server_peak_per_host']:>16}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
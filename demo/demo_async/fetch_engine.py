@@ -0,0 +1,238 @@
+"""
+有并发上限的流式抓取引擎
+
+demo_async.py 中的 web_crawler 用一个 asyncio.gather 同时启动所有 URL 的请求，
+没有全局和每个主机的并发上限，所有响应体都保存在字典里直到最后一个请求完成，
+URL 多时内存随 URL 数线性增长，还可能压垮目标站点。FetchEngine 在此基础上:
+
+1. 所有请求共用一个 aiohttp 连接器，保持长连接（keep-alive）并缓存 DNS 结果
+2. 全局并发数和每个主机的并发数都有上限（信号量）
+3. 连接、读取和总耗时都有超时；连接错误、超时和 429/5xx 响应按指数退避重试，遵守 Retry-After
+4. stream() 是异步生成器，按完成顺序逐个返回结果；URL 也是逐个从可迭代对象中取出，
+   只缓冲有限个，内存占用与 URL 总数无关
+
+用法:
+    async with FetchEngine(concurrency=100, per_host=8) as engine:
+        async for result in engine.stream(urls):
+            if result.ok:
+                handle(result.url, result.body)
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# stream() 中表示 URL 迭代器已取完，不能用 None（None 本身可能是迭代器产出的值）
+_END = object()
+
+
+@dataclass(slots=True)
+class FetchResult:
+    """一个 URL 的抓取结果"""
+    url: str
+    status: Optional[int] = None   # HTTP 状态码，请求失败时为 None
+    body: Optional[bytes] = None   # 响应体
+    error: Optional[str] = None    # 最后一次失败的原因
+    attempts: int = 0              # 请求次数（含重试）
+    elapsed: float = 0.0           # 从第一次请求到完成的秒数（含退避等待）
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+
+class FetchEngine:
+    """有并发上限、超时和重试的 aiohttp 抓取引擎
+
+    Args:
+        concurrency: 全局同时进行的请求数
+        per_host: 每个主机（host:port）同时进行的请求数
+        timeout: 单次请求的总超时（秒）
+        connect_timeout: 建立连接的超时（秒）
+        retries: 失败后最多重试的次数
+        backoff: 第一次重试前的等待秒数，之后每次翻倍（加随机抖动），不超过 max_backoff
+        max_backoff: 最长的退避等待秒数
+        retry_statuses: 需要重试的 HTTP 状态码
+        keepalive_timeout: 空闲长连接保留的秒数
+        max_buffered: stream() 预先从 URL 迭代器中取出、等待开始的 URL 数
+        max_lookahead: 全局还有空闲名额、而等待中的 URL 都属于已满的主机时，继续往后读取
+            找其他主机的 URL，等待中的 URL 数最多到这个值，默认为 max_buffered 的 10 倍
+        headers: 每个请求都带上的请求头
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        concurrency: int = 100,
+        per_host: int = 8,
+        timeout: float = 30.0,
+        connect_timeout: float = 10.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        retry_statuses: Iterable[int] = RETRY_STATUSES,
+        keepalive_timeout: float = 30.0,
+        max_buffered: Optional[int] = None,
+        max_lookahead: Optional[int] = None,
+        headers: Optional[dict] = None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, min(per_host, self.concurrency))
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.keepalive_timeout = keepalive_timeout
+        self.max_buffered = max_buffered or self.concurrency * 10
+        self.max_lookahead = max(self.max_buffered, max_lookahead or self.max_buffered * 10)
+        self.headers = headers
+        self.session = None
+        self.global_semaphore = asyncio.Semaphore(self.concurrency)
+        self.host_semaphores = {}
+        # requests、retries、failures、bytes 等计数
+        self.stats = Counter()
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, headers=self.headers)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc
+
+    def _host_semaphore(self, host):
+        semaphore = self.host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.host_semaphores[host] = asyncio.Semaphore(self.per_host)
+        return semaphore
+
+    def _retry_delay(self, attempt, retry_after=None):
+        """第 attempt 次重试前等待的秒数：指数退避加随机抖动，服务器给出 Retry-After 时取较大者"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_backoff))
+        return delay
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    async def fetch(self, url: str) -> FetchResult:
+        """抓取一个 URL，失败时按退避重试，不抛出异常，错误记录在结果的 error 中
+
+        每次请求都先取得全局和该主机的信号量，退避等待期间不占用名额。
+        """
+        result = FetchResult(url)
+        host_semaphore = self._host_semaphore(self.host_of(url))
+        started = time.perf_counter()
+        while True:
+            result.attempts += 1
+            retry_after = None
+            async with self.global_semaphore, host_semaphore:
+                self.stats["requests"] += 1
+                try:
+                    async with self.session.get(url) as response:
+                        body = await response.read()
+                        result.status, result.error = response.status, None
+                        if response.status in self.retry_statuses:
+                            result.error = f"HTTP {response.status}"
+                            retry_after = self._retry_after(response)
+                        else:
+                            result.body = body
+                            self.stats["bytes"] += len(body)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    result.status, result.error = None, f"{type(e).__name__}: {e}"
+
+            if result.error is None or result.attempts > self.retries:
+                break
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._retry_delay(result.attempts, retry_after))
+
+        if result.error is not None:
+            self.stats["failures"] += 1
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    async def stream(self, urls: Iterable[str]) -> AsyncIterator[FetchResult]:
+        """按完成顺序逐个返回 urls 的抓取结果
+
+        URL 按主机放入等待队列，只在全局和该主机都有空闲名额时才创建任务，
+        某个主机的 URL 再多也不会占满全局名额、挡住其他主机（队头阻塞）。
+        通常预先取出 max_buffered 个 URL；全局还有空闲名额、而等待中的 URL 都属于已满的主机时，
+        继续往后读取，其他主机的 URL 立即开始，等待队列最多增长到 max_lookahead 个。
+        同时存在的任务不超过 concurrency 个，调用方处理完一个结果、不再引用它之后，响应体即可被回收。
+        """
+        url_iter = iter(urls)
+        exhausted = False
+        waiting = {}          # {主机: deque(URL)}
+        buffered = 0
+        active = Counter()    # 每个主机正在进行的任务数
+        tasks = {}            # {任务: 主机}
+
+        def start(url, host):
+            tasks[asyncio.ensure_future(self.fetch(url))] = host
+            active[host] += 1
+
+        try:
+            while True:
+                while not exhausted and buffered < self.max_buffered:
+                    url = next(url_iter, _END)
+                    if url is _END:
+                        exhausted = True
+                        break
+                    waiting.setdefault(self.host_of(url), deque()).append(url)
+                    buffered += 1
+
+                for host in list(waiting):
+                    queue = waiting[host]
+                    while queue and len(tasks) < self.concurrency and active[host] < self.per_host:
+                        start(queue.popleft(), host)
+                        buffered -= 1
+                    if not queue:
+                        del waiting[host]
+
+                # 此时还有空闲的全局名额，说明等待中的 URL 都属于已满的主机，往后找其他主机的 URL
+                while not exhausted and len(tasks) < self.concurrency and buffered < self.max_lookahead:
+                    url = next(url_iter, _END)
+                    if url is _END:
+                        exhausted = True
+                        break
+                    host = self.host_of(url)
+                    if host not in waiting and active[host] < self.per_host:
+                        start(url, host)
+                    else:
+                        waiting.setdefault(host, deque()).append(url)
+                        buffered += 1
+
+                if not tasks:
+                    return
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    active[tasks.pop(task)] -= 1
+                    yield task.result()
+        finally:
+            # 调用方提前结束迭代（break 或异常）时取消还在进行的请求
+            for task in tasks:
+                task.cancel()
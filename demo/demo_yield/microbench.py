@@ -0,0 +1,297 @@
+"""
+微基准测试工具
+
+替代 mem_advantage.py 中原来的 memory_usage_decorator。那个装饰器只比较调用前后的 RSS，
+用 time.time() 计时，有两个问题:
+1. 生成器函数被调用时只是创建了生成器，函数体一行都没有执行，测到的是创建生成器的开销
+2. 函数返回后临时对象已经释放，调用前后的 RSS 差值看不到执行过程中的峰值
+
+Benchmark 对每个测试用例:
+1. 返回值是迭代器（生成器、生成器表达式、文件对象等）时把它消耗完，测的是完整的执行过程
+2. 先预热 warmup 次，再用 time.perf_counter 计时 repeat 次，报告中位数、四分位距、最小值和最大值
+3. 单独运行一次，后台线程每隔 rss_interval 秒采样 RSS，记录比运行前高出的峰值
+4. 单独运行一次，记录 tracemalloc 的峰值（Python 对象分配的内存，不受内存池复用的影响）
+计时的几次运行不做 RSS 采样和 tracemalloc，避免它们的开销混进耗时。
+
+同一进程中先运行的用例释放的内存会留在 Python 的内存池里，后面的用例可以复用，
+RSS 峰值因此偏低；isolate=True 时每个用例在新启动的进程中运行（函数需要能被 pickle，
+即模块级函数或可 pickle 对象的方法）。
+
+结果可以保存为 JSON，之后用 compare 对比两次运行:
+
+    bench = Benchmark(repeat=5, warmup=1)
+    bench.add("列表", build_list, 10**6)
+    bench.add("生成器", iter_items, 10**6)
+    bench.run()
+    bench.save_json("before.json")
+
+    python microbench.py compare before.json after.json
+"""
+
+import argparse
+import collections
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Iterator
+
+import psutil
+
+MB = 1024 * 1024
+
+
+class RssSampler:
+    """后台线程定期采样当前进程的 RSS，记录峰值
+
+    采样线程需要取得 GIL 才能运行，被测函数是纯 Python 循环时大约每
+    sys.getswitchinterval()（默认 5 毫秒）才能采样一次，持续时间很短的峰值可能采不到。
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.process = psutil.Process(os.getpid())
+        self.peak = 0
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        rss = self.process.memory_info().rss
+        self.samples += 1
+        if rss > self.peak:
+            self.peak = rss
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.baseline = self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def consume(result):
+    """返回值是迭代器时把它消耗完，返回产生的元素个数；否则返回 len(result)（没有长度时为 None）"""
+    if isinstance(result, Iterator):
+        count = 0
+        for _ in result:
+            count += 1
+        return count
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def _drain(result):
+    # 计时时用 deque(maxlen=0) 消耗迭代器，比 Python 循环计数快，开销几乎可以忽略
+    if isinstance(result, Iterator):
+        collections.deque(result, maxlen=0)
+
+
+def summarize(values):
+    """一组耗时（秒）的统计量"""
+    ordered = sorted(values)
+    if len(ordered) >= 2:
+        q1, _, q3 = statistics.quantiles(ordered, n=4, method="inclusive")
+    else:
+        q1 = q3 = ordered[0]
+    return {
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "stdev": statistics.stdev(ordered) if len(ordered) >= 2 else 0.0,
+        "iqr": q3 - q1,
+        "min": ordered[0],
+        "max": ordered[-1],
+        "runs": ordered,
+    }
+
+
+def measure(func, args=(), kwargs=None, repeat=5, warmup=1, rss_interval=0.001):
+    """测量一次 func(*args, **kwargs)（迭代器会被消耗完），返回结果字典"""
+    kwargs = kwargs or {}
+
+    for _ in range(warmup):
+        _drain(func(*args, **kwargs))
+        gc.collect()
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        _drain(result)
+        times.append(time.perf_counter() - start)
+        del result
+
+    # RSS 峰值：返回值（例如一个大列表）在采样结束前一直被引用
+    gc.collect()
+    with RssSampler(rss_interval) as sampler:
+        result = func(*args, **kwargs)
+        items = consume(result)
+    del result
+    gc.collect()
+
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        consume(result)
+        del result
+        traced_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "items": items,
+        "time": summarize(times),
+        "rss_peak_mb": round((sampler.peak - sampler.baseline) / MB, 2),
+        "rss_samples": sampler.samples,
+        "tracemalloc_peak_mb": round(traced_peak / MB, 2),
+    }
+
+
+def _measure_child(queue, func, args, kwargs, repeat, warmup, rss_interval):
+    try:
+        queue.put(("ok", measure(func, args, kwargs, repeat, warmup, rss_interval)))
+    except BaseException as e:
+        queue.put(("error", f"{type(e).__name__}: {e}"))
+
+
+class Benchmark:
+    """一组微基准测试用例
+
+    Args:
+        repeat: 每个用例计时的次数
+        warmup: 计时前预热的次数
+        isolate: 每个用例在新启动的进程中运行
+        rss_interval: RSS 采样间隔（秒）
+    """
+
+    def __init__(self, repeat=5, warmup=1, isolate=False, rss_interval=0.001):
+        self.repeat = max(1, repeat)
+        self.warmup = max(0, warmup)
+        self.isolate = isolate
+        self.rss_interval = rss_interval
+        self.cases = []
+        self.results = {}
+
+    def add(self, name, func, *args, **kwargs):
+        """添加一个用例，运行时调用 func(*args, **kwargs)"""
+        self.cases.append((name, func, args, kwargs))
+        return func
+
+    def _run_isolated(self, func, args, kwargs):
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=_measure_child,
+            args=(queue, func, args, kwargs, self.repeat, self.warmup, self.rss_interval),
+        )
+        process.start()
+        status, value = queue.get()
+        process.join()
+        if status != "ok":
+            raise RuntimeError(value)
+        return value
+
+    def run(self, verbose=True):
+        """依次运行所有用例，返回 {名称: 结果}"""
+        if verbose:
+            print_header()
+        for name, func, args, kwargs in self.cases:
+            if self.isolate:
+                result = self._run_isolated(func, args, kwargs)
+            else:
+                result = measure(func, args, kwargs, self.repeat, self.warmup, self.rss_interval)
+            self.results[name] = result
+            if verbose:
+                print_row(name, result)
+        return self.results
+
+    def to_dict(self):
+        return {
+            "meta": {
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "repeat": self.repeat,
+                "warmup": self.warmup,
+                "isolate": self.isolate,
+            },
+            "results": self.results,
+        }
+
+    def save_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def print_header():
+    print(f"{'用例':<28}{'中位数(ms)':>12}{'四分位距':>10}{'最小值':>10}{'最大值':>10}{'RSS峰值(MB)':>13}{'tracemalloc(MB)':>17}")
+
+
+def print_row(name, result):
+    t = result["time"]
+    print(
+        f"{name:<28}{t['median'] * 1000:>12.2f}{t['iqr'] * 1000:>10.2f}{t['min'] * 1000:>10.2f}"
+        f"{t['max'] * 1000:>10.2f}{result['rss_peak_mb']:>13.2f}{result['tracemalloc_peak_mb']:>17.2f}"
+    )
+
+
+def compare(old, new):
+    """对比两次运行的结果（to_dict() 的格式），打印耗时中位数和内存峰值的变化
+
+    耗时的变化小于两次运行四分位距之和时标记为"噪声内"。
+    """
+    print(f"{'用例':<28}{'旧(ms)':>10}{'新(ms)':>10}{'变化':>9}{'':>8}{'RSS峰值(MB)':>18}{'tracemalloc(MB)':>20}")
+    for name, b in new["results"].items():
+        a = old["results"].get(name)
+        if a is None:
+            print(f"{name:<28}{'-':>10}{b['time']['median'] * 1000:>10.2f}  （新增）")
+            continue
+        old_median, new_median = a["time"]["median"], b["time"]["median"]
+        change = (new_median - old_median) / old_median if old_median else 0.0
+        noise = abs(new_median - old_median) <= a["time"]["iqr"] + b["time"]["iqr"]
+        print(
+            f"{name:<28}{old_median * 1000:>10.2f}{new_median * 1000:>10.2f}{change:>+9.1%}"
+            f"{'噪声内' if noise else '':>8}"
+            f"{a['rss_peak_mb']:>9.2f}→{b['rss_peak_mb']:<8.2f}"
+            f"{a['tracemalloc_peak_mb']:>11.2f}→{b['tracemalloc_peak_mb']:<8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对比两次微基准测试的 JSON 结果")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compare_parser = subparsers.add_parser("compare", help="对比两个 JSON 结果文件")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    compare(old, new)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
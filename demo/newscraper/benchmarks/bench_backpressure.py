@@ -0,0 +1,180 @@
+"""
+内存水位背压（newscraper.extensions.MemoryBackpressure）的效果
+
+在 HtmlSavePipeline 之前插入一个串行的慢管道（每项 --delay 秒，模拟跟不上下载速度的 Excel/磁盘写入），
+此时数据项还带着响应体和文档树。以高并发抓取本地测试站点，分别关闭和开启背压，对比:
+    - 爬虫进程的峰值 RSS、管道中同时处理的最大数据项数
+    - 暂停次数和累计暂停时间
+    - 数据项/秒、墙钟时间
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_backpressure.py
+    # 放开 Scrapy 按响应体字节数的限制，只靠背压控制内存
+    python benchmarks/bench_backpressure.py --articles 1000 --delay 0.05 --high-rss 200 --high-items 60 \
+        -s SCRAPER_SLOT_MAX_ACTIVE_SIZE=100000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+
+BENCH_SETTINGS = {
+    "LOG_LEVEL": "ERROR",
+    "INCREMENTAL_ENABLED": False,
+    "CONDITIONAL_GET_ENABLED": False,
+    "LATENCY_STATS_ENABLED": False,
+    "TELNETCONSOLE_ENABLED": False,
+    "ADAPTIVE_CONCURRENCY_ENABLED": False,
+    "CONCURRENT_REQUESTS": 64,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 64,
+}
+
+
+class SlowPipeline:
+    """串行处理数据项，每项耗时 BENCH_SLOW_PIPELINE_DELAY 秒"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getfloat("BENCH_SLOW_PIPELINE_DELAY", 0.01))
+
+    async def process_item(self, item, spider):
+        async with self.lock:
+            await asyncio.sleep(self.delay)
+        return item
+
+
+def run_worker(list_url, out_path, overrides):
+    """在当前进程中运行一次完整抓取，把结果写入 out_path"""
+    sys.path.insert(0, PROJECT_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    os.environ["SCRAPY_SETTINGS_MODULE"] = "newscraper.settings"
+
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    pipelines = dict(settings.getdict("ITEM_PIPELINES"))
+    pipelines["bench_backpressure.SlowPipeline"] = 8
+    settings.set("ITEM_PIPELINES", pipelines, priority="cmdline")
+    for name, value in {**BENCH_SETTINGS, **overrides}.items():
+        settings.set(name, value, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("newsspider")
+    process.crawl(crawler, list_url=list_url)
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+
+    stats = crawler.stats.get_stats()
+    items = stats.get("item_scraped_count", 0)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "items": items,
+                "seconds": round(elapsed, 2),
+                "items_per_second": round(items / elapsed, 1) if elapsed else 0.0,
+                # Linux 下 ru_maxrss 单位为 KB
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "items_in_flight_max": stats.get("backpressure/items_in_flight_max"),
+                "pauses": stats.get("backpressure/pauses", 0),
+                "paused_seconds": round(stats.get("backpressure/paused_seconds", 0.0), 2),
+                "pause_max_seconds": round(stats.get("backpressure/pause_max_seconds", 0.0), 2),
+                "resumed_drained": stats.get("backpressure/resumed_drained", 0),
+            },
+            f,
+        )
+
+
+def run_once(list_url, overrides):
+    workdir = tempfile.mkdtemp(prefix="bench_backpressure_")
+    out_path = os.path.join(workdir, "result.json")
+    try:
+        command = [sys.executable, os.path.abspath(__file__), "--worker", "--list-url", list_url, "--out", out_path]
+        for name, value in overrides.items():
+            command += ["-s", f"{name}={value}"]
+        subprocess.run(command, cwd=workdir, check=True)
+        with open(out_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="内存水位背压基准测试")
+    parser.add_argument("--articles", type=int, default=2000, help="测试站点的文章数")
+    parser.add_argument("--paragraphs", type=int, default=200, help="每篇文章的段落数（决定响应体大小）")
+    parser.add_argument("--delay", type=float, default=0.01, help="慢管道处理每项的秒数")
+    parser.add_argument("--high-rss", type=float, default=300, help="BACKPRESSURE_HIGH_RSS_MB")
+    parser.add_argument("--high-items", type=int, default=200, help="BACKPRESSURE_HIGH_ITEMS")
+    parser.add_argument("-s", dest="settings", action="append", metavar="NAME=VALUE", help="覆盖设置")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--list-url", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    overrides = dict(pair.partition("=")[::2] for pair in args.settings or [])
+
+    if args.worker:
+        run_worker(args.list_url, args.out, overrides)
+        return
+
+    site = subprocess.Popen(
+        [
+            sys.executable, os.path.join(BENCH_DIR, "fixture_site.py"),
+            "--articles", str(args.articles), "--paragraphs", str(args.paragraphs), "--port", "0",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    list_url = site.stdout.readline().strip()
+    print(f"测试站点: {list_url}  ({args.articles} 篇文章，每篇 {args.paragraphs} 段)，慢管道 {args.delay * 1000:.0f} ms/项")
+    base = {"BENCH_SLOW_PIPELINE_DELAY": args.delay, **overrides}
+    runs = [
+        ("关闭背压", {**base, "BACKPRESSURE_ENABLED": True, "BACKPRESSURE_HIGH_RSS_MB": 0, "BACKPRESSURE_HIGH_ITEMS": 0}),
+        ("开启背压", {
+            **base,
+            "BACKPRESSURE_ENABLED": True,
+            "BACKPRESSURE_HIGH_RSS_MB": args.high_rss,
+            "BACKPRESSURE_LOW_RSS_MB": args.high_rss * 0.75,
+            "BACKPRESSURE_HIGH_ITEMS": args.high_items,
+            "BACKPRESSURE_LOW_ITEMS": args.high_items // 2,
+        }),
+    ]
+    results = {}
+    try:
+        for name, settings in runs:
+            results[name] = run_once(list_url, settings)
+    finally:
+        site.terminate()
+
+    print(
+        f"\n{'':<10}{'数据项':>8}{'耗时(秒)':>10}{'项/秒':>8}{'峰值RSS(MB)':>13}{'最大在途项':>11}"
+        f"{'暂停次数':>10}{'暂停(秒)':>10}{'最长暂停(秒)':>14}"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<10}{r['items']:>8}{r['seconds']:>10.2f}{r['items_per_second']:>8.1f}{r['peak_rss_mb']:>13.1f}"
+            f"{r['items_in_flight_max'] or 0:>11}{r['pauses']:>10}{r['paused_seconds']:>10.2f}{r['pause_max_seconds']:>14.2f}"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+NewsPipeline 清洗阶段的吞吐量（数据项/秒），只测清洗本身，不经过 Scrapy:
+1. 改造前：strip() 三个字段，每个数据项调用一次 datetime.now().strftime
+2. 改造后逐项：Cleaner.clean_item（空白、全角、日期规范化）+ SecondClock
+3. 改造后批量：Cleaner.clean_batch，按 --batch 大小分批
+
+输入模拟真实页面的脏数据：多余空白、全角空格和数字、零宽字符；日期以一种格式为主，
+另有 --mixed 比例的数据项使用其他格式，用于观察格式检测缓存的效果。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_cleaning.py
+    python benchmarks/bench_cleaning.py --items 200000 --mixed 0.2 --batch 256
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newscraper.cleaning import Cleaner, SecondClock
+from newscraper.items import NewsItem
+
+OTHER_FORMATS = ["{d:%Y/%m/%d}", "{d:%Y.%m.%d}", "{d:%Y-%m-%d}", "{d:%Y%m%d}"]
+
+
+def make_items(count, mixed, seed=0):
+    rng = random.Random(seed)
+    newest = date(2025, 3, 18)
+    items = []
+    for i in range(count):
+        d = newest - timedelta(days=i // 2)
+        if rng.random() < mixed:
+            publish_date = rng.choice(OTHER_FORMATS).format(d=d)
+        else:
+            publish_date = f"\n\t {d.year}年{d.month:02d}月{d.day:02d}日  "
+        if i % 10 == 0:
+            # 全角数字
+            publish_date = publish_date.translate({ord(c): ord(c) + 0xFEE0 for c in "0123456789"})
+        items.append(
+            NewsItem(
+                title=f"  长春光机所　新闻标题 {i}​ \n",
+                publish_date=publish_date,
+                author=" \xa0党委办公室  ",
+                url=f"http://www.ciomp.cas.cn/xwdt/zhxw/{d:%Y%m}/t{d:%Y%m%d}_{i}.html",
+            )
+        )
+    return items
+
+
+def copy_items(items):
+    return [NewsItem(title=i.title, publish_date=i.publish_date, author=i.author, url=i.url) for i in items]
+
+
+def legacy(items, batch):
+    """改造前 NewsPipeline.process_item 的逻辑"""
+    for item in items:
+        if item.title:
+            item.title = item.title.strip()
+        if item.publish_date:
+            item.publish_date = item.publish_date.strip()
+        if item.author:
+            item.author = item.author.strip()
+        item.created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def per_item(items, batch):
+    cleaner, clock = Cleaner(), SecondClock()
+    for item in items:
+        cleaner.clean_item(item)
+        item.created_at = clock.now()
+
+
+def batched(items, batch):
+    cleaner, clock = Cleaner(), SecondClock()
+    for start in range(0, len(items), batch):
+        chunk = items[start : start + batch]
+        cleaner.clean_batch(chunk)
+        created_at = clock.now()
+        for item in chunk:
+            item.created_at = created_at
+
+
+def measure(func, items, batch, repeat):
+    times = []
+    for _ in range(repeat):
+        fresh = copy_items(items)
+        start = time.perf_counter()
+        func(fresh, batch)
+        times.append(time.perf_counter() - start)
+    return len(items) / statistics.median(times), fresh
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NewsPipeline 清洗阶段吞吐量")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--mixed", type=float, default=0.0, help="使用其他日期格式的数据项比例")
+    parser.add_argument("--batch", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    items = make_items(args.items, args.mixed)
+    print(f"数据项: {args.items}, 其他日期格式比例: {args.mixed:.0%}, 批大小: {args.batch}")
+    print("-" * 60)
+    results = {}
+    for name, func in [("改造前（strip）", legacy), ("逐项 clean_item", per_item), ("批量 clean_batch", batched)]:
+        rate, cleaned = measure(func, items, args.batch, args.repeat)
+        results[name] = cleaned
+        print(f"{name:<18}{rate:>14,.0f} 项/秒")
+
+    sample = results["批量 clean_batch"][1]
+    print(f"\n示例输出: title={sample.title!r} publish_date={sample.publish_date!r} author={sample.author!r}")
+    unparsed = sum(1 for item in results["批量 clean_batch"] if item.publish_date is None)
+    print(f"无法识别的日期: {unparsed}")
+
+
+if __name__ == "__main__":
+    main()
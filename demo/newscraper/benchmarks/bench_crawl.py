@@ -0,0 +1,308 @@
+"""
+离线端到端抓取基准测试
+
+启动本地测试站点（benchmarks/fixture_site.py，独立进程），然后按 settings.py 的配置
+运行完整项目：newsspider、全部数据管道和中间件。输出:
+    - 数据项/秒、墙钟时间
+    - 爬虫进程的峰值 RSS 和 CPU 时间（用户态 + 内核态）
+    - 每个管道的累计耗时（来自 LatencyStats 的 pipeline/* 直方图）
+    - 下载延迟 p95，以及 5xx 响应数
+
+增量抓取和条件请求缓存会被关闭，保证每次运行都完整抓取。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_crawl.py --articles 2000
+    python benchmarks/bench_crawl.py --articles 2000 --repeat 3 -s WORKER_POOL_MODE=process
+    # 模拟较慢的服务器，对比自适应并发和固定并发
+    python benchmarks/bench_crawl.py --articles 1000 --latency 0.05 --capacity 8
+    python benchmarks/bench_crawl.py --articles 1000 --latency 0.05 --capacity 8 \
+        -s ADAPTIVE_CONCURRENCY_ENABLED=False -s CONCURRENT_REQUESTS_PER_DOMAIN=32
+    # 对比两个提交（在临时 git worktree 中运行，要求两个提交都支持 -a list_url）
+    python benchmarks/bench_crawl.py --articles 2000 --compare HEAD~1 HEAD
+    # 多进程分片抓取（newscraper/runner.py）的加速比：分别用 1、2、4、8 个分片进程抓取并合并
+    python benchmarks/bench_crawl.py --articles 4000 --runner 1,2,4,8
+
+--runner 模式记录每种进程数的抓取、合并和总耗时，合并后的文章数，所有分片进程的 CPU 时间，
+以及相对 1 个进程的加速比和并行效率（加速比 / 进程数）。测试站点本身是单进程的线程服务器，
+进程数接近 CPU 核数时它也会占用一部分 CPU，加速比偏保守。
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+
+# 每次运行都从空数据库开始，完整抓取整个测试站点
+BENCH_SETTINGS = {
+    "LOG_LEVEL": "ERROR",
+    "INCREMENTAL_ENABLED": False,
+    "CONDITIONAL_GET_ENABLED": False,
+    "LATENCY_STATS_ENABLED": True,
+    "LATENCY_REPORT_PATH": None,
+    "TELNETCONSOLE_ENABLED": False,
+}
+
+
+def run_worker(project_dir, list_url, out_path, overrides):
+    """在当前进程中运行一次完整抓取，把结果写入 out_path"""
+    sys.path.insert(0, project_dir)
+    os.environ["SCRAPY_SETTINGS_MODULE"] = "newscraper.settings"
+
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    for name, value in {**BENCH_SETTINGS, **overrides}.items():
+        settings.set(name, value, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("newsspider")
+    process.crawl(crawler, list_url=list_url)
+
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    stats = crawler.stats.get_stats()
+    items = stats.get("item_scraped_count", 0)
+
+    # stats 中只有分位数，累计耗时用 recorder 中的均值乘以次数得到
+    from newscraper.latency import recorder
+
+    pipelines = {}
+    download_p95_ms = 0.0
+    for stage, summary in recorder.summary().items():
+        if stage.startswith("pipeline/"):
+            pipelines[stage.split("/", 1)[1]] = round(summary["mean_ms"] * summary["count"] / 1000, 3)
+        elif stage.startswith("download/"):
+            download_p95_ms = max(download_p95_ms, summary["p95_ms"])
+    server_errors = sum(
+        value for key, value in stats.items() if key.startswith("downloader/response_status_count/5")
+    )
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "items": items,
+                "seconds": round(elapsed, 3),
+                "items_per_second": round(items / elapsed, 1) if elapsed else 0.0,
+                # Linux 下 ru_maxrss 单位为 KB
+                "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+                "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+                "download_p95_ms": download_p95_ms,
+                "server_errors": server_errors,
+                "pipeline_seconds": pipelines,
+            },
+            f,
+        )
+
+
+def start_site(args):
+    """在独立进程中启动测试站点，返回 (进程, 列表页 URL)"""
+    site = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(BENCH_DIR, "fixture_site.py"),
+            "--articles", str(args.articles),
+            "--paragraphs", str(args.paragraphs),
+            "--latency", str(args.latency),
+            "--capacity", str(args.capacity),
+            "--port", "0",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return site, site.stdout.readline().strip()
+
+
+def run_once(project_dir, list_url, overrides):
+    """在全新的临时目录中启动一个爬虫进程，返回结果字典"""
+    workdir = tempfile.mkdtemp(prefix="bench_crawl_")
+    out_path = os.path.join(workdir, "result.json")
+    try:
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker",
+            "--project", project_dir, "--list-url", list_url, "--out", out_path,
+        ]
+        for name, value in overrides.items():
+            command += ["-s", f"{name}={value}"]
+        subprocess.run(command, cwd=workdir, check=True)
+        with open(out_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_repeated(project_dir, list_url, overrides, repeat):
+    """重复运行，数值取中位数"""
+    results = [run_once(project_dir, list_url, overrides) for _ in range(repeat)]
+    merged = {}
+    for key in ("items", "seconds", "items_per_second", "peak_rss_mb", "cpu_seconds", "download_p95_ms", "server_errors"):
+        merged[key] = statistics.median(r[key] for r in results)
+    names = sorted({name for r in results for name in r["pipeline_seconds"]})
+    merged["pipeline_seconds"] = {
+        name: statistics.median(r["pipeline_seconds"].get(name) or 0.0 for r in results) for name in names
+    }
+    return merged
+
+
+def run_sharded(list_url, workers, overrides):
+    """在全新的临时目录中用 workers 个分片进程抓取并合并，返回结果字典"""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "newscraper.settings")
+    from newscraper import runner
+
+    workdir = tempfile.mkdtemp(prefix="bench_runner_")
+    settings = [f"{name}={value}" for name, value in {**BENCH_SETTINGS, **overrides}.items() if value is not None]
+    try:
+        cpu_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        result = runner.run(workers, list_url, settings, output_dir=workdir)
+        cpu_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        if result["failed_shards"]:
+            raise RuntimeError(f"分片 {result['failed_shards']} 运行失败，日志见 {workdir}/shards")
+        conn = sqlite3.connect(os.path.join(workdir, "news.db"))
+        try:
+            result["items"] = conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+        finally:
+            conn.close()
+        result["cpu_seconds"] = round(
+            (cpu_after.ru_utime + cpu_after.ru_stime) - (cpu_before.ru_utime + cpu_before.ru_stime), 3
+        )
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_scaling(list_url, worker_counts, overrides, repeat):
+    """每种进程数重复运行 repeat 次取中位数，返回 [(进程数, 结果字典)]"""
+    results = []
+    for workers in worker_counts:
+        runs = [run_sharded(list_url, workers, overrides) for _ in range(repeat)]
+        merged = {
+            key: statistics.median(r[key] for r in runs)
+            for key in ("items", "crawl_seconds", "merge_seconds", "total_seconds", "cpu_seconds")
+        }
+        results.append((workers, merged))
+    base = results[0][1]["total_seconds"] * results[0][0]
+    for workers, r in results:
+        r["items_per_second"] = round(r["items"] / r["total_seconds"], 1)
+        r["speedup"] = round(base / r["total_seconds"], 2)
+        r["efficiency"] = round(r["speedup"] / workers, 2)
+    return results
+
+
+def print_scaling(results):
+    print(f"CPU 核数: {os.cpu_count()}")
+    print(
+        f"{'进程数':>6}{'文章数':>8}{'抓取(秒)':>10}{'合并(秒)':>10}{'总计(秒)':>10}{'项/秒':>10}"
+        f"{'CPU(秒)':>10}{'加速比':>8}{'效率':>8}"
+    )
+    for workers, r in results:
+        print(
+            f"{workers:>6}{r['items']:>8}{r['crawl_seconds']:>10.2f}{r['merge_seconds']:>10.2f}{r['total_seconds']:>10.2f}"
+            f"{r['items_per_second']:>10.1f}{r['cpu_seconds']:>10.2f}{r['speedup']:>8.2f}{r['efficiency']:>8.2f}"
+        )
+
+
+def print_results(results):
+    """results 为 [(名称, 结果字典)]"""
+    print(
+        f"{'版本':<16}{'数据项':>8}{'耗时(秒)':>10}{'项/秒':>10}{'峰值RSS(MB)':>13}{'CPU(秒)':>10}"
+        f"{'下载p95(ms)':>13}{'5xx':>6}"
+    )
+    print("-" * 87)
+    for name, r in results:
+        print(
+            f"{name:<16}{r['items']:>8}{r['seconds']:>10.2f}{r['items_per_second']:>10.1f}"
+            f"{r['peak_rss_mb']:>13.1f}{r['cpu_seconds']:>10.2f}{r['download_p95_ms']:>13.1f}{r['server_errors']:>6}"
+        )
+    # async 管道的耗时包含等待工作池的时间，多个数据项并发处理时累计值可能超过墙钟时间
+    print("\n各管道累计耗时（秒）:")
+    names = sorted({n for _, r in results for n in r["pipeline_seconds"]})
+    for pipeline in names:
+        cells = "".join(f"{(r['pipeline_seconds'].get(pipeline) or 0.0):>12.3f}" for _, r in results)
+        print(f"  {pipeline:<26}{cells}")
+
+
+def worktree(rev):
+    """把 rev 检出到临时 worktree，返回其中的项目目录"""
+    repo = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], cwd=PROJECT_DIR, check=True, capture_output=True, text=True
+    ).stdout.strip()
+    path = tempfile.mkdtemp(prefix=f"bench_{rev.replace('/', '_').replace('~', '_')}_")
+    subprocess.run(["git", "worktree", "add", "--detach", path, rev], cwd=repo, check=True, capture_output=True)
+    return repo, path, os.path.join(path, os.path.relpath(PROJECT_DIR, repo))
+
+
+def parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition("=")
+        overrides[name] = value
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线端到端抓取基准测试")
+    parser.add_argument("--articles", type=int, default=1000, help="测试站点的文章数")
+    parser.add_argument("--paragraphs", type=int, default=20, help="每篇文章的段落数")
+    parser.add_argument("--latency", type=float, default=0.0, help="测试站点每个请求的模拟延迟（秒）")
+    parser.add_argument("--capacity", type=int, default=0, help="测试站点同时处理的请求数，0 表示不限")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("-s", dest="settings", action="append", metavar="NAME=VALUE", help="覆盖设置")
+    parser.add_argument("--compare", nargs=2, metavar=("REV_A", "REV_B"), help="对比两个 git 提交")
+    parser.add_argument("--runner", metavar="N,N,...", help="用 newscraper.runner 分别以这些分片进程数抓取，对比加速比")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--project", help=argparse.SUPPRESS)
+    parser.add_argument("--list-url", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    overrides = parse_overrides(args.settings)
+
+    if args.worker:
+        run_worker(args.project, args.list_url, args.out, overrides)
+        return
+
+    site, list_url = start_site(args)
+    print(f"测试站点: {list_url}  ({args.articles} 篇文章)")
+    trees = []
+    try:
+        if args.runner:
+            worker_counts = [int(n) for n in args.runner.split(",")]
+            results = run_scaling(list_url, worker_counts, overrides, args.repeat)
+        elif args.compare:
+            results = []
+            for rev in args.compare:
+                repo, path, project_dir = worktree(rev)
+                trees.append((repo, path))
+                results.append((rev, run_repeated(project_dir, list_url, overrides, args.repeat)))
+        else:
+            results = [("当前工作区", run_repeated(PROJECT_DIR, list_url, overrides, args.repeat))]
+    finally:
+        site.terminate()
+        for repo, path in trees:
+            subprocess.run(["git", "worktree", "remove", "--force", path], cwd=repo, capture_output=True)
+
+    if args.runner:
+        print_scaling(results)
+    else:
+        print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(results), f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+近似重复检测（newscraper/dedup.py）的准确率、指纹计算速度和索引查找的扩展性
+
+1. 测试站点的文章（--duplicates 比例为转载）：逐篇计算指纹并查找，统计查出的转载、误判和漏检，
+   以及每页的指纹计算耗时
+2. 索引规模：向 SimHashIndex 加入 N 个随机指纹（默认 1 万、10 万、100 万、300 万），测量
+   - 查找耗时（中位数、p95）和每次查找比较的指纹数，一半查询是已有指纹翻转 0~3 位，一半是新指纹
+   - 与逐个比较全部指纹的线性扫描对比（只在 10 万以内测量）
+   - 索引占用的内存（RSS 增量）和从 news.db 加载 N 个指纹重建索引的耗时
+   随机指纹在各段上均匀分布，是分段索引的理想情况；真实文章的指纹有相关性，桶会更不均匀，
+   第 1 部分的 "平均比较次数" 可以作为参照。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_dedup.py
+    python benchmarks/bench_dedup.py --sizes 10000,100000,1000000 --articles 5000 --duplicates 0.2
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import psutil
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_site import FixtureSite  # noqa: E402
+from newscraper.dedup import DedupStore, SimHashIndex, fingerprint_page, signed64  # noqa: E402
+from newscraper.extraction import parse_document  # noqa: E402
+
+
+def fixture_accuracy(articles, duplicates, max_distance):
+    site = FixtureSite(articles=articles, duplicates=duplicates)
+    index = SimHashIndex(max_distance)
+    # 按抓取顺序（从新到旧）处理，先出现的一篇作为原文
+    first_seen = {}
+    expected = found = false_positive = missed = compared = 0
+    fingerprint_seconds = 0.0
+    for article_id in range(articles):
+        doc = parse_document(site.detail_page(article_id).encode("utf-8"), "utf-8")
+        start = time.perf_counter()
+        fingerprint = fingerprint_page(doc)
+        fingerprint_seconds += time.perf_counter() - start
+
+        source = site.source_article(article_id)
+        is_duplicate = source in first_seen
+        expected += is_duplicate
+        match, _, count = index.find(fingerprint)
+        compared += count
+        if match is None:
+            index.add(fingerprint, article_id)
+            first_seen.setdefault(source, article_id)
+            missed += is_duplicate
+        elif site.source_article(match) == source:
+            found += 1
+        else:
+            false_positive += 1
+    return {
+        "articles": articles,
+        "duplicates_expected": expected,
+        "duplicates_found": found,
+        "false_positives": false_positive,
+        "missed": missed,
+        "fingerprint_ms_per_page": round(fingerprint_seconds / articles * 1000, 3),
+        "compared_per_lookup": round(compared / articles, 2),
+    }
+
+
+def flip_bits(rng, fingerprint, bits):
+    for bit in rng.sample(range(64), bits):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def linear_find(fingerprints, fingerprint, max_distance):
+    for position, value in enumerate(fingerprints):
+        if (value ^ fingerprint).bit_count() <= max_distance:
+            return position
+    return None
+
+
+def measure_lookups(index, probes):
+    times, compared = [], 0
+    for probe in probes:
+        start = time.perf_counter()
+        _, _, count = index.find(probe)
+        times.append((time.perf_counter() - start) * 1e6)
+        compared += count
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95)], compared / len(probes)
+
+
+def scale(sizes, queries, max_distance, seed=0):
+    rng = random.Random(seed)
+    process = psutil.Process()
+    index = SimHashIndex(max_distance)
+    results = []
+    rss_before = process.memory_info().rss
+    for size in sizes:
+        start = time.perf_counter()
+        for doc_id in range(len(index), size):
+            index.add(rng.getrandbits(64), doc_id)
+        build_seconds = time.perf_counter() - start
+        rss = process.memory_info().rss - rss_before
+        added = size - (results[-1]["fingerprints"] if results else 0)
+
+        probes = [
+            flip_bits(rng, index.fingerprints[rng.randrange(size)], rng.randint(0, max_distance))
+            for _ in range(queries // 2)
+        ]
+        probes += [rng.getrandbits(64) for _ in range(queries - len(probes))]
+        rng.shuffle(probes)
+        median_us, p95_us, compared = measure_lookups(index, probes)
+
+        linear_us = None
+        if size <= 100000:
+            start = time.perf_counter()
+            sample = probes[: max(1, queries // 20)]
+            for probe in sample:
+                linear_find(index.fingerprints, probe, max_distance)
+            linear_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+        results.append(
+            {
+                "fingerprints": size,
+                "lookup_median_us": round(median_us, 2),
+                "lookup_p95_us": round(p95_us, 2),
+                "compared_per_lookup": round(compared, 2),
+                "linear_scan_us": None if linear_us is None else round(linear_us, 1),
+                "index_mb": round(rss / 1024 / 1024, 1),
+                "bytes_per_fingerprint": round(rss / size, 1),
+                "add_us": round(build_seconds / max(1, added) * 1e6, 2),
+            }
+        )
+    return index, results
+
+
+def load_time(index, sizes):
+    """把指纹写入 news.db，测量 DedupStore 打开时重建索引的耗时"""
+    workdir = tempfile.mkdtemp(prefix="bench_dedup_")
+    db_path = os.path.join(workdir, "news.db")
+    results = []
+    try:
+        store = DedupStore(db_path)
+        written = 0
+        for size in sizes:
+            rows = (
+                (i + 1, f"http://www.ciomp.cas.cn/xwdt/zhxw/t_{i}.html", signed64(index.fingerprints[i]))
+                for i in range(written, size)
+            )
+            store.conn.executemany("INSERT INTO dedup_fingerprints (id, url, simhash) VALUES (?, ?, ?)", rows)
+            store.conn.commit()
+            written = size
+            reopened = DedupStore(db_path)
+            results.append({"fingerprints": size, "load_ms": round(reopened.load_seconds * 1000, 1)})
+            reopened.close()
+        store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="近似重复检测基准测试")
+    parser.add_argument("--articles", type=int, default=2000, help="测试站点文章数")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="测试站点转载文章比例")
+    parser.add_argument("--sizes", default="10000,100000,1000000,3000000", help="逗号分隔的索引规模")
+    parser.add_argument("--queries", type=int, default=20000, help="每个规模的查询次数")
+    parser.add_argument("--max-distance", type=int, default=3)
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    accuracy = fixture_accuracy(args.articles, args.duplicates, args.max_distance)
+    print(
+        f"测试站点 {accuracy['articles']} 篇：应查出 {accuracy['duplicates_expected']} 篇转载，"
+        f"查出 {accuracy['duplicates_found']}，误判 {accuracy['false_positives']}，漏检 {accuracy['missed']}；"
+        f"指纹 {accuracy['fingerprint_ms_per_page']:.2f} ms/页，平均比较 {accuracy['compared_per_lookup']} 个指纹"
+    )
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    index, results = scale(sizes, args.queries, args.max_distance)
+    loads = load_time(index, sizes)
+    print(f"\n{'指纹数':>10}{'查找中位数(µs)':>16}{'p95(µs)':>10}{'比较次数':>10}{'线性扫描(µs)':>14}"
+          f"{'内存(MB)':>10}{'字节/指纹':>10}{'加载(ms)':>10}")
+    for r, load in zip(results, loads):
+        r["load_ms"] = load["load_ms"]
+        linear = "-" if r["linear_scan_us"] is None else f"{r['linear_scan_us']:,.0f}"
+        print(
+            f"{r['fingerprints']:>10,}{r['lookup_median_us']:>16.1f}{r['lookup_p95_us']:>10.1f}"
+            f"{r['compared_per_lookup']:>10.1f}{linear:>14}{r['index_mb']:>10.1f}"
+            f"{r['bytes_per_fingerprint']:>10.0f}{r['load_ms']:>10,.0f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"fixture": accuracy, "scale": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
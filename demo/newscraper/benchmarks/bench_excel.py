@@ -0,0 +1,110 @@
+"""
+对比 ExcelPipeline（整本工作簿驻留内存）与 StreamingExcelPipeline（write_only 流式写入）
+在不同数据量下的峰值内存与耗时
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_excel.py
+    python benchmarks/bench_excel.py --sizes 10000 100000
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PIPELINES = ["ExcelPipeline", "StreamingExcelPipeline"]
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+class DummySpider:
+    """只提供管道用到的 logger 属性"""
+
+    name = "bench"
+    logger = logging.getLogger("bench")
+
+
+def make_item(i):
+    """构造与 NewsPipeline 输出结构一致的数据项"""
+    return {
+        "title": f"长春光机所新闻标题 {i}",
+        "publish_date": "2025-03-18",
+        "author": "党委办公室",
+        "url": f"http://www.ciomp.cas.cn/xwdt/zhxw/202503/t20250318_{i}.html",
+        "created_at": "2025-03-18 12:00:00",
+    }
+
+
+def run_worker(pipeline_name, rows):
+    """在子进程中运行单个管道，输出 JSON 结果"""
+    from newscraper import pipelines
+
+    workdir = tempfile.mkdtemp(prefix="bench_excel_")
+    os.chdir(workdir)
+
+    pipeline = getattr(pipelines, pipeline_name)()
+    spider = DummySpider()
+
+    start = time.perf_counter()
+    pipeline.open_spider(spider)
+    for i in range(rows):
+        pipeline.process_item(make_item(i), spider)
+    pipeline.close_spider(spider)
+    elapsed = time.perf_counter() - start
+
+    size = sum(os.path.getsize(f) for f in os.listdir(workdir) if f.endswith(".xlsx"))
+    for f in os.listdir(workdir):
+        os.remove(f)
+    os.rmdir(workdir)
+
+    # Linux 下 ru_maxrss 单位为 KB
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        json.dumps(
+            {
+                "pipeline": pipeline_name,
+                "rows": rows,
+                "seconds": round(elapsed, 3),
+                "peak_rss_mb": round(peak_rss_mb, 1),
+                "file_mb": round(size / 1024 / 1024, 2),
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--worker", nargs=2, metavar=("PIPELINE", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]))
+        return
+
+    print(f"{'管道':<24}{'行数':>10}{'耗时(秒)':>12}{'峰值RSS(MB)':>14}{'文件(MB)':>10}")
+    print("-" * 70)
+    for rows in args.sizes:
+        for name in PIPELINES:
+            # 每个组合单独启动一个进程，保证峰值内存互不影响
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", name, str(rows)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{result['pipeline']:<24}{result['rows']:>10}{result['seconds']:>12.2f}"
+                f"{result['peak_rss_mb']:>14.1f}{result['file_mb']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+对比详情页字段提取 + HTML 改写的两种方式:
+1. 改造前：parsel Selector 解析一次用于 CSS/XPath 提取，HtmlSavePipeline 再用 lxml.html.fromstring 解析一次
+2. 改造后：FieldExtractor 预编译 XPath，每个响应只解析一次，文档树直接交给改写阶段
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --pages 2000 --paragraphs 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import lxml.html
+from parsel import Selector
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_site import FixtureSite
+from newscraper.extraction import FieldExtractor, extract_document
+from newscraper.pipelines import rewrite_html
+from newscraper.spiders.newsspider import newsspider
+
+DATE_XPATH = '//tr[@align="right"]/td[@width="20%" and @class="hui12_sj2"]/text()'
+AUTHOR_XPATH = '//tr[@align="right"]/td[@align="center" and @width="22%"]/text()'
+
+
+class ParseCounter:
+    """统计每种方式的解析次数"""
+
+    def __init__(self):
+        self.parses = 0
+
+
+def legacy(page, counter):
+    """改造前：Selector 提取字段，再用 lxml 重新解析一次做改写"""
+    url, body = page
+    selector = Selector(text=body.decode("utf-8"))
+    counter.parses += 1
+    fields = {
+        "title": selector.css("title::text").get(),
+        "publish_date": selector.xpath(DATE_XPATH).get(),
+        "author": selector.xpath(AUTHOR_XPATH).get(),
+    }
+    doc = lxml.html.fromstring(body.decode("utf-8"))
+    counter.parses += 1
+    return fields, rewrite_html(doc, None, None, url)
+
+
+def compiled(extractor):
+    def run(page, counter):
+        """改造后：解析一次，提取与改写共用同一棵文档树"""
+        url, body = page
+        fields, doc = extract_document(extractor, body, "utf-8")
+        counter.parses += 1
+        return fields, rewrite_html(doc, None, None, url)
+
+    return run
+
+
+def extract_only_legacy(page):
+    url, body = page
+    selector = Selector(text=body.decode("utf-8"))
+    return (
+        selector.css("title::text").get(),
+        selector.xpath(DATE_XPATH).get(),
+        selector.xpath(AUTHOR_XPATH).get(),
+    )
+
+
+def measure(func, pages, repeat):
+    """返回 (每页毫秒中位数, 每页解析次数)"""
+    times = []
+    counter = ParseCounter()
+    for _ in range(repeat):
+        counter.parses = 0
+        start = time.perf_counter()
+        for page in pages:
+            func(page, counter)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) / len(pages) * 1000, counter.parses / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字段提取方式对比")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--paragraphs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    site = FixtureSite(articles=args.pages, paragraphs=args.paragraphs)
+    pages = [
+        (f"http://www.ciomp.cas.cn{site.article_path(i)}", site.detail_page(i).encode("utf-8"))
+        for i in range(args.pages)
+    ]
+    extractor = FieldExtractor(newsspider.fields)
+
+    # 结果必须一致
+    assert legacy(pages[0], ParseCounter())[0] == compiled(extractor)(pages[0], ParseCounter())[0]
+
+    print(f"页面数: {args.pages}, 平均大小: {sum(len(b) for _, b in pages) / len(pages) / 1024:.1f} KB")
+    print("-" * 64)
+    for name, func in [("改造前（两次解析）", legacy), ("改造后（一次解析）", compiled(extractor))]:
+        per_page_ms, parses = measure(func, pages, args.repeat)
+        print(f"{name:<18} 解析次数/页: {parses:.0f}   提取+改写: {per_page_ms:.3f} ms/页")
+
+    # 只看字段提取部分（含解析）
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for page in pages:
+            extract_only_legacy(page)
+        times.append(time.perf_counter() - start)
+    legacy_ms = statistics.median(times) / len(pages) * 1000
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for _, body in pages:
+            extract_document(extractor, body, "utf-8", keep_document=False)
+        times.append(time.perf_counter() - start)
+    compiled_ms = statistics.median(times) / len(pages) * 1000
+    print(f"仅字段提取: Selector {legacy_ms:.3f} ms/页, FieldExtractor {compiled_ms:.3f} ms/页")
+
+
+if __name__ == "__main__":
+    main()
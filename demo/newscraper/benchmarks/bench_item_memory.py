@@ -0,0 +1,123 @@
+"""
+测量每个在途数据项占用的内存：
+1. 旧方式：scrapy.Item 中保存完整的 HtmlResponse（含响应头和已解析的选择器树）
+2. 新方式：NewsItem 只保存字段和原始响应体，归档后响应体被释放
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_item_memory.py
+    python benchmarks/bench_item_memory.py --items 500 --paragraphs 200
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+import scrapy
+from scrapy.http import HtmlResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newscraper.items import NewsItem
+
+TITLE_XPATH = "title::text"
+DATE_XPATH = '//tr[@align="right"]/td[@width="20%" and @class="hui12_sj2"]/text()'
+AUTHOR_XPATH = '//tr[@align="right"]/td[@align="center" and @width="22%"]/text()'
+
+
+class LegacyNewsItem(scrapy.Item):
+    """改造前的数据项结构，保存整个响应对象"""
+    title = scrapy.Field()
+    publish_date = scrapy.Field()
+    author = scrapy.Field()
+    url = scrapy.Field()
+    created_at = scrapy.Field()
+    response = scrapy.Field()
+    html_saved_path = scrapy.Field()
+
+
+def make_response(i, paragraphs):
+    """构造一个与 ciomp.cas.cn 详情页结构相近的响应"""
+    body = "".join(
+        f'<p>第 {j} 段正文内容，<a href="../img/{j}.html">相关链接</a>'
+        f'<img src="./W0{j}.jpg"></p>'
+        for j in range(paragraphs)
+    )
+    html = (
+        f"<html><head><title>新闻标题 {i}</title></head><body><table>"
+        '<tr align="right"><td width="20%" class="hui12_sj2">2025-03-18</td>'
+        '<td align="center" width="22%">党委办公室</td></tr></table>'
+        f"{body}</body></html>"
+    )
+    url = f"http://www.ciomp.cas.cn/xwdt/zhxw/202503/t20250318_{i}.html"
+    return HtmlResponse(url=url, body=html.encode("utf-8"), encoding="utf-8")
+
+
+def legacy_item(response):
+    item = LegacyNewsItem()
+    item["title"] = response.css(TITLE_XPATH).get()
+    item["publish_date"] = response.xpath(DATE_XPATH).get()
+    item["author"] = response.xpath(AUTHOR_XPATH).get()
+    item["url"] = response.url
+    item["response"] = response
+    return item
+
+
+def lean_item(response):
+    return NewsItem(
+        title=response.css(TITLE_XPATH).get(),
+        publish_date=response.xpath(DATE_XPATH).get(),
+        author=response.xpath(AUTHOR_XPATH).get(),
+        url=response.url,
+        body=response.body,
+        encoding=response.encoding,
+    )
+
+
+def measure(build, n, paragraphs, release_body=False):
+    """返回 (每项在途内存 KB, 每项峰值内存 KB)
+
+    响应对象在构造数据项后即丢弃，与 Scrapy 回调返回后的情况一致，
+    因此剩余内存就是数据项本身持有的部分。
+    """
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+
+    items = []
+    for i in range(n):
+        items.append(build(make_response(i, paragraphs)))
+    if release_body:
+        for item in items:
+            item.body = None
+
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return (current - base) / n / 1024, (peak - base) / n / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据项在途内存对比")
+    parser.add_argument("--items", type=int, default=200, help="同时在途的数据项数量")
+    parser.add_argument("--paragraphs", type=int, default=100, help="每个页面的段落数")
+    args = parser.parse_args()
+
+    page_kb = len(make_response(0, args.paragraphs).body) / 1024
+    print(f"页面大小: {page_kb:.1f} KB, 在途数据项: {args.items}")
+    print("-" * 60)
+
+    cases = [
+        ("scrapy.Item + Response", legacy_item, False),
+        ("NewsItem（归档前）", lean_item, False),
+        ("NewsItem（归档后）", lean_item, True),
+    ]
+    for name, build, release in cases:
+        per_item, peak = measure(build, args.items, args.paragraphs, release)
+        print(f"{name:<26} 每项: {per_item:>8.1f} KB   峰值/项: {peak:>8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
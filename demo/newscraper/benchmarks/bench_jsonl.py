@@ -0,0 +1,198 @@
+"""
+JSON Lines 导出（JsonLinesPipeline）的写入吞吐量和下游读取速度
+
+写入：把 --items 个合成数据项（每项带约 30 KB 的响应体，验证它不会被导出）依次交给管道，对比
+    - orjson / 标准库 json 序列化
+    - gzip 压缩级别 1、3、6 和不压缩
+    - Scrapy 默认的 JSON 数组导出（scrapy crawl -o output.json 使用的 JsonItemExporter）
+  记录 数据项/秒、每项的磁盘字节数和文件数（按 --max-items 切换文件）。
+读取：下游读取全部数据项
+    - 逐行读取 .jsonl.gz 文件（orjson / json 解析），内存占用与文件大小无关
+    - json.load 整个 JSON 数组，必须读完整个文件才能拿到第一条
+  记录 数据项/秒、读到第一条的耗时和 tracemalloc 峰值内存。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_jsonl.py
+    python benchmarks/bench_jsonl.py --items 1000000 --max-items 200000 --json jsonl.json
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapy.exporters import JsonItemExporter  # noqa: E402
+
+from newscraper.items import NewsItem  # noqa: E402
+from newscraper.pipelines import JsonLinesPipeline  # noqa: E402
+
+FIELDS = ["title", "publish_date", "author", "url", "created_at", "html_saved_path"]
+HAN = "光机所研究员团队合作成果发布会议学术交流国际科技创新实验室项目党委办公室综合新闻精密仪器望远镜激光材料"
+
+
+class _Spider:
+    logger = logging.getLogger("bench_jsonl")
+
+
+def make_items(count, seed=0):
+    rng = random.Random(seed)
+    body = b"<html>" + "正文".encode("utf-8") * 5000 + b"</html>"
+    items = []
+    for i in range(count):
+        items.append(
+            NewsItem(
+                title="".join(rng.choices(HAN, k=rng.randint(12, 40))),
+                publish_date=f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                author=rng.choice(["党委办公室", "综合新闻", "科技处", "研究生部"]),
+                url=f"http://www.ciomp.cas.cn/xwdt/zhxw/2025/t2025_{i}.html",
+                created_at="2025-03-18 10:00:00",
+                html_saved_path=f"html_archive#{rng.getrandbits(256):064x}",
+                body=body,
+                encoding="utf-8",
+            )
+        )
+    return items
+
+
+def json_dumps(row):
+    return (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def write_jsonl(items, root, serializer, compression, level, max_items):
+    pipeline = JsonLinesPipeline(
+        root=root, fields=FIELDS, compression=compression, compression_level=level, max_items=max_items
+    )
+    if serializer == "json":
+        pipeline.dumps = json_dumps
+    spider = _Spider()
+    pipeline.open_spider(spider)
+    start = time.perf_counter()
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.close_spider(spider)
+    return time.perf_counter() - start, pipeline.saved_files
+
+
+def write_array(items, path):
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        exporter = JsonItemExporter(f, fields_to_export=FIELDS, encoding="utf-8")
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(item)
+        exporter.finish_exporting()
+    return time.perf_counter() - start, [path]
+
+
+def read_jsonl(paths, loads):
+    """逐行读取，返回 (条数, 读到第一条的秒数)"""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            for line in f:
+                loads(line)
+                count += 1
+                if first is None:
+                    first = time.perf_counter() - start
+    return count, first
+
+
+def read_array(paths, loads):
+    start = time.perf_counter()
+    with open(paths[0], "rb") as f:
+        rows = json.load(f)
+    return len(rows), time.perf_counter() - start
+
+
+def measure_read(reader, paths, loads):
+    start = time.perf_counter()
+    count, first = reader(paths, loads)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    reader(paths, loads)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "items": count,
+        "items_per_second": round(count / seconds),
+        "first_item_ms": round(first * 1000, 2),
+        "peak_mb": round(peak / 1024 / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON Lines 导出基准测试")
+    parser.add_argument("--items", type=int, default=200000)
+    parser.add_argument("--max-items", type=int, default=100000, help="每个文件的条数（JSONL_MAX_ITEMS）")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    workdir = tempfile.mkdtemp(prefix="bench_jsonl_")
+    configs = [
+        ("orjson + gzip 1", "orjson", "gzip", 1),
+        ("orjson + gzip 3", "orjson", "gzip", 3),
+        ("orjson + gzip 6", "orjson", "gzip", 6),
+        ("orjson 不压缩", "orjson", None, 0),
+        ("json + gzip 3", "json", "gzip", 3),
+        ("JSON 数组 (-o)", None, None, 0),
+    ]
+    report = {"items": args.items, "write": {}, "read": {}}
+    outputs = {}
+    try:
+        print(f"写入 {args.items:,} 条")
+        print(f"{'':<18}{'项/秒':>10}{'字节/项':>10}{'文件数':>8}")
+        for name, serializer, compression, level in configs:
+            root = os.path.join(workdir, str(len(outputs)))
+            os.makedirs(root)
+            if serializer is None:
+                seconds, paths = write_array(items, os.path.join(root, "output.json"))
+            else:
+                seconds, paths = write_jsonl(items, root, serializer, compression, level, args.max_items)
+            size = sum(os.path.getsize(p) for p in paths)
+            assert not glob.glob(os.path.join(root, "*.part"))
+            outputs[name] = paths
+            report["write"][name] = {
+                "items_per_second": round(args.items / seconds),
+                "bytes_per_item": round(size / args.items, 1),
+                "files": len(paths),
+            }
+            r = report["write"][name]
+            print(f"{name:<18}{r['items_per_second']:>10,}{r['bytes_per_item']:>10.1f}{r['files']:>8}")
+
+        reads = [
+            ("gzip 3 逐行 orjson", read_jsonl, outputs["orjson + gzip 3"], orjson.loads),
+            ("gzip 3 逐行 json", read_jsonl, outputs["orjson + gzip 3"], json.loads),
+            ("不压缩 逐行 orjson", read_jsonl, outputs["orjson 不压缩"], orjson.loads),
+            ("JSON 数组 json.load", read_array, outputs["JSON 数组 (-o)"], None),
+        ]
+        print(f"\n读取\n{'':<22}{'项/秒':>12}{'第一条(ms)':>12}{'峰值内存(MB)':>14}")
+        for name, reader, paths, loads in reads:
+            r = report["read"][name] = measure_read(reader, paths, loads)
+            assert r["items"] == args.items
+            print(f"{name:<22}{r['items_per_second']:>12,}{r['first_item_ms']:>12.2f}{r['peak_mb']:>14.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+对比原先的四次 XPath 扫描改写方式与 LinkRewriter 单次遍历的吞吐量（文档/秒）
+
+测试页面仿照 www.ciomp.cas.cn 详情页的结构生成：顶部导航、栏目菜单、正文图片与附件、页脚友情链接，
+相对路径在每个页面上重复出现。计时前先检查 srcset 的改写结果（URL 中带逗号、描述符前是制表符或换行等）。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_link_rewrite.py
+    python benchmarks/bench_link_rewrite.py --pages 500 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from urllib.parse import urljoin
+
+import lxml.html
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newscraper.linkrewriter import LinkRewriter
+
+
+def make_page(i):
+    """生成一个 CAS 风格的新闻详情页"""
+    nav = "".join(
+        f'<td><a href="../../{section}/" class="nav">{section}</a></td>'
+        for section in ["jgsz", "kyjz", "rcjy", "hzjl", "kxcb", "dqjs", "cxwh", "xxgk"]
+    )
+    menu = "".join(f'<li><a href="../{sub}/">{sub}</a></li>' for sub in ["zhxw", "kydt", "tpxw", "mtjj"])
+    figures = "".join(
+        f'<p align="center"><img src="./W020250318{i:04d}{j}.jpg" border="0"></p>'
+        f"<p>正文第 {j} 段。长春光机所在光学领域取得新进展。</p>"
+        for j in range(8)
+    )
+    footer = "".join(
+        f'<a href="http://www.cas.cn/" target="_blank">中国科学院{j}</a>' for j in range(10)
+    )
+    return f"""<html><head>
+<meta charset="utf-8"><title>新闻标题 {i}</title>
+<link rel="stylesheet" href="../../../images/style.css">
+<link rel="shortcut icon" href="/favicon.ico">
+<script src="../../../images/jquery.min.js"></script>
+<script src="../../../images/common.js"></script>
+</head><body>
+<div style="background:url(../../../images/top_bg.jpg) no-repeat"><img src="../../../images/logo.png"></div>
+<table><tr>{nav}</tr></table>
+<ul>{menu}</ul>
+<table><tr align="right"><td width="20%" class="hui12_sj2">2025-03-18</td>
+<td align="center" width="22%">党委办公室</td></tr></table>
+{figures}
+<p><a href="./P020250318{i:04d}.pdf">附件下载</a> <a href="#top">返回顶部</a>
+<a href="javascript:window.print()">打印</a></p>
+<div>{footer}</div>
+</body></html>""".encode("utf-8")
+
+
+# (srcset, 以 SRCSET_BASE 为基准改写后的 srcset)
+SRCSET_BASE = "http://www.ciomp.cas.cn/xwdt/zhxw/202503/t20250318_1.html"
+SRCSET_CASES = [
+    ("a.jpg 1x, a@2x.jpg 2x",
+     "http://www.ciomp.cas.cn/xwdt/zhxw/202503/a.jpg 1x, http://www.ciomp.cas.cn/xwdt/zhxw/202503/a@2x.jpg 2x"),
+    # data: URI 和 CDN 变换参数中的逗号属于 URL
+    ("data:image/png;base64,iVBORw0= 1x, b.png 2x",
+     "data:image/png;base64,iVBORw0= 1x, http://www.ciomp.cas.cn/xwdt/zhxw/202503/b.png 2x"),
+    ("/cdn/w_400,h_300/c.jpg 400w, /cdn/w_800,h_600/c.jpg 800w",
+     "http://www.ciomp.cas.cn/cdn/w_400,h_300/c.jpg 400w, http://www.ciomp.cas.cn/cdn/w_800,h_600/c.jpg 800w"),
+    # URL 与描述符之间是制表符、换行或多个空格，原样保留
+    ("d.jpg\t1x,\n  e.jpg  \t2x",
+     "http://www.ciomp.cas.cn/xwdt/zhxw/202503/d.jpg\t1x,\n  http://www.ciomp.cas.cn/xwdt/zhxw/202503/e.jpg  \t2x"),
+    # URL 末尾的逗号是分隔符，候选项没有描述符
+    ("f.jpg, g.jpg 2x",
+     "http://www.ciomp.cas.cn/xwdt/zhxw/202503/f.jpg, http://www.ciomp.cas.cn/xwdt/zhxw/202503/g.jpg 2x"),
+    ("https://www.cas.cn/h.jpg 1x", "https://www.cas.cn/h.jpg 1x"),
+]
+
+
+def check_srcset(rewriter):
+    """用 LinkRewriter 改写 SRCSET_CASES，返回结果不符的 [(srcset, 期望, 实际)]"""
+    failures = []
+    for srcset, expected in SRCSET_CASES:
+        doc = lxml.html.fromstring("<html><body><img></body></html>")
+        doc.find(".//img").set("srcset", srcset)
+        rewriter.rewrite(doc, SRCSET_BASE)
+        actual = doc.find(".//img").get("srcset")
+        if actual != expected:
+            failures.append((srcset, expected, actual))
+    return failures
+
+
+def legacy_rewrite(doc, url):
+    """原 HtmlSavePipeline 中的四次扫描实现"""
+    for img in doc.xpath('//img'):
+        src = img.get('src')
+        if src and not src.startswith(('http://', 'https://', '//')):
+            img.set('src', urljoin(url, src))
+    for a in doc.xpath('//a'):
+        href = a.get('href')
+        if href and not href.startswith(('http://', 'https://', '//', '#', 'javascript:')):
+            a.set('href', urljoin(url, href))
+    for link in doc.xpath('//link'):
+        href = link.get('href')
+        if href and not href.startswith(('http://', 'https://', '//')):
+            link.set('href', urljoin(url, href))
+    for script in doc.xpath('//script'):
+        src = script.get('src')
+        if src and not src.startswith(('http://', 'https://', '//')):
+            script.set('src', urljoin(url, src))
+
+
+def run_full(rewrite, pages):
+    """解析、改写并序列化全部页面，返回耗时（秒）"""
+    start = time.perf_counter()
+    for url, body in pages:
+        doc = lxml.html.fromstring(body)
+        rewrite(doc, url)
+        lxml.html.tostring(doc, encoding="unicode", method="html")
+    return time.perf_counter() - start
+
+
+def run_rewrite_only(rewrite, docs):
+    start = time.perf_counter()
+    for url, doc in docs:
+        rewrite(doc, url)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="链接改写吞吐量对比")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [
+        (f"http://www.ciomp.cas.cn/xwdt/zhxw/202503/t20250318_{i}.html", make_page(i))
+        for i in range(args.pages)
+    ]
+    rewriter = LinkRewriter()
+    failures = check_srcset(rewriter)
+    for srcset, expected, actual in failures:
+        print(f"srcset 改写错误: {srcset!r}\n  期望 {expected!r}\n  实际 {actual!r}")
+    if failures:
+        sys.exit(1)
+    print(f"srcset 正确性检查: {len(SRCSET_CASES)} 项通过")
+
+    cases = [("四次 XPath 扫描", legacy_rewrite), ("LinkRewriter 单次遍历", rewriter.rewrite)]
+
+    print(f"页面数: {args.pages}, 重复: {args.repeat} 次（取中位数）")
+    print("-" * 64)
+    for name, rewrite in cases:
+        # 仅改写：文档预先解析好，每轮重新解析以免测到已改写的文档
+        rewrite_times = []
+        for _ in range(args.repeat):
+            docs = [(url, lxml.html.fromstring(body)) for url, body in pages]
+            rewrite_times.append(run_rewrite_only(rewrite, docs))
+        full_times = [run_full(rewrite, pages) for _ in range(args.repeat)]
+        print(
+            f"{name:<22} 仅改写: {args.pages / statistics.median(rewrite_times):>9.0f} 文档/秒   "
+            f"解析+改写+序列化: {args.pages / statistics.median(full_times):>7.0f} 文档/秒"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+对比 SQLite、Excel 与 Parquet 三种输出的写入吞吐量和下游读取（全表扫描）时间
+
+读取方式与分析人员的常见做法一致：SQLite 读出全部行，Excel 用只读模式遍历所有单元格，
+Parquet 用 pyarrow 读取整个数据集。
+
+用法（在 demo/newscraper 目录下运行，需要 pyarrow）:
+    python benchmarks/bench_parquet.py
+    python benchmarks/bench_parquet.py --items 1000000
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newscraper.pipelines import ParquetPipeline, SQLitePipeline, StreamingExcelPipeline
+
+AUTHORS = ["党委办公室", "科技处", "研究生部", "人事处", "产业处", "综合办公室"]
+
+
+class DummySpider:
+    name = "bench"
+    logger = logging.getLogger("bench")
+
+
+def make_item(i):
+    return {
+        "title": f"长春光机所新闻标题 {i}",
+        "publish_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+        "author": AUTHORS[i % len(AUTHORS)],
+        "url": f"http://www.ciomp.cas.cn/xwdt/zhxw/202503/t20250318_{i}.html",
+        "created_at": "2025-03-18 12:00:00",
+        "html_saved_path": None,
+    }
+
+
+def write(pipeline, items):
+    spider = DummySpider()
+    if hasattr(pipeline, "open_spider"):
+        pipeline.open_spider(spider)
+    start = time.perf_counter()
+    for item in items:
+        pipeline.process_item(item, spider)
+    pipeline.close_spider(spider)
+    return time.perf_counter() - start
+
+
+def scan_sqlite(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT title, publish_date, author, url, created_at FROM news").fetchall()
+    conn.close()
+    return len(rows)
+
+
+def scan_excel(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    count = sum(1 for sheet in workbook.worksheets for _ in sheet.iter_rows(min_row=2, values_only=True))
+    workbook.close()
+    return count
+
+
+def scan_parquet(path):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path).num_rows
+
+
+def size_of(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite / Excel / Parquet 输出对比")
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_parquet_")
+    items = [make_item(i) for i in range(args.items)]
+    cases = [
+        ("SQLite", os.path.join(workdir, "news.db"),
+         lambda p: SQLitePipeline(db_path=p, batch_size=1000), scan_sqlite),
+        ("Excel（流式）", os.path.join(workdir, "news.xlsx"),
+         lambda p: StreamingExcelPipeline(file_name=p, rows_per_file=10**7), scan_excel),
+        ("Parquet", os.path.join(workdir, "news_parquet"),
+         lambda p: ParquetPipeline(root=p), scan_parquet),
+    ]
+
+    print(f"数据项: {args.items}")
+    print(f"{'格式':<14}{'写入(项/秒)':>14}{'读取(秒)':>12}{'大小(MB)':>12}")
+    print("-" * 52)
+    try:
+        for name, path, make_pipeline, scan in cases:
+            seconds = write(make_pipeline(path), items)
+            start = time.perf_counter()
+            rows = scan(path)
+            scan_seconds = time.perf_counter() - start
+            assert rows == args.items, (name, rows)
+            print(
+                f"{name:<14}{args.items / seconds:>14.0f}{scan_seconds:>12.3f}"
+                f"{size_of(path) / 1024 / 1024:>12.2f}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
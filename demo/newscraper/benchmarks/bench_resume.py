@@ -0,0 +1,170 @@
+"""
+中断与恢复基准测试（FrontierScheduler）
+
+每一轮在随机时刻中断一次抓取，再用相同的 JOBDIR 恢复，统计:
+    - 恢复耗时：打开 frontier.db 并恢复调度状态的时间（frontier/resume_ms），以及恢复运行的总时间
+    - 重做的工作：两次运行都下载过的页面数（来自测试站点的请求计数）
+    - 丢失的数据：恢复完成后 news.db 中缺少的文章数
+    - 恢复运行结束时调度器仍在跟踪的已出队请求数（frontier/in_flight_at_close，应为 0）
+中断时刻在一次完整抓取耗时的 10%~90% 之间随机选取。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_resume.py --articles 1000 --trials 5
+    python benchmarks/bench_resume.py --articles 1000 --signal INT   # 模拟 Ctrl-C 正常关闭
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_site import FixtureSite, serve_in_thread  # noqa: E402
+
+BENCH_SETTINGS = {
+    "LOG_LEVEL": "ERROR",
+    "LATENCY_REPORT_PATH": None,
+    "TELNETCONSOLE_ENABLED": False,
+    "JOBDIR": "job",
+}
+
+
+def run_worker(list_url, out_path):
+    """在当前进程中运行一次抓取，结束后把 stats 写入 out_path"""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ["SCRAPY_SETTINGS_MODULE"] = "newscraper.settings"
+
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    for name, value in BENCH_SETTINGS.items():
+        settings.set(name, value, priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("newsspider")
+    process.crawl(crawler, list_url=list_url)
+    process.start()
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(crawler.stats.get_stats(), f, default=str)
+
+
+def start_crawl(workdir, list_url):
+    out_path = os.path.join(workdir, "stats.json")
+    command = [sys.executable, os.path.abspath(__file__), "--worker", "--list-url", list_url, "--out", out_path]
+    return subprocess.Popen(command, cwd=workdir), out_path
+
+
+def stored_articles(workdir):
+    db_path = os.path.join(workdir, "news.db")
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def full_run(site, list_url):
+    """不中断地完整抓取一次，返回耗时"""
+    workdir = tempfile.mkdtemp(prefix="bench_resume_")
+    try:
+        start = time.perf_counter()
+        process, _ = start_crawl(workdir, list_url)
+        process.wait()
+        return time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def trial(site, list_url, kill_after, sig):
+    workdir = tempfile.mkdtemp(prefix="bench_resume_")
+    try:
+        site.hits.clear()
+        process, _ = start_crawl(workdir, list_url)
+        time.sleep(kill_after)
+        process.send_signal(sig)
+        process.wait()
+        first = set(site.hits)
+        stored_before = stored_articles(workdir)
+
+        site.hits.clear()
+        start = time.perf_counter()
+        process, out_path = start_crawl(workdir, list_url)
+        process.wait()
+        resume_seconds = time.perf_counter() - start
+        second = set(site.hits)
+
+        with open(out_path, encoding="utf-8") as f:
+            stats = json.load(f)
+        return {
+            "kill_after": round(kill_after, 2),
+            "stored_before": stored_before,
+            "resume_ms": stats.get("frontier/resume_ms", 0.0),
+            "resume_seconds": round(resume_seconds, 3),
+            "pending": stats.get("frontier/resumed_pending", 0),
+            "requeued": stats.get("frontier/redone", 0),
+            "redone_pages": len(first & second),
+            "missing": site.articles - stored_articles(workdir),
+            "in_flight_at_close": stats.get("frontier/in_flight_at_close", 0),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中断与恢复基准测试")
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--trials", type=int, default=3)
+    parser.add_argument("--signal", default="KILL", choices=("KILL", "INT", "TERM"), help="中断方式")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--list-url", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.list_url, args.out)
+        return
+
+    rng = random.Random(args.seed)
+    sig = getattr(signal, f"SIG{args.signal}")
+    site = FixtureSite(articles=args.articles)
+    server, list_url = serve_in_thread(site)
+    try:
+        baseline = full_run(site, list_url)
+        print(f"测试站点: {list_url}  ({args.articles} 篇文章)，完整抓取耗时 {baseline:.2f}s")
+        results = [trial(site, list_url, rng.uniform(0.1, 0.9) * baseline, sig) for _ in range(args.trials)]
+    finally:
+        server.shutdown()
+
+    print(f"{'中断时刻(秒)':>12}{'已入库':>8}{'打开(ms)':>10}{'恢复运行(秒)':>14}{'待抓取':>8}"
+          f"{'重新排队':>10}{'重复下载':>10}{'缺失':>6}{'未清理':>8}")
+    for r in results:
+        print(
+            f"{r['kill_after']:>12.2f}{r['stored_before']:>8}{r['resume_ms']:>10.1f}{r['resume_seconds']:>14.2f}"
+            f"{r['pending']:>8}{r['requeued']:>10}{r['redone_pages']:>10}{r['missing']:>6}{r['in_flight_at_close']:>8}"
+        )
+    print(f"\n重复下载页面数中位数: {statistics.median(r['redone_pages'] for r in results)}，"
+          f"打开 frontier.db 中位数: {statistics.median(r['resume_ms'] for r in results):.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"baseline_seconds": round(baseline, 3), "trials": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
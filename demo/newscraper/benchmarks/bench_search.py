@@ -0,0 +1,179 @@
+"""
+全文索引（newscraper/search.py）的建索引成本和查询延迟
+
+按 SearchIndexPipeline 的方式（每批 --batch 篇一个事务）向空数据库追加合成文章，记录:
+    - 每 1 万篇的建索引耗时和磁盘占用（数据库文件 + WAL，在每个检查点执行 WAL checkpoint 后测量）
+    - 在每个检查点（默认 1 万、10 万、100 万篇）上不同选择度的查询延迟（中位数和 p95）
+
+合成文章由约 3000 个按 Zipf 分布出现的 2~4 字词组成，常见词几乎每篇都有，罕见词只出现在少数文章中。
+正文提取（lxml）不计入，只测 FTS5 写入和查询本身。命中超过 --candidates 篇的查询按入库顺序返回，
+其余按 bm25 排序（见 SearchIndex.query）。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --checkpoints 10000,100000,1000000 --chars 800 --json search.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from newscraper.search import SearchIndex, match_query
+
+HAN = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+    "十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全"
+    "表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象"
+    "员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据"
+    "处队南给色光门即保治北造百规热领七海口东导器压志世金增争济阶油思术极交受联什认六共权收证改清己美再采转更单风切打白教速花带安场身车"
+    "例真务具万每目至达走积示议声报斗完类八离华名确才科张信马节话米整空元况今集温传土许步群广石记需段研界拉林律叫且究观越织装影算低持音"
+)
+def make_vocabulary(size, seed=0):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(HAN, k=rng.choice((2, 2, 3, 4)))))
+    return sorted(words)
+
+
+class Corpus:
+    """按 Zipf 分布生成文章，第 i 篇文章的内容只由种子和 i 决定"""
+
+    def __init__(self, vocabulary, chars, seed=0):
+        self.vocabulary = vocabulary
+        self.words_per_article = max(1, chars // 3)
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        total = sum(weights)
+        self.cum_weights = []
+        acc = 0.0
+        for weight in weights:
+            acc += weight / total
+            self.cum_weights.append(acc)
+        self.rng = random.Random(seed)
+
+    def article(self, i):
+        words = self.rng.choices(self.vocabulary, cum_weights=self.cum_weights, k=self.words_per_article)
+        sentences = ["".join(words[j : j + 8]) + "。" for j in range(0, len(words), 8)]
+        title = "".join(words[:3]) + f" {i}"
+        return f"http://www.ciomp.cas.cn/xwdt/zhxw/a/t_{i}.html", title, "".join(sentences)
+
+    def queries(self):
+        vocab = self.vocabulary
+        return [
+            ("常见单字", vocab[0][0]),
+            ("常见词", vocab[0]),
+            ("两个常见词 AND", f"{vocab[1]} {vocab[2]}"),
+            ("中等频率词", vocab[len(vocab) // 20]),
+            ("罕见词", vocab[-1]),
+            ("不存在的词", "光机所量子纠缠"),
+        ]
+
+
+def disk_bytes(db_path):
+    return sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+
+
+def measure_queries(index, queries, repeat, limit, candidates):
+    results = []
+    for name, query in queries:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = index.query(query, limit, candidates)
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        hits = index.conn.execute(
+            "SELECT COUNT(*) FROM search_fts WHERE search_fts MATCH ?", (match_query(query),)
+        ).fetchone()[0]
+        results.append(
+            {
+                "query": name,
+                "text": query,
+                "matches": hits,
+                "returned": len(rows),
+                "median_ms": round(statistics.median(times), 3),
+                "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+            }
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文索引建索引成本和查询延迟")
+    parser.add_argument("--checkpoints", default="10000,100000,1000000", help="逗号分隔的文章数检查点")
+    parser.add_argument("--chars", type=int, default=800, help="每篇文章正文的大致字数")
+    parser.add_argument("--batch", type=int, default=200, help="每个事务写入的篇数（同 SEARCH_INDEX_BATCH_SIZE）")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询执行的次数")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=2000, help="SearchIndex.query 的 max_candidates，0 表示总是按 bm25 排序")
+    parser.add_argument("--optimize", action="store_true", help="在每个检查点合并索引段后再查询")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    checkpoints = sorted(int(c) for c in args.checkpoints.split(","))
+    corpus = Corpus(make_vocabulary(3000), args.chars)
+    workdir = tempfile.mkdtemp(prefix="bench_search_")
+    db_path = os.path.join(workdir, "news.db")
+    index = SearchIndex(db_path)
+    report = {"chars": args.chars, "batch": args.batch, "checkpoints": []}
+
+    print(f"正文约 {args.chars} 字，每批 {args.batch} 篇，数据库: {db_path}")
+    print(f"{'文章数':>10}{'每万篇耗时(s)':>16}{'每万篇磁盘(MB)':>16}{'总大小(MB)':>12}")
+    try:
+        written = 0
+        index_seconds = 0.0
+        for checkpoint in checkpoints:
+            segment_start, segment_bytes = written, disk_bytes(db_path)
+            segment_seconds = 0.0
+            while written < checkpoint:
+                count = min(args.batch, checkpoint - written)
+                docs = [corpus.article(i) for i in range(written, written + count)]
+                start = time.perf_counter()
+                index.add_batch(docs)
+                segment_seconds += time.perf_counter() - start
+                written += count
+            index_seconds += segment_seconds
+            index.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if args.optimize:
+                index.optimize()
+                index.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+            size = disk_bytes(db_path)
+            per_10k_seconds = segment_seconds / (written - segment_start) * 10000
+            per_10k_mb = (size - segment_bytes) / (written - segment_start) * 10000 / 1024 / 1024
+            print(f"{written:>10,}{per_10k_seconds:>16.2f}{per_10k_mb:>16.1f}{size / 1024 / 1024:>12.1f}")
+            queries = measure_queries(index, corpus.queries(), args.repeat, args.limit, args.candidates)
+            for q in queries:
+                print(
+                    f"{'':>10}  {q['query']:<14} 命中 {q['matches']:>9,}  "
+                    f"中位数 {q['median_ms']:>8.2f} ms  p95 {q['p95_ms']:>8.2f} ms"
+                )
+            report["checkpoints"].append(
+                {
+                    "articles": written,
+                    "index_seconds_per_10k": round(per_10k_seconds, 3),
+                    "disk_mb_per_10k": round(per_10k_mb, 2),
+                    "disk_mb_total": round(size / 1024 / 1024, 1),
+                    "index_seconds_total": round(index_seconds, 1),
+                    "queries": queries,
+                }
+            )
+    finally:
+        index.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
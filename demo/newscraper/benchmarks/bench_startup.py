@@ -0,0 +1,237 @@
+"""
+启动成本：从进程启动到发出第一个请求的时间，以及每个输出目标（newscraper/sinks.py）的加载成本
+
+1. 每个输出目标单独在一个新进程中加载：先导入 Scrapy、爬虫、调度器和中间件（每次抓取都要导入的部分），
+   再构造该输出目标的管道并调用 open_spider，记录构造（含导入依赖）和打开的耗时、新导入的模块数；
+   构造耗时包含导入 newscraper/pipelines.py 本身，各输出目标相同
+2. 用不同的 SINKS 抓取本地测试站点（文章很少），记录从启动进程到第一个请求到达下载器的时间、
+   整个抓取的墙钟时间和进程导入的模块总数；每种配置运行 --repeat 次取中位数
+   --rev 可以加入一个旧提交（在临时 git worktree 中运行，全部管道都启用）作为对照
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 7 --rev HEAD~1 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+
+BENCH_SETTINGS = {
+    "LOG_LEVEL": "ERROR",
+    "INCREMENTAL_ENABLED": False,
+    "CONDITIONAL_GET_ENABLED": False,
+    "ROBOTSTXT_OBEY": False,
+    "TELNETCONSOLE_ENABLED": False,
+}
+# 只统计这些依赖是否被导入
+HEAVY_MODULES = ["openpyxl", "pyarrow"]
+
+
+def sink_worker(name, out_path):
+    """在当前进程中加载一个输出目标，把结果写入 out_path"""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ["SCRAPY_SETTINGS_MODULE"] = "newscraper.settings"
+
+    from scrapy.utils.misc import build_from_crawler, load_object
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.reactor import install_reactor
+    from scrapy.utils.test import get_crawler
+
+    import newscraper.extensions  # noqa: F401
+    import newscraper.frontier  # noqa: F401
+    import newscraper.middlewares  # noqa: F401
+    from newscraper.sinks import SINKS
+    from newscraper.spiders.newsspider import newsspider
+
+    settings = get_project_settings()
+    install_reactor(settings["TWISTED_REACTOR"])
+    crawler = get_crawler(newsspider, {**settings.copy_to_dict(), **BENCH_SETTINGS})
+    spider = newsspider.from_crawler(crawler)
+    modules_before = set(sys.modules)
+
+    start = time.perf_counter()
+    pipeline = build_from_crawler(load_object(SINKS[name][0]), crawler)
+    construct_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    if hasattr(pipeline, "open_spider"):
+        pipeline.open_spider(spider)
+    open_ms = (time.perf_counter() - start) * 1000
+    imported = sorted(set(sys.modules) - modules_before)
+    if hasattr(pipeline, "close_spider"):
+        pipeline.close_spider(spider)
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "sink": name,
+                "construct_ms": round(construct_ms, 2),
+                "open_ms": round(open_ms, 2),
+                "modules_imported": len(imported),
+                "heavy": [m for m in HEAVY_MODULES if m in imported],
+            },
+            f,
+        )
+
+
+def crawl_worker(project_dir, list_url, out_path, started, overrides):
+    """在当前进程中运行一次抓取，记录第一个请求到达下载器的时间"""
+    sys.path.insert(0, project_dir)
+    os.environ["SCRAPY_SETTINGS_MODULE"] = "newscraper.settings"
+
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    for name, value in {**BENCH_SETTINGS, **overrides}.items():
+        settings.set(name, value, priority="cmdline")
+
+    first_request = []
+
+    def request_reached_downloader(request, spider):
+        if not first_request:
+            first_request.append(time.time() - started)
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("newsspider")
+    crawler.signals.connect(request_reached_downloader, signal=signals.request_reached_downloader)
+    process.crawl(crawler, list_url=list_url)
+    process.start()
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "first_request_ms": round(first_request[0] * 1000, 1) if first_request else None,
+                "total_ms": round((time.time() - started) * 1000, 1),
+                "items": crawler.stats.get_value("item_scraped_count", 0),
+                "modules": len(sys.modules),
+                "heavy": [m for m in HEAVY_MODULES if m in sys.modules],
+            },
+            f,
+        )
+
+
+def run_child(args):
+    """在全新的临时目录中启动子进程，返回其结果"""
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    out_path = os.path.join(workdir, "result.json")
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *args, "--out", out_path, "--started", repr(time.time())],
+            cwd=workdir,
+            check=True,
+        )
+        with open(out_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def median_result(results):
+    merged = dict(results[0])
+    for key in ("first_request_ms", "total_ms", "construct_ms", "open_ms"):
+        values = [r[key] for r in results if r.get(key) is not None]
+        if values:
+            merged[key] = statistics.median(values)
+    return merged
+
+
+def worktree(rev):
+    """把 rev 检出到临时 worktree，返回 (仓库, worktree 路径, 其中的项目目录)"""
+    repo = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], cwd=PROJECT_DIR, check=True, capture_output=True, text=True
+    ).stdout.strip()
+    path = tempfile.mkdtemp(prefix=f"bench_{rev.replace('/', '_').replace('~', '_')}_")
+    subprocess.run(["git", "worktree", "add", "--detach", path, rev], cwd=repo, check=True, capture_output=True)
+    return repo, path, os.path.join(path, os.path.relpath(PROJECT_DIR, repo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动成本基准测试")
+    parser.add_argument("--articles", type=int, default=20, help="测试站点的文章数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--sinks", action="append", metavar="SINKS",
+        help="要对比的 SINKS 取值，可重复，默认: 全部、sqlite,archive、sqlite、空",
+    )
+    parser.add_argument("--rev", help="加入一个旧提交作为对照")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--sink-worker", help=argparse.SUPPRESS)
+    parser.add_argument("--crawl-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--project", default=PROJECT_DIR, help=argparse.SUPPRESS)
+    parser.add_argument("--list-url", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--started", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("-s", dest="settings", action="append", metavar="NAME=VALUE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sink_worker:
+        sink_worker(args.sink_worker, args.out)
+        return
+    if args.crawl_worker:
+        overrides = dict(pair.partition("=")[::2] for pair in args.settings or [])
+        crawl_worker(args.project, args.list_url, args.out, args.started, overrides)
+        return
+
+    sys.path.insert(0, PROJECT_DIR)
+    from newscraper.sinks import SINKS
+
+    print(f"{'输出目标':<10}{'构造(ms)':>10}{'打开(ms)':>10}{'新导入模块':>12}  重量级依赖")
+    sink_costs = []
+    for name in SINKS:
+        r = median_result([run_child(["--sink-worker", name]) for _ in range(args.repeat)])
+        sink_costs.append(r)
+        print(
+            f"{name:<10}{r['construct_ms']:>10.1f}{r['open_ms']:>10.1f}{r['modules_imported']:>12}  "
+            f"{', '.join(r['heavy']) or '-'}"
+        )
+
+    site = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fixture_site.py"), "--articles", str(args.articles), "--port", "0"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    list_url = site.stdout.readline().strip()
+    variants = [(f"SINKS={value}", PROJECT_DIR, value) for value in (args.sinks or [",".join(SINKS), "sqlite,archive", "sqlite", ""])]
+    trees = []
+    crawls = {}
+    try:
+        if args.rev:
+            repo, path, project_dir = worktree(args.rev)
+            trees.append((repo, path))
+            variants.insert(0, (args.rev, project_dir, None))
+        for label, project_dir, sinks in variants:
+            command = ["--crawl-worker", "--project", project_dir, "--list-url", list_url]
+            if sinks is not None:
+                command += ["-s", f"SINKS={sinks}"]
+            crawls[label] = median_result([run_child(command) for _ in range(args.repeat)])
+    finally:
+        site.terminate()
+        for repo, path in trees:
+            subprocess.run(["git", "worktree", "remove", "--force", path], cwd=repo, capture_output=True)
+
+    print(f"\n测试站点 {args.articles} 篇文章，每种配置运行 {args.repeat} 次取中位数")
+    print(f"{'配置':<52}{'首个请求(ms)':>14}{'总耗时(ms)':>12}{'数据项':>8}{'模块数':>8}  重量级依赖")
+    for label, r in crawls.items():
+        print(
+            f"{label:<52}{r['first_request_ms']:>14.0f}{r['total_ms']:>12.0f}{r['items']:>8}{r['modules']:>8}  "
+            f"{', '.join(r['heavy']) or '-'}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"sinks": sink_costs, "crawls": crawls}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+本地测试站点：模拟 www.ciomp.cas.cn/xwdt/zhxw/ 栏目的结构，用于离线测试和基准测试
+
+    /xwdt/zhxw/                      第 0 页列表页
+    /xwdt/zhxw/index_<n>.html        第 n 页列表页，每页若干个 a.font06 文章链接，按发布日期从新到旧
+    /xwdt/zhxw/<YYYYMM>/t<YYYYMMDD>_<id>.html   文章详情页，含 hui12_sj2 日期单元格
+
+可以模拟服务器延迟：每个请求耗时 --latency 秒，同时处理的请求超过 --capacity 个时
+按比例变慢（排队），超过 2 倍 capacity 时直接返回 503，用于测试自适应并发控制。
+
+每篇文章的正文由文章编号决定、互不相同；--duplicates 指定比例的文章转载一篇较早的文章
+（正文相同，标题、日期和来源不同），用于测试近似重复检测。
+
+所有页面都带 ETag 和 Last-Modified，并支持 If-None-Match / If-Modified-Since 条件请求（返回 304）。
+
+用法（在 demo/newscraper 目录下运行）:
+    python benchmarks/fixture_site.py --articles 1000 --port 8000
+    scrapy crawl newsspider -a list_url=http://127.0.0.1:8000/xwdt/zhxw/
+"""
+
+import argparse
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LIST_PATH = "/xwdt/zhxw/"
+LAST_MODIFIED = formatdate(1735689600, usegmt=True)  # 2025-01-01 00:00:00 GMT
+_LIST_RE = re.compile(r"^/xwdt/zhxw/(?:index_(\d+)\.html)?$")
+_DETAIL_RE = re.compile(r"^/xwdt/zhxw/\d{6}/t\d{8}_(\d+)\.html$")
+_TOPICS = ["光学", "精密机械", "空间遥感", "激光器", "光电探测", "航天相机", "半导体", "量子光学", "光谱仪", "望远镜"]
+_EVENTS = ["召开工作会议", "举办学术报告", "签署合作协议", "通过项目验收", "开展科普活动", "获得专利授权", "接待来访", "发布研究成果"]
+_HAN = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经"
+    "十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全"
+    "表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象"
+)
+_WORDS = sorted({"".join(random.Random(i).choices(_HAN, k=2 + i % 2)) for i in range(3000)})
+
+
+class FixtureSite:
+    """按文章数生成列表页和详情页，页面内容只由参数决定，便于重复测试"""
+
+    def __init__(
+        self, articles=1000, per_page=20, paragraphs=20, newest=date(2025, 3, 18), latency=0.0, capacity=0, duplicates=0.0
+    ):
+        self.articles = articles
+        self.per_page = per_page
+        self.paragraphs = paragraphs
+        self.newest = newest
+        # 模拟延迟：基础延迟（秒）和服务器同时处理请求的能力，capacity 为 0 表示不限
+        self.latency = latency
+        self.capacity = capacity
+        # 转载较早文章的比例
+        self.duplicates = duplicates
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        # 每个路径被请求的次数（含 304 和 404），用于统计重复下载
+        self.hits = Counter()
+
+    @property
+    def pages(self):
+        return max(1, -(-self.articles // self.per_page))
+
+    def article_date(self, article_id):
+        # 文章 0 最新，每天两篇
+        return self.newest - timedelta(days=article_id // 2)
+
+    def article_path(self, article_id):
+        d = self.article_date(article_id)
+        return f"{LIST_PATH}{d:%Y%m}/t{d:%Y%m%d}_{article_id}.html"
+
+    def source_article(self, article_id):
+        """转载文章返回被转载的较早文章编号，原创文章返回自身编号"""
+        while True:
+            rng = random.Random(article_id * 7919)
+            if not (article_id + 1 < self.articles and rng.random() < self.duplicates):
+                return article_id
+            # 被转载的文章本身也可能是转载，一直追溯到原创文章
+            article_id = rng.randrange(article_id + 1, min(self.articles, article_id + 50))
+
+    def is_duplicate(self, article_id):
+        return self.source_article(article_id) != article_id
+
+    def paragraph_text(self, article_id, j):
+        rng = random.Random(article_id * 1000 + j)
+        return f"{rng.choice(_TOPICS)}研究室{rng.choice(_EVENTS)}，{''.join(rng.choices(_WORDS, k=12))}。"
+
+    def list_page(self, page):
+        if page >= self.pages:
+            return None
+        start = page * self.per_page
+        rows = "".join(
+            f'<tr><td><a class="font06" href="./{self.article_path(i)[len(LIST_PATH):]}">'
+            f"新闻标题 {i}</a></td><td>{self.article_date(i):%Y-%m-%d}</td></tr>"
+            for i in range(start, min(start + self.per_page, self.articles))
+        )
+        return (
+            "<html><head><meta charset=\"utf-8\"><title>综合新闻</title></head>"
+            f"<body><table>{rows}</table></body></html>"
+        )
+
+    def detail_page(self, article_id):
+        if article_id >= self.articles:
+            return None
+        # 转载文章的正文与原文相同，标题、日期和来源不同
+        source = self.source_article(article_id)
+        paragraphs = "".join(
+            f"<p>{self.paragraph_text(source, j)}</p>"
+            f'<p align="center"><img src="./W0{article_id}{j}.jpg"></p>'
+            for j in range(self.paragraphs)
+        )
+        origin = "党委办公室" if source == article_id else f"转自综合新闻 {source}"
+        return f"""<html><head><meta charset="utf-8"><title>新闻标题 {article_id}</title>
+<link rel="stylesheet" href="../../../images/style.css">
+<script src="../../../images/common.js"></script></head>
+<body><div><a href="../../../">首页</a> <a href="../">综合新闻</a></div>
+<table><tr align="right"><td width="20%" class="hui12_sj2">{self.article_date(article_id):%Y-%m-%d}</td>
+<td align="center" width="22%">{origin}</td></tr></table>
+{paragraphs}
+<p><a href="./P0{article_id}.pdf">附件</a></p></body></html>"""
+
+    def simulate_load(self):
+        """按当前并发请求数模拟处理耗时，过载时返回 False"""
+        with self.lock:
+            self.in_flight += 1
+            load = self.in_flight / self.capacity if self.capacity else 1.0
+        try:
+            if load > 2:
+                return False
+            if self.latency:
+                time.sleep(self.latency * max(1.0, load))
+            return True
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def render(self, path):
+        """返回页面 HTML，不存在时返回 None"""
+        match = _LIST_RE.match(path)
+        if match:
+            return self.list_page(int(match.group(1) or 0))
+        match = _DETAIL_RE.match(path)
+        if match:
+            return self.detail_page(int(match.group(1)))
+        return None
+
+
+class FixtureServer(ThreadingHTTPServer):
+    # 默认的 listen 队列只有 5，爬虫同时建立多个连接时会溢出，客户端要等 1 秒重发 SYN
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            site.hits[path] += 1
+            if not site.simulate_load():
+                self._send(503, b"Service Unavailable", {})
+                return
+            html = site.render(path)
+            if html is None:
+                self._send(404, b"Not Found", {})
+                return
+
+            body = html.encode("utf-8")
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            headers = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+
+            if self._not_modified(etag):
+                self._send(304, b"", headers)
+                return
+            headers["Content-Type"] = "text/html; charset=utf-8"
+            self._send(200, body, headers)
+
+        def _not_modified(self, etag):
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                return etag in [tag.strip() for tag in if_none_match.split(",")]
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(LAST_MODIFIED)
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+        def _send(self, status, body, headers):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if status != 304:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve_in_thread(site, host="127.0.0.1", port=0):
+    """在后台线程启动站点，返回 (server, 列表页 URL)，用完调用 server.shutdown()"""
+    server = FixtureServer((host, port), make_handler(site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}{LIST_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地测试站点")
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=20, help="每篇文章的段落数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--capacity", type=int, default=0, help="服务器同时处理的请求数，超过后变慢，0 表示不限")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="转载较早文章的比例，用于测试近似重复检测")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    site = FixtureSite(
+        articles=args.articles,
+        per_page=args.per_page,
+        paragraphs=args.paragraphs,
+        latency=args.latency,
+        capacity=args.capacity,
+        duplicates=args.duplicates,
+    )
+    server = FixtureServer((args.host, args.port), make_handler(site))
+    # --port 0 时由系统分配端口；第一行输出列表页 URL，供 bench_crawl.py 读取
+    print(f"http://{args.host}:{server.server_address[1]}{LIST_PATH}", flush=True)
+    print(f"{args.articles} 篇文章, {site.pages} 页", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+按内容寻址、压缩存储的 HTML 归档
+
+原先每篇文章保存为 html_files/<标题>.html：标题相同的文章会互相覆盖，
+数量多了以后大量小文件也不利于列目录、备份和 rsync。
+
+HtmlArchive 把页面追加写入少量的大段文件（segment），目录结构如下:
+    html_archive/
+        segment-00001.seg   # 依次追加的记录: 头部(魔数、长度、sha256) + zlib 压缩后的 HTML
+        segment-00002.seg   # 段文件写满 max_segment_bytes 后切换到新文件
+        index.db            # SQLite 索引: 内容哈希 -> (段文件, 偏移, 长度)，URL -> 内容哈希
+
+相同内容（sha256 相同）只存一份；读取时对段文件做内存映射，按偏移随机访问。
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import struct
+import zlib
+
+MAGIC = b"NSA1"
+# 记录头: 魔数、压缩后长度、原文 sha256
+HEADER = struct.Struct(">4sI32s")
+
+
+def compress_html(html):
+    """计算内容哈希并压缩，返回 (十六进制哈希, 压缩数据)
+
+    纯函数，可以在工作线程或工作进程中执行。
+    """
+    raw = html.encode("utf-8") if isinstance(html, str) else html
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, 6)
+
+
+class HtmlArchive:
+    """HTML 归档的读写接口"""
+
+    def __init__(self, root="html_archive", max_segment_bytes=256 * 1024 * 1024):
+        self.root = root
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(root, exist_ok=True)
+
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                segment TEXT,
+                offset INTEGER,
+                length INTEGER
+            )
+        """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                hash TEXT,
+                title TEXT
+            )
+        """
+        )
+        self.conn.commit()
+
+        self.segment = None
+        self.segment_file = None
+        self.maps = {}
+        self._open_segment()
+
+    def _segment_names(self):
+        return sorted(f for f in os.listdir(self.root) if f.endswith(".seg"))
+
+    def _open_segment(self):
+        """继续追加最后一个未写满的段文件，否则新建一个"""
+        names = self._segment_names()
+        if names and os.path.getsize(os.path.join(self.root, names[-1])) < self.max_segment_bytes:
+            name = names[-1]
+        else:
+            name = f"segment-{len(names) + 1:05d}.seg"
+        if self.segment_file is not None:
+            self.segment_file.close()
+        self.segment = name
+        self.segment_file = open(os.path.join(self.root, name), "ab")
+
+    def put(self, url, digest, data, title=None):
+        """保存一个页面，data 为 compress_html 的压缩结果
+
+        返回 True 表示写入了新内容，False 表示内容已存在只记录了 URL 映射。
+        """
+        row = self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        is_new = row is None
+
+        if is_new:
+            if self.segment_file.tell() >= self.max_segment_bytes:
+                self._open_segment()
+            offset = self.segment_file.tell() + HEADER.size
+            self.segment_file.write(HEADER.pack(MAGIC, len(data), bytes.fromhex(digest)))
+            self.segment_file.write(data)
+            # 先把数据写到操作系统，再提交索引，索引中的记录总能读到完整数据
+            self.segment_file.flush()
+            self.conn.execute(
+                "INSERT INTO blobs (hash, segment, offset, length) VALUES (?, ?, ?, ?)",
+                (digest, self.segment, offset, len(data)),
+            )
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (url, hash, title) VALUES (?, ?, ?)",
+            (url, digest, title),
+        )
+        self.conn.commit()
+        return is_new
+
+    def location(self, digest):
+        """返回指向归档内容的路径，写入 item 的 html_saved_path"""
+        return f"{self.root}#{digest}"
+
+    def get(self, url):
+        """按 URL 读取页面，返回 HTML 文本，不存在时返回 None"""
+        row = self.conn.execute("SELECT hash FROM pages WHERE url = ?", (url,)).fetchone()
+        return None if row is None else self.get_by_hash(row[0])
+
+    def get_by_hash(self, digest):
+        """按内容哈希读取页面，返回 HTML 文本，不存在时返回 None"""
+        row = self.conn.execute(
+            "SELECT segment, offset, length FROM blobs WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length = row
+        view = self._map(segment, offset + length)
+        return zlib.decompress(view[offset : offset + length]).decode("utf-8")
+
+    def _map(self, segment, min_size):
+        """返回段文件的只读内存映射，文件追加后映射不够长时重新映射"""
+        mapped = self.maps.get(segment)
+        if mapped is None or len(mapped) < min_size:
+            if segment == self.segment:
+                self.segment_file.flush()
+            if mapped is not None:
+                mapped.close()
+            with open(os.path.join(self.root, segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[segment] = mapped
+        return mapped
+
+    def raw_pages(self):
+        """遍历归档中的所有页面，返回 (url, 内容哈希, 压缩数据, 标题)，用于合并归档"""
+        rows = self.conn.execute(
+            "SELECT pages.url, pages.hash, pages.title, blobs.segment, blobs.offset, blobs.length "
+            "FROM pages JOIN blobs ON pages.hash = blobs.hash"
+        ).fetchall()
+        for url, digest, title, segment, offset, length in rows:
+            view = self._map(segment, offset + length)
+            yield url, digest, bytes(view[offset : offset + length]), title
+
+    def urls(self):
+        """遍历归档中的所有 URL"""
+        for (url,) in self.conn.execute("SELECT url FROM pages"):
+            yield url
+
+    def close(self):
+        for mapped in self.maps.values():
+            mapped.close()
+        self.maps.clear()
+        if self.segment_file is not None:
+            self.segment_file.close()
+            self.segment_file = None
+        self.conn.close()
@@ -0,0 +1,241 @@
+"""
+声明式的字段清洗规则
+
+每个字段配置一串规则名，爬虫启动时编译为函数列表，之后对每个数据项只做函数调用:
+
+    CLEANING_RULES = {
+        "title": ["whitespace"],
+        "publish_date": ["halfwidth", "whitespace", "date"],
+        "author": ["halfwidth", "whitespace"],
+    }
+
+可用的规则:
+    whitespace  去掉零宽字符，连续空白（含全角空格、&nbsp;）合并为一个空格，去掉首尾空白
+    halfwidth   全角字母、数字、符号转换为半角
+    date        识别 "2025-03-18"、"2025/3/18"、"2025.03.18"、"2025年03月18日"、"20250318"
+                等格式，输出 ISO 日期 "2025-03-18"，无法识别时为 None
+
+同一个网站的日期格式几乎总是相同的，date 规则记住上一次匹配成功的格式并优先尝试，
+只有格式变化时才依次尝试其他格式；相同的原始值直接查缓存。
+
+NewsPipeline 对每个数据项调用 clean_item；批量处理（例如重新清洗已有数据库）用 clean_batch，
+按字段逐列处理，减少每个数据项的属性查找和函数分派开销:
+
+    python -m newscraper.cleaning news.db      # 把已入库数据的 publish_date 规范为 ISO 日期
+"""
+
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import date
+
+from itemadapter import ItemAdapter
+
+DEFAULT_RULES = {
+    "title": ["whitespace"],
+    "publish_date": ["halfwidth", "whitespace", "date"],
+    "author": ["halfwidth", "whitespace"],
+}
+
+# 全角 ！到 ～ 对应半角 ! 到 ~，全角空格对应半角空格
+_HALFWIDTH = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_HALFWIDTH[0x3000] = 0x20
+_FULLWIDTH = re.compile("[\uff01-\uff5e\u3000]")
+_ZERO_WIDTH = re.compile("[\u200b\u200c\u200d\u2060\ufeff]+")
+_SPACES = re.compile(r"\s+")
+
+
+def whitespace_rule():
+    remove_zero_width = _ZERO_WIDTH.sub
+    collapse = _SPACES.sub
+
+    def whitespace(value):
+        return collapse(" ", remove_zero_width("", value)).strip()
+
+    return whitespace
+
+
+def halfwidth_rule():
+    # 绝大多数值不含全角字符，先用正则判断，避免逐字符查表
+    search = _FULLWIDTH.search
+
+    def halfwidth(value):
+        return value.translate(_HALFWIDTH) if search(value) else value
+
+    return halfwidth
+
+
+class DateRule:
+    """把各种常见写法的日期转换为 ISO 格式，记住上一次成功的格式"""
+
+    FORMATS = [
+        ("iso", re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")),
+        ("cjk", re.compile(r"(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})")),
+        ("slash", re.compile(r"(\d{4})/(\d{1,2})/(\d{1,2})")),
+        ("dot", re.compile(r"(\d{4})\.(\d{1,2})\.(\d{1,2})")),
+        ("compact", re.compile(r"(?<!\d)(\d{4})(\d{2})(\d{2})(?!\d)")),
+    ]
+    CACHE_SIZE = 10000
+
+    def __init__(self):
+        self.last = 0
+        self.cache = {}
+        # 每种格式识别出的值的个数（缓存命中的值不重复计数），以及无法识别的次数
+        self.detections = Counter()
+        self.unparsed = 0
+
+    def __call__(self, value):
+        result = self.cache.get(value)
+        if result is None and value not in self.cache:
+            result = self._parse(value)
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.clear()
+            self.cache[value] = result
+        return result
+
+    def _parse(self, value):
+        result = self._try(self.last, value)
+        if result is not None:
+            self.detections[self.FORMATS[self.last][0]] += 1
+            return result
+        for index in range(len(self.FORMATS)):
+            if index != self.last:
+                result = self._try(index, value)
+                if result is not None:
+                    self.last = index
+                    self.detections[self.FORMATS[index][0]] += 1
+                    return result
+        self.unparsed += 1
+        return None
+
+    def _try(self, index, value):
+        match = self.FORMATS[index][1].search(value)
+        if match is None:
+            return None
+        try:
+            return date(*map(int, match.groups())).isoformat()
+        except ValueError:
+            return None
+
+
+RULES = {
+    "whitespace": whitespace_rule,
+    "halfwidth": halfwidth_rule,
+    "date": DateRule,
+}
+
+
+class Cleaner:
+    """按 {字段: [规则名]} 编译出的清洗器，字段值为空或不是字符串时跳过"""
+
+    def __init__(self, rules=None):
+        rules = DEFAULT_RULES if rules is None else rules
+        unknown = {name for names in rules.values() for name in names} - RULES.keys()
+        if unknown:
+            raise ValueError(f"未知的清洗规则: {', '.join(sorted(unknown))}，可用的规则: {', '.join(RULES)}")
+        self.fields = [(field, [RULES[name]() for name in names]) for field, names in rules.items()]
+
+    @staticmethod
+    def _apply(functions, value):
+        if not value or not isinstance(value, str):
+            return value
+        for function in functions:
+            value = function(value)
+            if value is None:
+                break
+        return value
+
+    def clean_item(self, item):
+        if hasattr(type(item), "__dataclass_fields__"):
+            # dataclass 数据项直接读写属性，省去每次构造 ItemAdapter
+            for field, functions in self.fields:
+                value = getattr(item, field, None)
+                if value:
+                    setattr(item, field, self._apply(functions, value))
+            return item
+
+        adapter = ItemAdapter(item)
+        for field, functions in self.fields:
+            value = adapter.get(field)
+            if value:
+                adapter[field] = self._apply(functions, value)
+        return item
+
+    def clean_batch(self, items):
+        """逐列清洗一批数据项，返回同一个列表"""
+        if items and all(hasattr(type(item), "__dataclass_fields__") for item in items):
+            targets, get, put = items, getattr, setattr
+        else:
+            targets = [ItemAdapter(item) for item in items]
+            get, put = _adapter_get, _adapter_put
+        apply = self._apply
+        for field, functions in self.fields:
+            column = [get(target, field, None) for target in targets]
+            for target, value, cleaned in zip(targets, column, [apply(functions, v) for v in column]):
+                if cleaned is not value:
+                    put(target, field, cleaned)
+        return items
+
+    def date_stats(self):
+        """汇总所有 date 规则的格式检测次数和无法识别次数"""
+        detections, unparsed = Counter(), 0
+        for _, functions in self.fields:
+            for function in functions:
+                if isinstance(function, DateRule):
+                    detections.update(function.detections)
+                    unparsed += function.unparsed
+        return detections, unparsed
+
+
+def _adapter_get(adapter, field, default=None):
+    return adapter.get(field, default)
+
+
+def _adapter_put(adapter, field, value):
+    adapter[field] = value
+
+
+class SecondClock:
+    """返回当前时间的 "%Y-%m-%d %H:%M:%S" 字符串，同一秒内只格式化一次"""
+
+    def __init__(self):
+        self.second = None
+        self.text = None
+
+    def now(self):
+        second = int(time.time())
+        if second != self.second:
+            self.second = second
+            self.text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        return self.text
+
+
+def reclean_database(db_path, rules=None, batch_size=1000):
+    """用清洗规则重新处理 SQLitePipeline 写入的 news 表，返回修改的行数"""
+    cleaner = Cleaner(rules)
+    fields = [field for field, _ in cleaner.fields]
+    conn = sqlite3.connect(db_path)
+    changed = 0
+    try:
+        rows = conn.execute(f"SELECT id, {', '.join(fields)} FROM news").fetchall()
+        for start in range(0, len(rows), batch_size):
+            batch = [dict(zip(["id", *fields], row)) for row in rows[start : start + batch_size]]
+            originals = [dict(row) for row in batch]
+            cleaner.clean_batch(batch)
+            updates = [row for row, original in zip(batch, originals) if row != original]
+            conn.executemany(
+                f"UPDATE news SET {', '.join(f'{field} = :{field}' for field in fields)} WHERE id = :id",
+                updates,
+            )
+            changed += len(updates)
+        conn.commit()
+    finally:
+        conn.close()
+    return changed
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "news.db"
+    print(f"{path}: 更新了 {reclean_database(path)} 行")
@@ -0,0 +1,343 @@
+"""
+近似重复文章检测：SimHash 指纹 + 分段 LSH 索引
+
+同一篇新闻常被转载到不同的 URL，url UNIQUE 拦不住。DedupPipeline（见 pipelines.py）为每篇文章的
+正文计算 64 位 SimHash 指纹：正文中每 3 个连续字符为一个特征，内容相近的文章，指纹只有少数位不同。
+两篇文章指纹的汉明距离不超过 DEDUP_MAX_DISTANCE（默认 3）即视为近似重复。
+
+SimHash 对改动的比例很敏感，正文改动 2% 左右指纹就会相差约 4 位，所以只对正文段落
+（DEDUP_TEXT_XPATH，默认 //p）计算指纹，导航、日期、来源等每个页面都不同的部分不参与；
+正文段落太短（少于 DEDUP_MIN_CHARS 个字符）时改用整个页面的文字，仍然太短的页面不做去重。
+
+查找用分段索引：把 64 位指纹分为 4 段，每段 16 位，每段一张 {段值: [文章]} 的哈希表。
+距离不超过 3 的两个指纹最多有 3 段不同，必然至少有一段完全相同，所以只需比较
+4 张表中与新指纹某一段相同的文章，平均候选数约为 4 * 文章数 / 65536，不用逐篇比较。
+
+指纹保存在 news.db 的 dedup_fingerprints 表，爬虫启动时全部读入内存重建索引；
+被判定为重复的文章记录在 news_duplicates 表（URL、原文 URL、距离），增量模式下不再下载。
+已有指纹的 URL 再次抓取时（非增量模式重新抓取、恢复中断的抓取）只更新它的指纹，不与自己比较。
+"""
+
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+
+import lxml.etree
+
+from newscraper.extraction import parse_document
+from newscraper.search import extract_text
+
+_NON_WORD = re.compile(r"\W+")
+_local = threading.local()
+# 特征为连续的 SHINGLE 个字符
+SHINGLE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+MASK64 = (1 << 64) - 1
+# 计算 SimHash 时把 64 个计数器放在一个大整数中，每个计数器占 32 位
+_LANE = 32
+_LANE_MASK = (1 << _LANE) - 1
+# 特征哈希的每个字节拆成低 4 位和高 4 位，_SPREAD[半字节序号][半字节值] 把这 4 位分散到对应的 4 个计数器上
+_SPREAD = [
+    [sum(1 << ((nibble * 4 + bit) * _LANE) for bit in range(4) if value >> bit & 1) for value in range(16)]
+    for nibble in range(16)
+]
+_LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+_HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+
+
+def _features(text):
+    """正文去掉空白和标点后，所有不同的 SHINGLE 字片段的 64 位哈希
+
+    同一片段只计一次，避免反复出现的套话（"与会人员"、"参与"等）压过正文内容。
+    """
+    text = _NON_WORD.sub("", text)
+    if len(text) < SHINGLE:
+        return set()
+    # UTF-32 每个字符固定 4 字节，按字符切分不需要逐个编码
+    data = text.encode("utf-32-le")
+    width = SHINGLE * 4
+    crc32 = zlib.crc32
+    return {
+        crc32(data[i : i + width]) | crc32(data[i : i + width], 0x9E3779B9) << 32
+        for i in range(0, len(data) - width + 4, 4)
+    }
+
+
+def simhash(text):
+    """返回正文的 64 位 SimHash 指纹，正文为空时返回 None
+
+    每一位取所有特征哈希在该位上的多数值。逐个特征逐位累加在 Python 中太慢，
+    这里按半字节位置统计每个半字节值出现的次数（切片、translate 和 Counter 都在 C 中完成），
+    再用预先算好的 _SPREAD 表一次性加到 64 个计数器上，每篇文章最多 256 次大整数运算。
+    """
+    features = _features(text)
+    if not features:
+        return None
+    packed = struct.pack(f"<{len(features)}Q", *features)
+    halves = (packed.translate(_LOW_NIBBLE), packed.translate(_HIGH_NIBBLE))
+    counters = 0
+    for nibble in range(16):
+        spread = _SPREAD[nibble]
+        for value, count in Counter(halves[nibble & 1][nibble >> 1 :: 8]).items():
+            counters += spread[value] * count
+    half = len(features) // 2
+    fingerprint = 0
+    for bit in range(64):
+        if (counters >> (bit * _LANE)) & _LANE_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class SimHashIndex:
+    """内存中的分段 LSH 索引，max_distance 必须小于段数才能保证不漏检
+
+    指纹和文章 id 存放在 array 中，每段的桶只保存指纹的下标（array('I')），
+    每个指纹约占 8 + 8 + 4 * 4 字节，加上桶本身的开销，100 万个指纹约 80 MB。
+    """
+
+    def __init__(self, max_distance=3, entries=()):
+        if not 0 <= max_distance < BANDS:
+            raise ValueError(f"max_distance 必须在 0 到 {BANDS - 1} 之间，而不是 {max_distance}")
+        self.max_distance = max_distance
+        self.fingerprints = array("Q")
+        self.ids = array("q")
+        self.bands = [{} for _ in range(BANDS)]
+        for doc_id, fingerprint in entries:
+            self.add(fingerprint, doc_id)
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def add(self, fingerprint, doc_id):
+        position = len(self.fingerprints)
+        self.fingerprints.append(fingerprint)
+        self.ids.append(doc_id)
+        for band, table in enumerate(self.bands):
+            key = fingerprint >> (band * BAND_BITS) & BAND_MASK
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = array("I", (position,))
+            else:
+                bucket.append(position)
+
+    def update(self, doc_id, old_fingerprint, fingerprint):
+        """把文章 doc_id 的指纹从 old_fingerprint 换成 fingerprint，找不到该文章时返回 False"""
+        bucket = self.bands[0].get(old_fingerprint & BAND_MASK, ())
+        position = next((p for p in bucket if self.ids[p] == doc_id), None)
+        if position is None:
+            return False
+        for band, table in enumerate(self.bands):
+            old_key = old_fingerprint >> (band * BAND_BITS) & BAND_MASK
+            key = fingerprint >> (band * BAND_BITS) & BAND_MASK
+            if key == old_key:
+                continue
+            old_bucket = table[old_key]
+            old_bucket.remove(position)
+            if not old_bucket:
+                del table[old_key]
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = array("I", (position,))
+            else:
+                bucket.append(position)
+        self.fingerprints[position] = fingerprint
+        return True
+
+    def find(self, fingerprint):
+        """返回距离最近的近似重复 (文章 id, 距离, 比较次数)，没有时文章 id 和距离为 None"""
+        best_id, best_distance, compared = None, self.max_distance + 1, 0
+        fingerprints = self.fingerprints
+        for band, table in enumerate(self.bands):
+            for position in table.get(fingerprint >> (band * BAND_BITS) & BAND_MASK, ()):
+                compared += 1
+                distance = (fingerprints[position] ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best_id, best_distance = self.ids[position], distance
+                    if distance == 0:
+                        return best_id, 0, compared
+        return best_id, (best_distance if best_id is not None else None), compared
+
+
+def signed64(value):
+    """SQLite 的 INTEGER 是有符号 64 位，写入前把无符号指纹转换过去，读出后 & MASK64 还原"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class DedupStore:
+    """news.db 中的指纹表和重复记录表，以及由指纹表重建的内存索引"""
+
+    CREATE_SQL = [
+        """
+        CREATE TABLE IF NOT EXISTS dedup_fingerprints (
+            id INTEGER PRIMARY KEY,
+            url TEXT UNIQUE,
+            simhash INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS news_duplicates (
+            url TEXT PRIMARY KEY,
+            canonical_url TEXT,
+            distance INTEGER
+        )
+        """,
+    ]
+
+    def __init__(self, db_path="news.db", max_distance=3, journal_mode="WAL", synchronous="NORMAL"):
+        self.conn = sqlite3.connect(db_path)
+        if journal_mode:
+            self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        if synchronous:
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        for sql in self.CREATE_SQL:
+            self.conn.execute(sql)
+        # 一篇文章不会是自己的重复，清掉旧版本把重新抓取的文章与自己比较而留下的记录
+        self.conn.execute("DELETE FROM news_duplicates WHERE url = canonical_url")
+        self.conn.commit()
+
+        start = time.perf_counter()
+        rows = self.conn.execute("SELECT id, simhash FROM dedup_fingerprints")
+        self.index = SimHashIndex(max_distance, ((doc_id, value & MASK64) for doc_id, value in rows))
+        self.load_seconds = time.perf_counter() - start
+        self.next_id = (self.conn.execute("SELECT MAX(id) FROM dedup_fingerprints").fetchone()[0] or 0) + 1
+
+        # 还没有写入数据库的指纹、指纹更新和重复记录，以及其中指纹对应的 URL（双向）
+        self.pending = []
+        self.pending_updates = []
+        self.pending_duplicates = []
+        self.pending_urls = {}
+        self.pending_ids = {}
+
+    def pending_count(self):
+        return len(self.pending) + len(self.pending_updates) + len(self.pending_duplicates)
+
+    def lookup(self, url):
+        """已保存指纹的 URL 返回 (文章 id, 指纹)，否则返回 None"""
+        doc_id = self.pending_ids.get(url)
+        if doc_id is not None:
+            return doc_id, self.index.fingerprints[self._position(doc_id)]
+        row = self.conn.execute("SELECT id, simhash FROM dedup_fingerprints WHERE url = ?", (url,)).fetchone()
+        return (row[0], row[1] & MASK64) if row else None
+
+    def _position(self, doc_id):
+        # 本次运行新加的指纹按 id 顺序追加在索引末尾
+        return len(self.index) - (self.next_id - doc_id)
+
+    def check(self, url, fingerprint):
+        """查找近似重复，返回 (原文 URL, 距离, 比较次数)；不是重复时加入索引，原文 URL 为 None
+
+        URL 已有指纹时是同一篇文章的重新抓取，只更新指纹，不会被判定为重复。
+        """
+        known = self.lookup(url)
+        if known is not None:
+            doc_id, old_fingerprint = known
+            if old_fingerprint != fingerprint and self.index.update(doc_id, old_fingerprint, fingerprint):
+                self.pending_updates.append((signed64(fingerprint), doc_id))
+            return None, None, 0
+
+        doc_id, distance, compared = self.index.find(fingerprint)
+        if doc_id is not None:
+            canonical_url = self.url_of(doc_id)
+            if canonical_url != url:
+                return canonical_url, distance, compared
+        doc_id, self.next_id = self.next_id, self.next_id + 1
+        self.index.add(fingerprint, doc_id)
+        self.pending.append((doc_id, url, signed64(fingerprint)))
+        self.pending_urls[doc_id] = url
+        self.pending_ids[url] = doc_id
+        return None, None, compared
+
+    def add_duplicate(self, url, canonical_url, distance):
+        if url != canonical_url:
+            self.pending_duplicates.append((url, canonical_url, distance))
+
+    def url_of(self, doc_id):
+        url = self.pending_urls.get(doc_id)
+        if url is None:
+            row = self.conn.execute("SELECT url FROM dedup_fingerprints WHERE id = ?", (doc_id,)).fetchone()
+            url = row[0] if row else None
+        return url
+
+    def flush(self):
+        """在一个事务中写入缓冲的指纹和重复记录，返回写入的条数"""
+        count = self.pending_count()
+        if not count:
+            return 0
+        try:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO dedup_fingerprints (id, url, simhash) VALUES (?, ?, ?)", self.pending
+            )
+            self.conn.executemany("UPDATE dedup_fingerprints SET simhash = ? WHERE id = ?", self.pending_updates)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO news_duplicates (url, canonical_url, distance) VALUES (?, ?, ?)",
+                self.pending_duplicates,
+            )
+            self.conn.commit()
+        except Exception:
+            # 缓冲的记录保留到下一次写入
+            self.conn.rollback()
+            raise
+        self.pending, self.pending_updates, self.pending_duplicates = [], [], []
+        self.pending_urls, self.pending_ids = {}, {}
+        return count
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def _xpath(expression):
+    # lxml 的 XPath 对象不宜跨线程共享，每个线程按表达式编译一次
+    compiled = getattr(_local, "xpaths", None)
+    if compiled is None:
+        compiled = _local.xpaths = {}
+    xpath = compiled.get(expression)
+    if xpath is None:
+        xpath = compiled[expression] = lxml.etree.XPath(expression)
+    return xpath
+
+
+def fingerprint_page(doc, body=None, encoding=None, text_xpath="//p", min_chars=50):
+    """计算页面正文的指纹，正文太短时返回 None
+
+    只取 text_xpath 选中的元素的文字；不足 min_chars 个字符时改用整个页面的文字。
+    纯函数，在工作线程或工作进程中执行。
+    """
+    if doc is None:
+        doc = parse_document(body, encoding)
+    text = "".join(
+        element.text_content() if hasattr(element, "text_content") else str(element)
+        for element in _xpath(text_xpath)(doc)
+    )
+    if len(_NON_WORD.sub("", text)) < min_chars:
+        text = extract_text(doc)
+        if len(_NON_WORD.sub("", text)) < min_chars:
+            return None
+    return simhash(text)
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "news.db"
+    if not os.path.exists(path):
+        sys.exit(f"{path} 不存在")
+    conn = sqlite3.connect(path)
+    try:
+        fingerprints = conn.execute("SELECT COUNT(*) FROM dedup_fingerprints").fetchone()[0]
+        rows = conn.execute(
+            "SELECT url, canonical_url, distance FROM news_duplicates ORDER BY canonical_url"
+        ).fetchall()
+    finally:
+        conn.close()
+    print(f"{path}: {fingerprints} 个指纹，{len(rows)} 篇近似重复")
+    for url, canonical_url, distance in rows:
+        print(f"  {url}\n    ≈ {canonical_url}  (距离 {distance})")
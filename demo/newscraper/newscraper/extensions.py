@@ -0,0 +1,226 @@
+# Define here the models for your extensions
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.asyncio import create_looping_call
+
+from newscraper import signals as newscraper_signals
+from newscraper.latency import START_META_KEY, recorder
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """收集各阶段延迟直方图，爬虫关闭时把 p50/p95/p99 写入 stats 和 JSON 报告
+
+    下载延迟和端到端时间由本扩展通过信号记录；回调时间由 LatencySpiderMiddleware 记录，
+    管道时间由 process_item 上的 timed_stage 装饰器记录。
+    SQLitePipeline 把数据项放入写入缓冲区时调用 recorder.buffer_item，这些数据项的端到端时间
+    在缓冲区提交（items_stored 信号）时记录，其余数据项在通过全部管道（item_scraped）时记录。
+    """
+
+    def __init__(self, stats, report_path=None):
+        self.stats = stats
+        self.report_path = report_path
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("LATENCY_STATS_ENABLED", False):
+            raise NotConfigured
+        ext = cls(crawler.stats, crawler.settings.get("LATENCY_REPORT_PATH"))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(ext.item_dropped, signal=signals.item_error)
+        crawler.signals.connect(ext.items_stored, signal=newscraper_signals.items_stored)
+        return ext
+
+    def spider_opened(self, spider):
+        recorder.reset()
+
+    def request_scheduled(self, request, spider):
+        request.meta.setdefault(START_META_KEY, time.perf_counter())
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            recorder.record(f"download/{urlsplit(request.url).hostname}", latency)
+
+    def item_scraped(self, item, response, spider):
+        recorder.finish_item(item)
+
+    def item_dropped(self, item, response, spider):
+        recorder.finish_item(item, record=False)
+
+    def items_stored(self, count=0):
+        recorder.items_stored()
+
+    def spider_closed(self, spider):
+        summary = recorder.summary()
+        for stage, values in summary.items():
+            for key in ("count", "p50_ms", "p95_ms", "p99_ms"):
+                self.stats.set_value(f"latency/{stage}/{key}", values[key])
+
+        if self.report_path:
+            with open(self.report_path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+            spider.logger.info(f"延迟报告已写入 {self.report_path}")
+
+
+class MemoryBackpressure:
+    """内存水位背压：管道处理不过来时暂停引擎，不再把新请求交给下载器
+
+    每隔 BACKPRESSURE_CHECK_INTERVAL 秒采样一次进程 RSS（与 demo_yield/mem_advantage.py 一样用 psutil）
+    和正在管道中处理的数据项数（scraper.slot.itemproc_size，每一项都带着响应体和文档树）。
+    任一项超过高水位就调用 engine.pause()：调度器中的请求不再出队，已在下载的请求（最多
+    CONCURRENT_REQUESTS 个）照常完成；RSS 和数据项数都降到低水位以下后 engine.unpause() 恢复。
+    水位设为 0 表示不检查该项。
+
+    Scrapy 自己只按响应体字节数（SCRAPER_SLOT_MAX_ACTIVE_SIZE，默认 5 MB）限制在途的响应，
+    不计文档树和缓冲数据的管道占用的内存；本扩展按整个进程的 RSS 设上限。
+
+    Python 释放的内存不一定归还操作系统，暂停期间管道已经清空而 RSS 仍在低水位之上时也会恢复，
+    否则会一直暂停下去；这种情况记入 backpressure/resumed_drained 并输出警告，说明高水位设得过低。
+
+    统计信息:
+        backpressure/pauses               暂停次数
+        backpressure/paused_seconds       累计暂停秒数
+        backpressure/pause_max_seconds    最长一次暂停的秒数
+        backpressure/reason/rss           因 RSS 超过高水位而暂停的次数
+        backpressure/reason/items         因数据项数超过高水位而暂停的次数
+        backpressure/resumed_drained      管道清空后 RSS 仍高于低水位而恢复的次数
+        backpressure/rss_max_mb           采样到的最大 RSS
+        backpressure/items_in_flight_max  采样到的最大数据项数
+    """
+
+    def __init__(
+        self,
+        crawler,
+        high_rss_mb=1024,
+        low_rss_mb=768,
+        high_items=1000,
+        low_items=500,
+        check_interval=0.5,
+    ):
+        import psutil
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.process = psutil.Process(os.getpid())
+        self.high_rss = high_rss_mb * 1024 * 1024
+        self.low_rss = min(low_rss_mb, high_rss_mb) * 1024 * 1024
+        self.high_items = high_items
+        self.low_items = min(low_items, high_items)
+        self.check_interval = check_interval
+        self.task = None
+        # 当前这次暂停开始的时间，没有暂停时为 None
+        self.paused_at = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("BACKPRESSURE_ENABLED", False):
+            raise NotConfigured
+        try:
+            import psutil  # noqa: F401
+        except ImportError:
+            raise NotConfigured("MemoryBackpressure 需要安装 psutil")
+        high_rss_mb = settings.getfloat("BACKPRESSURE_HIGH_RSS_MB", 1024)
+        high_items = settings.getint("BACKPRESSURE_HIGH_ITEMS", 1000)
+        ext = cls(
+            crawler,
+            high_rss_mb=high_rss_mb,
+            low_rss_mb=settings.getfloat("BACKPRESSURE_LOW_RSS_MB", high_rss_mb * 0.75),
+            high_items=high_items,
+            low_items=settings.getint("BACKPRESSURE_LOW_ITEMS", high_items // 2),
+            check_interval=settings.getfloat("BACKPRESSURE_CHECK_INTERVAL", 0.5),
+        )
+        crawler.signals.connect(ext.engine_started, signal=signals.engine_started)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.engine_stopped, signal=signals.engine_stopped)
+        return ext
+
+    def engine_started(self):
+        self.task = create_looping_call(self.check)
+        self.task.start(self.check_interval, now=True)
+
+    def spider_closed(self, spider):
+        # 关闭时仍在暂停的话，把这次暂停计入统计
+        if self.paused_at is not None:
+            self._resume(drained=False)
+
+    def engine_stopped(self):
+        if self.task is not None and self.task.running:
+            self.task.stop()
+
+    def in_flight(self):
+        """返回 (正在管道中处理的数据项数, 正在下载的请求数)"""
+        engine = self.crawler.engine
+        slot = engine.scraper.slot
+        return (slot.itemproc_size if slot is not None else 0), len(engine.downloader.active)
+
+    def check(self):
+        engine = self.crawler.engine
+        if engine is None or engine.spider is None:
+            return
+        rss = self.process.memory_info().rss
+        items, downloads = self.in_flight()
+        self.stats.max_value("backpressure/rss_max_mb", round(rss / 1024 / 1024, 1))
+        self.stats.max_value("backpressure/items_in_flight_max", items)
+
+        if self.paused_at is None:
+            reasons = []
+            if self.high_rss and rss > self.high_rss:
+                reasons.append("rss")
+            if self.high_items and items > self.high_items:
+                reasons.append("items")
+            if reasons:
+                self._pause(reasons, rss, items)
+        elif (not self.high_rss or rss < self.low_rss) and (not self.high_items or items < self.low_items):
+            self._resume(drained=False)
+        elif not items and not downloads:
+            self._resume(drained=True)
+
+    def _pause(self, reasons, rss, items):
+        self.crawler.engine.pause()
+        self.paused_at = time.monotonic()
+        self.stats.inc_value("backpressure/pauses")
+        for reason in reasons:
+            self.stats.inc_value(f"backpressure/reason/{reason}")
+        logger.info(
+            "Backpressure: pausing (RSS %.0f MB, %d items in flight, high watermarks %.0f MB / %d items)",
+            rss / 1024 / 1024, items, self.high_rss / 1024 / 1024, self.high_items,
+        )
+
+    def _resume(self, drained):
+        engine = self.crawler.engine
+        engine.unpause()
+        # 暂停期间引擎不会主动取下一个请求，这里立即唤醒，不用等下一次心跳（5 秒）
+        slot = getattr(engine, "_slot", None)
+        if slot is not None:
+            slot.nextcall.schedule()
+        paused = time.monotonic() - self.paused_at
+        self.paused_at = None
+        self.stats.inc_value("backpressure/paused_seconds", paused)
+        self.stats.max_value("backpressure/pause_max_seconds", paused)
+        if drained:
+            self.stats.inc_value("backpressure/resumed_drained")
+            logger.warning(
+                "Backpressure: pipelines drained but RSS is still above %.0f MB, resuming after %.1fs; "
+                "BACKPRESSURE_HIGH_RSS_MB may be too low for this crawl",
+                self.low_rss / 1024 / 1024, paused,
+            )
+        else:
+            logger.info("Backpressure: resuming after %.1fs", paused)
@@ -0,0 +1,71 @@
+"""
+声明式字段提取
+
+字段选择器以 XPath 表达式声明，每个工作线程只编译一次（lxml 的 XPath 对象不宜跨线程共享），
+对每个响应只解析一次得到 lxml 文档树，提取字段后把这棵树交给 HtmlSavePipeline 继续改写和归档，
+不再重复解析。
+
+    extractor = FieldExtractor({
+        "title": "//title/text()",
+        "publish_date": '//td[@class="hui12_sj2"]/text()',
+    })
+    fields, doc = extract_document(extractor, body, encoding)
+"""
+
+import threading
+
+import lxml.etree
+import lxml.html
+
+
+class FieldExtractor:
+    """把 {字段名: XPath 表达式} 编译为可复用的提取器
+
+    每个字段取第一个匹配结果，转换为字符串；没有匹配时为 None。
+    提取器本身只保存表达式，可以被 pickle 传给工作进程，编译结果按线程缓存。
+    """
+
+    def __init__(self, fields):
+        self.fields = dict(fields)
+        self._local = threading.local()
+
+    def __getstate__(self):
+        return {"fields": self.fields}
+
+    def __setstate__(self, state):
+        self.fields = state["fields"]
+        self._local = threading.local()
+
+    def compiled(self):
+        compiled = getattr(self._local, "compiled", None)
+        if compiled is None:
+            compiled = self._local.compiled = [
+                (name, lxml.etree.XPath(expression)) for name, expression in self.fields.items()
+            ]
+        return compiled
+
+    def extract(self, doc):
+        """对已解析的文档树执行全部字段选择器"""
+        result = {}
+        for name, xpath in self.compiled():
+            matches = xpath(doc)
+            if isinstance(matches, list):
+                result[name] = str(matches[0]) if matches else None
+            else:
+                result[name] = str(matches) if matches not in (None, "") else None
+        return result
+
+
+def parse_document(body, encoding):
+    """把原始响应体解析为 lxml HTML 文档树"""
+    return lxml.html.fromstring(body.decode(encoding or "utf-8", errors="replace"))
+
+
+def extract_document(extractor, body, encoding, keep_document=True):
+    """解析一次响应体并提取字段，返回 (字段字典, 文档树)
+
+    keep_document 为 False 时返回的文档树为 None。工作进程模式下必须这样做，
+    因为 lxml 文档树不能跨进程传递，归档阶段只能重新解析。
+    """
+    doc = parse_document(body, encoding)
+    return extractor.extract(doc), (doc if keep_document else None)
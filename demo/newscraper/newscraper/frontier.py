@@ -0,0 +1,393 @@
+"""
+基于 SQLite 的可恢复请求队列（调度器）
+
+Scrapy 自带的 JOBDIR 只在正常关闭时写出磁盘队列的状态，进程被 kill 或崩溃后队列无法恢复，
+而已调度的请求指纹已经写入 requests.seen，这些请求既不会被重新调度也不会被执行。
+
+FrontierScheduler 把整个调度状态放在一个 SQLite 数据库 <JOBDIR>/frontier.db 中:
+    requests(seq, fingerprint, priority, state, data)
+        state = 0  待抓取，data 为序列化的请求
+        state = 1  已交给下载器，尚未确认完成
+        state = 2  已完成，data 置空，只保留指纹用于去重
+
+入队和出队都立即提交（WAL + synchronous=NORMAL，提交不需要 fsync），任何时刻被 kill
+都不会丢失已入队的请求。请求在以下条件都满足后才标记为已完成:
+    1. 回调的产出已全部交给引擎（新请求已入队），由 FrontierSpiderMiddleware 报告
+    2. 回调产出的数据项都已通过全部管道
+    3. 这些数据项已由 SQLitePipeline 提交到数据库（items_stored 信号）；
+       没有启用 SQLitePipeline 时（SINKS 中没有 sqlite），数据项通过全部管道即可
+重新启动时，state = 1 的请求被放回待抓取状态，这就是恢复后需要重做的工作。这些请求的 meta 中
+带有 dont_conditional_get，不发送条件请求头：上次运行可能已经保存了它的 ETag，数据却没有入库，
+条件请求会得到 304 而不再解析。
+下载失败、被忽略（304、robots.txt、HttpErrorMiddleware）或回调出错的请求也保持 state = 1，
+恢复时会再试一次。
+
+已出队的请求用 meta 中的序号（frontier_seq）跟踪，request.copy()/replace() 会保留它，
+序列化时去掉它和 LatencyStats 的 latency_start（单调时钟读数，重启后没有意义，
+本次运行中按序号保存在内存中，出队时放回 meta）:
+重试和重定向产生的新请求入队时，原请求的工作交给新请求，原请求标记为已完成。
+请求出队时设置调度器自己的 errback，下载失败时先清除跟踪状态，再原样抛出异常
+（请求本来就有 errback 时交给它处理）；写入数据库前换回原来的 errback，不影响请求的序列化。
+
+待抓取请求只存在磁盘上，内存占用不随队列长度增长；请求用 marshal 序列化，
+遇到 marshal 不支持的 meta 值时退回 pickle。
+
+用法:
+    scrapy crawl newsspider -s JOBDIR=crawls/newsspider    # 中断后用相同命令继续
+未设置 JOBDIR 时数据库放在临时文件中，爬虫关闭后删除。
+"""
+
+import logging
+import marshal
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+
+from scrapy import signals
+from itemadapter import is_item
+
+from newscraper import signals as newscraper_signals
+from newscraper.latency import START_META_KEY
+from newscraper.sinks import item_pipelines
+from scrapy.utils.request import request_from_dict
+
+logger = logging.getLogger(__name__)
+
+PENDING, IN_FLIGHT, DONE = 0, 1, 2
+
+_MARSHAL, _PICKLE = b"m", b"p"
+
+# request.meta 中的键：已出队请求的序号，以及不发送条件请求头的标记（见 ConditionalGetMiddleware）
+SEQ_META_KEY = "frontier_seq"
+REDO_META_KEY = "dont_conditional_get"
+# 只在本进程内有意义的 meta，不写入数据库
+_TRANSIENT_META_KEYS = (SEQ_META_KEY, START_META_KEY)
+
+
+def serialize_request(request, spider):
+    data = request.to_dict(spider=spider)
+    if any(key in data["meta"] for key in _TRANSIENT_META_KEYS):
+        data["meta"] = {key: value for key, value in data["meta"].items() if key not in _TRANSIENT_META_KEYS}
+    try:
+        return _MARSHAL + marshal.dumps(data)
+    except ValueError:
+        return _PICKLE + pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def deserialize_request(blob, spider):
+    blob = bytes(blob)
+    loads = marshal.loads if blob[:1] == _MARSHAL else pickle.loads
+    return request_from_dict(loads(blob[1:]), spider=spider)
+
+
+class FrontierScheduler:
+    """实现 Scrapy 调度器接口（BaseScheduler）的持久化请求队列
+
+    出队顺序：优先级高的先出，同一优先级后入先出（与 Scrapy 默认的 LIFO 队列一致）。
+    """
+
+    def __init__(self, crawler, jobdir=None, wait_for_store=True):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.fingerprinter = crawler.request_fingerprinter
+        self.jobdir = jobdir
+        self.path = None
+        self.conn = None
+        self.pending = 0
+        # {请求序号: _InFlight}，出队后直到确认完成或失败
+        self.in_flight = {}
+        # 数据项已通过全部管道、等待 SQLitePipeline 提交的请求序号
+        self.awaiting_store = []
+        self.wait_for_store = wait_for_store
+        # {请求序号: meta 中的 latency_start}，不写入数据库，出队时放回 meta；重启后为空
+        self.latency_starts = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = cls(
+            crawler,
+            jobdir=crawler.settings.get("JOBDIR"),
+            wait_for_store="newscraper.pipelines.SQLitePipeline" in item_pipelines(crawler.settings),
+        )
+        # 供 FrontierSpiderMiddleware 找到调度器
+        crawler._newscraper_frontier = scheduler
+        for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+            crawler.signals.connect(scheduler.item_finished, signal=signal)
+        crawler.signals.connect(scheduler.items_stored, signal=newscraper_signals.items_stored)
+        crawler.signals.connect(scheduler.response_received, signal=signals.response_received)
+        crawler.signals.connect(scheduler.request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(scheduler.spider_error, signal=signals.spider_error)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        started = time.perf_counter()
+        if self.jobdir:
+            os.makedirs(self.jobdir, exist_ok=True)
+            self.path = os.path.join(self.jobdir, "frontier.db")
+        else:
+            fd, self.path = tempfile.mkstemp(prefix="frontier-", suffix=".db")
+            os.close(fd)
+
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS requests (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint BLOB,
+                priority INTEGER,
+                state INTEGER,
+                data BLOB
+            )
+        """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS requests_fingerprint ON requests (fingerprint)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS requests_pending ON requests (priority DESC, seq DESC) "
+            f"WHERE state = {PENDING}"
+        )
+
+        # 上次运行被中断时仍在下载的请求，标记为不发送条件请求头后重新放回待抓取状态
+        rows = self.conn.execute(f"SELECT seq, data FROM requests WHERE state = {IN_FLIGHT}").fetchall()
+        redo = []
+        for seq, data in rows:
+            request = deserialize_request(data, spider)
+            request.meta[REDO_META_KEY] = True
+            redo.append((PENDING, serialize_request(request, spider), seq))
+        self.conn.executemany("UPDATE requests SET state = ?, data = ? WHERE seq = ?", redo)
+        self.conn.commit()
+        recovered = len(redo)
+
+        counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM requests GROUP BY state"))
+        self.pending = counts.get(PENDING, 0)
+        done = counts.get(DONE, 0)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if self.pending or done:
+            logger.info(
+                "Resuming crawl from %s: %d pending (%d were in flight and will be redone), "
+                "%d completed, opened in %.1f ms",
+                self.path, self.pending, recovered, done, elapsed_ms,
+            )
+            self.stats.set_value("frontier/resumed_pending", self.pending)
+            self.stats.set_value("frontier/resumed_done", done)
+            self.stats.set_value("frontier/redone", recovered)
+            self.stats.set_value("frontier/resume_ms", round(elapsed_ms, 3))
+
+    def close(self, reason):
+        # 管道已在调度器之前关闭，缓冲区中的数据项已经写入
+        self.items_stored()
+        self.stats.set_value("frontier/pending_at_close", self.pending)
+        self.stats.set_value("frontier/in_flight_at_close", len(self.in_flight))
+        self.conn.close()
+        self.conn = None
+        if not self.jobdir:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+
+    def has_pending_requests(self):
+        return self.pending > 0
+
+    def __len__(self):
+        return self.pending
+
+    def enqueue_request(self, request):
+        fingerprint = self.fingerprinter.fingerprint(request)
+        if not request.dont_filter:
+            seen = self.conn.execute(
+                "SELECT 1 FROM requests WHERE fingerprint = ? LIMIT 1", (fingerprint,)
+            ).fetchone()
+            if seen is not None:
+                self.stats.inc_value("dupefilter/filtered")
+                return False
+        if request.errback == self.request_failed:
+            data = serialize_request(request.replace(errback=None), self.spider)
+        elif isinstance(request.errback, _Errback):
+            data = serialize_request(request.replace(errback=request.errback.errback), self.spider)
+        else:
+            data = serialize_request(request, self.spider)
+        cursor = self.conn.execute(
+            "INSERT INTO requests (fingerprint, priority, state, data) VALUES (?, ?, ?, ?)",
+            (fingerprint, request.priority, PENDING, data),
+        )
+        self.conn.commit()
+        self.pending += 1
+        if START_META_KEY in request.meta:
+            self.latency_starts[cursor.lastrowid] = request.meta[START_META_KEY]
+        self._replaced(request)
+        self.stats.inc_value("scheduler/enqueued/disk")
+        self.stats.inc_value("scheduler/enqueued")
+        return True
+
+    def next_request(self):
+        if not self.pending:
+            return None
+        row = self.conn.execute(
+            f"SELECT seq, data FROM requests WHERE state = {PENDING} "
+            "ORDER BY priority DESC, seq DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            self.pending = 0
+            return None
+        seq, data = row
+        self.conn.execute("UPDATE requests SET state = ? WHERE seq = ?", (IN_FLIGHT, seq))
+        self.conn.commit()
+        self.pending -= 1
+
+        request = deserialize_request(data, self.spider)
+        request.meta[SEQ_META_KEY] = seq
+        started_at = self.latency_starts.pop(seq, None)
+        if started_at is not None:
+            request.meta[START_META_KEY] = started_at
+        request.errback = self.request_failed if request.errback is None else _Errback(self, request.errback)
+        self.in_flight[seq] = _InFlight(seq)
+        self.stats.inc_value("scheduler/dequeued/disk")
+        self.stats.inc_value("scheduler/dequeued")
+        return request
+
+    def _entry(self, request):
+        if request is None:
+            return None
+        return self.in_flight.get(request.meta.get(SEQ_META_KEY))
+
+    def _forget(self, request):
+        """不再跟踪请求（保持 state = 1，恢复时重做），返回它的跟踪状态"""
+        entry = self._entry(request)
+        if entry is not None:
+            del self.in_flight[entry.seq]
+        return entry
+
+    def _replaced(self, request):
+        """重试或重定向产生的请求已入队（或作为重复被丢弃），原请求的工作已交给它"""
+        entry = self._entry(request)
+        # 已收到响应时这是回调产出的新请求，只是沿用了 response.meta
+        if entry is not None and not entry.responded:
+            del self.in_flight[entry.seq]
+            self._mark_done([entry.seq])
+
+    def request_failed(self, failure):
+        """出队请求的 errback：下载失败或请求被忽略，清除跟踪状态后原样抛出"""
+        if self._forget(getattr(failure, "request", None)) is not None:
+            self.stats.inc_value("frontier/failed")
+        return failure
+
+    def response_received(self, response, request, spider):
+        entry = self._entry(request)
+        if entry is not None:
+            entry.responded = True
+
+    def request_dropped(self, request, spider):
+        self._replaced(request)
+
+    def spider_error(self, failure, response, spider):
+        self._forget(getattr(response, "request", None))
+
+    def item_started(self, request):
+        entry = self._entry(request)
+        if entry is not None:
+            entry.items += 1
+            entry.had_items = True
+
+    def callback_finished(self, request):
+        entry = self._entry(request)
+        if entry is not None:
+            entry.callback_done = True
+            self._maybe_done(entry)
+
+    def item_finished(self, item, response, spider, **kwargs):
+        entry = self._entry(getattr(response, "request", None))
+        if entry is not None:
+            entry.items -= 1
+            self._maybe_done(entry)
+
+    def items_stored(self, count=0):
+        """数据项已写入数据库，等待中的请求可以标记为已完成"""
+        if not self.awaiting_store or self.conn is None:
+            return
+        self._mark_done(self.awaiting_store)
+        self.awaiting_store = []
+
+    def _maybe_done(self, entry):
+        if not entry.callback_done or entry.items > 0:
+            return
+        del self.in_flight[entry.seq]
+        if entry.had_items and self.wait_for_store:
+            self.awaiting_store.append(entry.seq)
+        else:
+            self._mark_done([entry.seq])
+
+    def _mark_done(self, seqs):
+        self.conn.executemany(
+            f"UPDATE requests SET state = {DONE}, data = NULL WHERE seq = ?", [(seq,) for seq in seqs]
+        )
+        self.conn.commit()
+        self.stats.inc_value("frontier/done", len(seqs))
+
+
+class _Errback:
+    """出队请求自带的 errback：先清除调度器的跟踪状态，再交给原来的 errback"""
+
+    __slots__ = ("frontier", "errback")
+
+    def __init__(self, frontier, errback):
+        self.frontier = frontier
+        self.errback = errback
+
+    def __call__(self, failure):
+        self.frontier.request_failed(failure)
+        return self.errback(failure)
+
+
+class _InFlight:
+    """已出队请求的完成进度"""
+
+    __slots__ = ("seq", "items", "had_items", "responded", "callback_done")
+
+    def __init__(self, seq):
+        self.seq = seq
+        self.items = 0
+        self.had_items = False
+        self.responded = False
+        self.callback_done = False
+
+
+class FrontierSpiderMiddleware:
+    """在回调产出全部交给引擎后通知 FrontierScheduler，并登记产出的数据项
+
+    应配置在较大的顺序号上（靠近爬虫），未使用 FrontierScheduler 时不做任何事。
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    @property
+    def frontier(self):
+        # 调度器在爬虫打开时才创建，晚于中间件
+        return getattr(self.crawler, "_newscraper_frontier", None)
+
+    def process_spider_output(self, response, result, spider):
+        frontier = self.frontier
+        for output in result:
+            if frontier is not None and is_item(output):
+                frontier.item_started(response.request)
+            yield output
+        if frontier is not None:
+            frontier.callback_finished(response.request)
+
+    async def process_spider_output_async(self, response, result, spider):
+        frontier = self.frontier
+        async for output in result:
+            if frontier is not None and is_item(output):
+                frontier.item_started(response.request)
+            yield output
+        if frontier is not None:
+            frontier.callback_finished(response.request)
@@ -0,0 +1,226 @@
+"""
+单文件 HTTP 缓存：录制一次真实抓取，之后完全离线回放
+
+Scrapy 自带的 FilesystemCacheStorage 每个响应写好几个小文件，DbmCacheStorage 依赖 dbm 模块且不压缩。
+SingleFileCacheStorage 把所有响应追加写入一个文件 <HTTPCACHE_DIR>/<爬虫名>.cache:
+
+    文件头      b"NSC1"
+    记录        请求指纹(20 字节) + 长度(4 字节) + zlib(marshal((时间戳, 状态码, URL, 响应头, 响应体)))
+    ...
+    索引        开放寻址哈希表，每个槽为 指纹(20 字节) + 偏移(8 字节) + 长度(4 字节)，空槽指纹全为 0
+    文件尾      索引偏移(8 字节) + 槽数(8 字节) + b"NSCI"
+
+回放时对整个文件做内存映射，按请求指纹直接计算槽位查找，不需要把索引读入内存，查找为 O(1)。
+录制时新记录追加在旧记录之后（第一次写入前把旧索引读入字典并截掉），关闭时重新写出索引。
+进程在写出索引前被中断时，下次打开会顺序扫描记录重建索引，并截掉最后一条不完整的记录。
+
+录制（关闭增量抓取和条件请求，保证每个页面都是完整的 200 响应）:
+    scrapy crawl newsspider -s HTTPCACHE_ENABLED=True -s INCREMENTAL_ENABLED=False -s CONDITIONAL_GET_ENABLED=False
+回放（缓存中没有的请求直接忽略，不访问网络）:
+    scrapy crawl newsspider -s HTTPCACHE_ENABLED=True -s HTTPCACHE_IGNORE_MISSING=True \\
+        -s INCREMENTAL_ENABLED=False -s CONDITIONAL_GET_ENABLED=False
+"""
+
+import logging
+import marshal
+import mmap
+import os
+import struct
+import time
+import zlib
+
+from scrapy.http.headers import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NSC1"
+INDEX_MAGIC = b"NSCI"
+RECORD = struct.Struct(">20sI")
+SLOT = struct.Struct(">20sQI")
+TRAILER = struct.Struct(">QQ4s")
+EMPTY = bytes(20)
+
+
+def encode_response(response):
+    headers = [(name, values) for name, values in response.headers.items()]
+    return zlib.compress(marshal.dumps((time.time(), response.status, response.url, headers, response.body)), 6)
+
+
+def decode_response(data):
+    """返回 (时间戳, 响应对象)"""
+    timestamp, status, url, headers, body = marshal.loads(zlib.decompress(data))
+    headers = Headers(dict(headers))
+    respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+    return timestamp, respcls(url=url, headers=headers, status=status, body=body)
+
+
+class SingleFileCache:
+    """缓存文件的读写，与 Scrapy 无关，也可以单独用来检查缓存内容"""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) < len(MAGIC):
+            with open(path, "wb") as f:
+                f.write(MAGIC)
+        self.file = open(path, "r+b")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} 不是缓存文件")
+
+        self.map = None
+        # 磁盘上的索引（只读），或录制时内存中的索引 {指纹: (偏移, 长度)}
+        self.index_offset = self.slots = None
+        self.entries = None
+        self.end = None
+        self.dirty = False
+
+        size = os.path.getsize(path)
+        if not self._read_trailer(size):
+            self.entries = self._scan(size)
+        self._remap()
+
+    def _read_trailer(self, size):
+        if size < len(MAGIC) + TRAILER.size:
+            return False
+        self.file.seek(size - TRAILER.size)
+        index_offset, slots, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+        if magic != INDEX_MAGIC or index_offset + slots * SLOT.size + TRAILER.size != size:
+            return False
+        self.index_offset, self.slots = index_offset, slots
+        self.end = index_offset
+        return True
+
+    def _scan(self, size):
+        """没有完整索引时顺序扫描全部记录重建索引，截掉末尾不完整的记录"""
+        entries = {}
+        offset = len(MAGIC)
+        self.file.seek(offset)
+        while offset + RECORD.size <= size:
+            fingerprint, length = RECORD.unpack(self.file.read(RECORD.size))
+            if offset + RECORD.size + length > size:
+                break
+            entries[fingerprint] = (offset + RECORD.size, length)
+            offset += RECORD.size + length
+            self.file.seek(offset)
+        if offset != size:
+            logger.warning("缓存文件 %s 末尾有 %d 字节不完整的数据，已截掉", self.path, size - offset)
+            self.file.truncate(offset)
+        if entries:
+            logger.info("缓存文件 %s 没有索引，已扫描重建 %d 条记录", self.path, len(entries))
+        self.end = offset
+        self.dirty = True
+        return entries
+
+    def _remap(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.flush()
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        if self.entries is not None:
+            return len(self.entries)
+        return sum(1 for i in range(self.slots) if self._slot(i)[0] != EMPTY)
+
+    def _slot(self, i):
+        return SLOT.unpack_from(self.map, self.index_offset + i * SLOT.size)
+
+    def _locate(self, fingerprint):
+        if self.entries is not None:
+            return self.entries.get(fingerprint)
+        if not self.slots:
+            return None
+        i = int.from_bytes(fingerprint[:8], "big") % self.slots
+        while True:
+            slot_fingerprint, offset, length = self._slot(i)
+            if slot_fingerprint == fingerprint:
+                return offset, length
+            if slot_fingerprint == EMPTY:
+                return None
+            i = (i + 1) % self.slots
+
+    def get(self, fingerprint):
+        """返回压缩的记录数据，不存在时返回 None"""
+        location = self._locate(fingerprint)
+        if location is None:
+            return None
+        offset, length = location
+        if offset + length > len(self.map):
+            self._remap()
+        return self.map[offset : offset + length]
+
+    def put(self, fingerprint, data):
+        if self.entries is None:
+            # 第一次写入：把磁盘上的索引读入内存，新记录覆盖旧索引所在的位置
+            self.entries = {}
+            for i in range(self.slots):
+                slot_fingerprint, offset, length = self._slot(i)
+                if slot_fingerprint != EMPTY:
+                    self.entries[slot_fingerprint] = (offset, length)
+            self.file.truncate(self.end)
+            self._remap()
+        self.file.seek(self.end)
+        self.file.write(RECORD.pack(fingerprint, len(data)))
+        self.file.write(data)
+        self.entries[fingerprint] = (self.end + RECORD.size, len(data))
+        self.end += RECORD.size + len(data)
+        self.dirty = True
+
+    def _write_index(self):
+        # 装载因子不超过 0.5，线性探测的平均探测次数接近 1
+        slots = max(8, 2 * len(self.entries))
+        table = bytearray(slots * SLOT.size)
+        for fingerprint, (offset, length) in self.entries.items():
+            i = int.from_bytes(fingerprint[:8], "big") % slots
+            while table[i * SLOT.size : i * SLOT.size + 20] != EMPTY:
+                i = (i + 1) % slots
+            SLOT.pack_into(table, i * SLOT.size, fingerprint, offset, length)
+        self.file.seek(self.end)
+        self.file.write(table)
+        self.file.write(TRAILER.pack(self.end, slots, INDEX_MAGIC))
+        self.file.truncate()
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.dirty:
+            self._write_index()
+        self.file.close()
+
+
+class SingleFileCacheStorage:
+    """Scrapy HTTPCACHE_STORAGE 实现，配合 HttpCacheMiddleware 使用"""
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.cache = None
+
+    def open_spider(self, spider):
+        path = os.path.join(self.cachedir, f"{spider.name}.cache")
+        self.cache = SingleFileCache(path)
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        logger.debug("Using single-file cache storage in %(path)s", {"path": path}, extra={"spider": spider})
+
+    def close_spider(self, spider):
+        entries = len(self.cache)
+        self.cache.close()
+        logger.info(
+            "HTTP cache %s: %d responses, %.1f MB",
+            self.cache.path, entries, os.path.getsize(self.cache.path) / 1024 / 1024,
+        )
+
+    def retrieve_response(self, spider, request):
+        data = self.cache.get(self._fingerprinter.fingerprint(request))
+        if data is None:
+            return None
+        timestamp, response = decode_response(data)
+        if 0 < self.expiration_secs < time.time() - timestamp:
+            return None
+        request.meta["cache_timestamp"] = timestamp
+        return response
+
+    def store_response(self, spider, request, response):
+        self.cache.put(self._fingerprinter.fingerprint(request), encode_response(response))
@@ -3,18 +3,25 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
-import scrapy
+from dataclasses import dataclass
+from typing import Any, Optional
 
 
+@dataclass(slots=True)
+class NewsItem:
+    """定义新闻文章的数据结构
 
-class NewsItem(scrapy.Item):
-    """定义新闻文章的数据结构"""
-    title = scrapy.Field()          # 新闻标题
-    publish_date = scrapy.Field()   # 发布日期
-    author = scrapy.Field()         # 作者/来源
-    url = scrapy.Field()            # 文章URL
-    created_at = scrapy.Field()     # 爬取时间
-    response = scrapy.Field()       # 响应对象
-    html_saved_path = scrapy.Field()  # 保存HTML文件路径
-
-    
\ No newline at end of file
+    使用带 __slots__ 的 dataclass 代替 scrapy.Item，ItemAdapter 同样支持。
+    只携带字段和原始响应体（或 parse_detail 已解析的文档树），不再引用整个 Response 对象，
+    二者在去重、全文索引和 HTML 归档之后由 ReleasePagePipeline 释放，后续管道看不到它们。
+    """
+    title: Optional[str] = None            # 新闻标题
+    publish_date: Optional[str] = None     # 发布日期
+    author: Optional[str] = None           # 作者/来源
+    url: Optional[str] = None              # 文章URL
+    created_at: Optional[str] = None       # 爬取时间
+    html_saved_path: Optional[str] = None  # 保存HTML文件路径
+    canonical_url: Optional[str] = None    # 近似重复文章的原文 URL（DEDUP_ACTION = "link" 时）
+    body: Optional[bytes] = None           # 原始响应体，仅供 HTML 归档使用
+    encoding: Optional[str] = None         # 响应体编码
+    document: Optional[Any] = None         # 已解析的 lxml 文档树，供 HtmlSavePipeline 复用
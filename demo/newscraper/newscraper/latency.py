@@ -0,0 +1,149 @@
+"""
+各阶段的延迟直方图
+
+直方图按对数分桶（相邻桶相差 5%），记录一次只需一次 log 运算和一次计数，内存占用固定，
+可以在生产环境中一直开启。分位数的相对误差不超过 5%。
+
+记录的阶段名称:
+    download/<域名>       下载延迟（Scrapy 的 download_latency）
+    callback/<回调名>     parse、parse_detail 等回调的执行时间
+    pipeline/<管道类名>   每个 ITEM_PIPELINES 阶段的 process_item 时间
+    end_to_end            从请求进入调度器到数据项由 SQLitePipeline 提交到数据库的时间；
+                          SINKS 中没有 sqlite 时到数据项通过全部管道为止
+
+数据由 newscraper.extensions.LatencyStats 扩展在爬虫关闭时写入 stats 和 JSON 报告。
+"""
+
+import functools
+import inspect
+import math
+import time
+
+_GROWTH = 1.05
+_LOG_GROWTH = math.log(_GROWTH)
+_MIN_SECONDS = 1e-6
+
+# 请求进入调度器的时间（time.perf_counter()），只在本进程内有意义，FrontierScheduler 不把它写入数据库
+START_META_KEY = "latency_start"
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图，单位为秒"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        index = int(math.log(seconds / _MIN_SECONDS) / _LOG_GROWTH) if seconds > _MIN_SECONDS else 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """返回第 q 分位（0-100）所在桶的上界，单位为秒"""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_MIN_SECONDS * _GROWTH ** (index + 1), self.max)
+        return self.max
+
+    def summary(self):
+        """返回以毫秒为单位的统计摘要"""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p95_ms": round(self.percentile(95) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class LatencyRecorder:
+    """按阶段名称保存直方图，并记录在途数据项的起始时间"""
+
+    def __init__(self):
+        self.histograms = {}
+        # {id(item): 请求进入调度器的时间}，数据项离开管道或进入写入缓冲区时移除
+        self.items_in_flight = {}
+        # 已进入 SQLitePipeline 写入缓冲区、等待提交的数据项的起始时间
+        self.items_awaiting_store = []
+
+    def record(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def reset(self):
+        self.histograms = {}
+        self.items_in_flight = {}
+        self.items_awaiting_store = []
+
+    def track_item(self, item, started_at):
+        if started_at is not None:
+            self.items_in_flight[id(item)] = started_at
+
+    def finish_item(self, item, record=True):
+        started_at = self.items_in_flight.pop(id(item), None)
+        if record and started_at is not None:
+            self.record("end_to_end", time.perf_counter() - started_at)
+
+    def buffer_item(self, item):
+        """数据项进入 SQLitePipeline 的写入缓冲区，提交后由 items_stored 记录 end_to_end"""
+        started_at = self.items_in_flight.pop(id(item), None)
+        if started_at is not None:
+            self.items_awaiting_store.append(started_at)
+
+    def items_stored(self):
+        """写入缓冲区已提交，记录其中数据项的 end_to_end"""
+        now = time.perf_counter()
+        for started_at in self.items_awaiting_store:
+            self.record("end_to_end", now - started_at)
+        self.items_awaiting_store = []
+
+    def summary(self):
+        return {stage: self.histograms[stage].summary() for stage in sorted(self.histograms)}
+
+
+# 本进程共享的记录器，由 LatencyStats 扩展在爬虫启动时清空
+recorder = LatencyRecorder()
+
+
+def timed_stage(process_item):
+    """装饰管道的 process_item，把执行时间记录到 pipeline/<管道类名>
+
+    同时支持普通方法和 async def 方法。
+    """
+    if inspect.iscoroutinefunction(process_item):
+
+        @functools.wraps(process_item)
+        async def wrapper(self, item, spider):
+            start = time.perf_counter()
+            try:
+                return await process_item(self, item, spider)
+            finally:
+                recorder.record(f"pipeline/{type(self).__name__}", time.perf_counter() - start)
+
+    else:
+
+        @functools.wraps(process_item)
+        def wrapper(self, item, spider):
+            start = time.perf_counter()
+            try:
+                return process_item(self, item, spider)
+            finally:
+                recorder.record(f"pipeline/{type(self).__name__}", time.perf_counter() - start)
+
+    return wrapper
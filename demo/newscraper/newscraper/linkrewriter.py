@@ -0,0 +1,154 @@
+"""
+单次遍历的链接绝对化引擎
+
+HtmlSavePipeline 原先对 //img、//a、//link、//script 各做一次 XPath 扫描，并且每个属性都调用一次 urljoin。
+LinkRewriter 只遍历一次文档树，处理所有携带 URL 的属性，包括:
+    - src、href、action、poster、data、cite、background 等普通属性
+    - srcset（逗号分隔的 "URL 描述符" 列表，按 HTML 规范切分，URL 中可以带逗号）
+    - style 属性和 <style> 元素中的 url(...)
+    - <base href>，存在时以它为基准解析其余相对路径
+
+解析结果按“基准目录”缓存: 同一栏目下的页面共享同一个目录，
+导航栏、页脚里反复出现的相对路径只需要 urljoin 一次。
+"""
+
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+# 需要绝对化的普通 URL 属性
+URL_ATTRS = frozenset(
+    ["src", "href", "action", "formaction", "poster", "data", "cite", "background", "longdesc"]
+)
+
+# 已经带协议（http:、data:、mailto:、javascript: ...）或协议相对的地址不需要处理
+_ABSOLUTE_RE = re.compile(r"^(?:[a-zA-Z][a-zA-Z0-9+.\-]*:|//)")
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+# HTML 规范中的 ASCII 空白
+_SPACE = " \t\n\r\f"
+
+
+class LinkRewriter:
+    """把文档中的相对地址原地改写为绝对地址"""
+
+    def __init__(self, max_cached_dirs=256):
+        self.max_cached_dirs = max_cached_dirs
+        # {基准目录: {相对路径: 绝对地址}}
+        self._cache = {}
+
+    def rewrite(self, doc, url):
+        """改写 lxml 文档 doc 中的所有相对地址，返回改写的地址个数"""
+        base = url
+        head = doc.find("head")
+        if head is not None:
+            base_el = head.find("base")
+            if base_el is not None and base_el.get("href"):
+                base = urljoin(url, base_el.get("href"))
+
+        resolve = self._resolver(base)
+        rewritten = 0
+
+        for el in doc.iter():
+            tag = el.tag
+            if not isinstance(tag, str):
+                # 注释、处理指令等节点
+                continue
+
+            for name, value in el.items():
+                if name in URL_ATTRS:
+                    if tag == "base":
+                        new_value = base
+                    else:
+                        new_value = resolve(value)
+                elif name == "srcset":
+                    new_value = self._rewrite_srcset(value, resolve)
+                elif name == "style":
+                    new_value = self._rewrite_css(value, resolve)
+                else:
+                    continue
+
+                if new_value != value:
+                    el.set(name, new_value)
+                    rewritten += 1
+
+            if tag == "style" and el.text:
+                new_text = self._rewrite_css(el.text, resolve)
+                if new_text != el.text:
+                    el.text = new_text
+                    rewritten += 1
+
+        return rewritten
+
+    def _resolver(self, base):
+        """返回一个把相对路径解析为绝对地址的函数，结果按基准目录缓存"""
+        parts = urlsplit(base)
+        path = parts.path
+        base_dir = urlunsplit((parts.scheme, parts.netloc, path[: path.rfind("/") + 1] or "/", "", ""))
+
+        cache = self._cache.get(base_dir)
+        if cache is None:
+            if len(self._cache) >= self.max_cached_dirs:
+                self._cache.clear()
+            cache = self._cache[base_dir] = {}
+
+        def resolve(value):
+            ref = value.strip()
+            if not ref or ref.startswith("#") or _ABSOLUTE_RE.match(ref):
+                return value
+            if ref.startswith("?"):
+                # 只有查询串时结果依赖完整的基准地址，不能按目录缓存
+                return urljoin(base, ref)
+            resolved = cache.get(ref)
+            if resolved is None:
+                resolved = cache[ref] = urljoin(base_dir, ref)
+            return resolved
+
+        return resolve
+
+    @staticmethod
+    def _rewrite_srcset(value, resolve):
+        """按 HTML 规范的 srcset 解析算法切分候选项，只替换其中的 URL，分隔符和描述符原样保留
+
+        URL 是连续的非空白字符（data: URI、CDN 的 w_400,h_300 这类 URL 中的逗号属于 URL），
+        末尾的逗号是候选项分隔符；URL 之后的描述符到括号外的第一个逗号为止。
+        """
+        out = []
+        pos, end = 0, len(value)
+        while pos < end:
+            # 候选项之间的空白和逗号
+            start = pos
+            while pos < end and (value[pos] in _SPACE or value[pos] == ","):
+                pos += 1
+            out.append(value[start:pos])
+            if pos == end:
+                break
+
+            start = pos
+            while pos < end and value[pos] not in _SPACE:
+                pos += 1
+            url = value[start:pos]
+            ref = url.rstrip(",")
+            out.append(resolve(ref))
+            if len(ref) < len(url):
+                # URL 以逗号结尾：这个候选项没有描述符
+                out.append(url[len(ref):])
+                continue
+
+            start = pos
+            in_parens = False
+            while pos < end:
+                char = value[pos]
+                if char == "(":
+                    in_parens = True
+                elif char == ")":
+                    in_parens = False
+                elif char == "," and not in_parens:
+                    break
+                pos += 1
+            out.append(value[start:pos])
+        return "".join(out)
+
+    @staticmethod
+    def _rewrite_css(value, resolve):
+        if "url(" not in value:
+            return value
+        return _CSS_URL_RE.sub(lambda m: f"url({m.group(1)}{resolve(m.group(2))}{m.group(1)})", value)
@@ -3,11 +3,20 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import deque
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
 
+from newscraper.latency import START_META_KEY, recorder
+
 
 class NewscraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
@@ -101,3 +110,358 @@ class NewscraperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+class ConditionalGetMiddleware:
+    """条件请求缓存（ETag / Last-Modified）
+
+    把每个 URL 的 ETag 和 Last-Modified 保存在本地 SQLite 文件中，下次运行时带上
+    If-None-Match / If-Modified-Since。服务器返回 304 说明页面没有变化，直接忽略该请求，
+    不再调用 parse 回调，也不会进入数据管道。
+
+    meta 中 dont_conditional_get 为真的请求不带条件请求头。校验值在收到响应时就已保存，
+    这时由它产生的请求和数据可能还没有完成，因此:
+    1. 爬虫的列表页总是带这个标记，列表页未变化不代表它链接的文章都已入库，
+       否则上次中途停止后，下次运行列表页返回 304，剩下的文章再也不会抓取；
+       已入库的文章由增量模式（INCREMENTAL_ENABLED）在列表页中跳过
+    2. FrontierScheduler 给恢复时重做的请求设置这个标记，重做时必须重新下载和解析
+
+    统计信息:
+        conditional_get/hit           带上了已保存校验值的请求数
+        conditional_get/miss          没有校验值的请求数
+        conditional_get/skipped       带有 dont_conditional_get 标记的请求数
+        conditional_get/not_modified  服务器返回 304 的次数
+    """
+
+    def __init__(self, db_path="validators.db", commit_every=100, stats=None):
+        self.db_path = db_path
+        self.commit_every = commit_every
+        self.stats = stats
+        self.conn = None
+        self.pending = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CONDITIONAL_GET_ENABLED", False):
+            raise NotConfigured
+        s = cls(
+            db_path=crawler.settings.get("CONDITIONAL_GET_DB", "validators.db"),
+            stats=crawler.stats,
+        )
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        return s
+
+    def spider_opened(self, spider):
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """
+        )
+        self.conn.commit()
+
+    def spider_closed(self, spider):
+        self.conn.commit()
+        self.conn.close()
+
+    def process_request(self, request, spider):
+        if request.meta.get("dont_conditional_get"):
+            self.stats.inc_value("conditional_get/skipped")
+            return None
+        row = self.conn.execute(
+            "SELECT etag, last_modified FROM validators WHERE url = ?", (request.url,)
+        ).fetchone()
+        if row is None:
+            self.stats.inc_value("conditional_get/miss")
+            return None
+
+        etag, last_modified = row
+        if etag:
+            request.headers.setdefault("If-None-Match", etag)
+        if last_modified:
+            request.headers.setdefault("If-Modified-Since", last_modified)
+        self.stats.inc_value("conditional_get/hit")
+        return None
+
+    def process_response(self, request, response, spider):
+        if response.status == 304:
+            self.stats.inc_value("conditional_get/not_modified")
+            raise IgnoreRequest(f"未修改: {request.url}")
+
+        if response.status == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO validators (url, etag, last_modified) VALUES (?, ?, ?)",
+                    (
+                        request.url,
+                        etag.decode("latin-1") if etag else None,
+                        last_modified.decode("latin-1") if last_modified else None,
+                    ),
+                )
+                self.pending += 1
+                if self.pending >= self.commit_every:
+                    self.conn.commit()
+                    self.pending = 0
+
+        return response
+
+
+class AdaptiveConcurrencyMiddleware:
+    """按下载槽（通常即域名）自适应调整并发数（AIMD）
+
+    对每个下载槽统计最近 ADAPTIVE_CONCURRENCY_WINDOW 个响应的平均下载延迟和错误率
+    （429、5xx 响应和下载异常），每凑满一个窗口做一次决定:
+        错误率超过 ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE 或平均延迟超过目标  并发数乘以 DECREASE_FACTOR
+        延迟低于目标且窗口内有请求因并发数不足而排队                      并发数加 1
+        其他情况                                                          保持不变
+    并发数限制在 [MIN, MAX] 之间。加性增、乘性减让并发数在服务器能承受的水平附近小幅振荡，
+    延迟上升或出错时迅速退让。
+
+    并发数由本中间件自己限制：超出并发数的请求在 process_request 中等待，
+    前面的请求收到响应或出错后再放行。下载器槽的 slot.concurrency 不能代替它：Scrapy 2.19 的
+    Downloader._process_queue 按 concurrency 减去正在传输的请求数决定取出几个请求，但请求要等
+    下载协程开始运行后才计入 transferring，一次调用可以取出超过 concurrency 个请求。
+    另一方面 slot.concurrency（CONCURRENT_REQUESTS_PER_DOMAIN，按 IP 分槽时为
+    CONCURRENT_REQUESTS_PER_IP）在稳定状态下仍是上限，超出的请求在槽队列中等待，
+    这段等待不计入 download_latency，控制器看不到。因此 ADAPTIVE_CONCURRENCY_MAX
+    不能超过槽的上限和全局的 CONCURRENT_REQUESTS，超过时截断并记录警告。
+
+    应配置在所有会替换响应的内置中间件之后（更大的顺序号，例如 950），
+    这样请求在真正下载前才排队，RetryMiddleware 重试之前就能看到 5xx 响应和异常，
+    RedirectMiddleware 返回新请求时也不会漏掉释放。
+
+    每次调整都会写入 INFO 日志，统计信息:
+        adaptive_concurrency/<槽>/concurrency  当前并发数
+        adaptive_concurrency/<槽>/max          达到过的最大并发数
+        adaptive_concurrency/<槽>/latency_ms   最近一个窗口的平均延迟
+        adaptive_concurrency/increases         增加并发的次数
+        adaptive_concurrency/decreases         减少并发的次数
+    """
+
+    ERROR_STATUSES = {429, 500, 502, 503, 504}
+    META_KEY = "adaptive_concurrency_slot"
+
+    def __init__(
+        self,
+        crawler,
+        target_latency=2.0,
+        start_concurrency=4,
+        min_concurrency=1,
+        max_concurrency=16,
+        window=20,
+        max_error_rate=0.05,
+        decrease_factor=0.5,
+        stats=None,
+    ):
+        self.crawler = crawler
+        self.target_latency = target_latency
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.start_concurrency = min(max(start_concurrency, self.min_concurrency), self.max_concurrency)
+        self.window = max(1, window)
+        self.max_error_rate = max_error_rate
+        self.decrease_factor = decrease_factor
+        self.stats = stats
+        self.logger = logging.getLogger(__name__)
+        # {槽名: _SlotState}
+        self.slots = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED", False):
+            raise NotConfigured
+        max_concurrency = settings.getint("ADAPTIVE_CONCURRENCY_MAX", 16)
+        # 下载器槽和全局的并发上限，0 表示不限
+        slot_limit = settings.getint("CONCURRENT_REQUESTS_PER_IP") or settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN")
+        limits = [limit for limit in (slot_limit, settings.getint("CONCURRENT_REQUESTS")) if limit > 0]
+        if limits and max_concurrency > min(limits):
+            logging.getLogger(__name__).warning(
+                "ADAPTIVE_CONCURRENCY_MAX=%d exceeds the downloader limit (CONCURRENT_REQUESTS_PER_DOMAIN/"
+                "PER_IP=%d, CONCURRENT_REQUESTS=%d), using %d",
+                max_concurrency, slot_limit, settings.getint("CONCURRENT_REQUESTS"), min(limits),
+            )
+            max_concurrency = min(limits)
+        return cls(
+            crawler,
+            target_latency=settings.getfloat("ADAPTIVE_CONCURRENCY_TARGET_LATENCY", 2.0),
+            start_concurrency=settings.getint("ADAPTIVE_CONCURRENCY_START", 4),
+            min_concurrency=settings.getint("ADAPTIVE_CONCURRENCY_MIN", 1),
+            max_concurrency=max_concurrency,
+            window=settings.getint("ADAPTIVE_CONCURRENCY_WINDOW", 20),
+            max_error_rate=settings.getfloat("ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE", 0.05),
+            decrease_factor=settings.getfloat("ADAPTIVE_CONCURRENCY_DECREASE_FACTOR", 0.5),
+            stats=crawler.stats,
+        )
+
+    def _state(self, key):
+        state = self.slots.get(key)
+        if state is None:
+            state = self.slots[key] = _SlotState(self.start_concurrency)
+            self.stats.set_value(f"adaptive_concurrency/{key}/concurrency", state.concurrency)
+            self.stats.max_value(f"adaptive_concurrency/{key}/max", state.concurrency)
+        return state
+
+    async def process_request(self, request, spider):
+        key = self.crawler.engine.downloader.get_slot_key(request)
+        state = self._state(key)
+        if state.active < state.concurrency:
+            state.active += 1
+        else:
+            # 排队等待前面的请求释放，释放方直接把名额转交给这里
+            state.saturated = True
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            await waiter
+        request.meta[self.META_KEY] = key
+        return None
+
+    def process_response(self, request, response, spider):
+        key = request.meta.pop(self.META_KEY, None)
+        if key is not None:
+            self._release(key)
+            self._sample(key, request.meta.get("download_latency"), response.status in self.ERROR_STATUSES)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        key = request.meta.pop(self.META_KEY, None)
+        if key is not None:
+            self._release(key)
+            if not isinstance(exception, IgnoreRequest):
+                self._sample(key, None, True)
+        return None
+
+    def _release(self, key):
+        state = self.slots[key]
+        state.active -= 1
+        self._wake(state)
+
+    def _wake(self, state):
+        while state.waiters and state.active < state.concurrency:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                state.active += 1
+                waiter.set_result(None)
+
+    def _sample(self, key, latency, error):
+        state = self.slots[key]
+        if latency is not None:
+            state.latency_total += latency
+            state.latency_count += 1
+        state.errors += error
+        state.samples += 1
+        if state.samples >= self.window:
+            self._adjust(key, state)
+
+    def _adjust(self, key, state):
+        latency = state.latency_total / state.latency_count if state.latency_count else None
+        error_rate = state.errors / state.samples
+        saturated = state.saturated or bool(state.waiters)
+        state.reset_window()
+
+        old = state.concurrency
+        if error_rate > self.max_error_rate or (latency is not None and latency > self.target_latency):
+            new = max(self.min_concurrency, int(old * self.decrease_factor))
+        elif saturated and latency is not None:
+            new = min(self.max_concurrency, old + 1)
+        else:
+            new = old
+
+        if latency is not None:
+            self.stats.set_value(f"adaptive_concurrency/{key}/latency_ms", round(latency * 1000, 1))
+        if new == old:
+            return
+        state.concurrency = new
+        self._wake(state)
+        self.stats.set_value(f"adaptive_concurrency/{key}/concurrency", new)
+        self.stats.max_value(f"adaptive_concurrency/{key}/max", new)
+        self.stats.inc_value("adaptive_concurrency/increases" if new > old else "adaptive_concurrency/decreases")
+        self.logger.info(
+            "Slot %s: concurrency %d -> %d (latency %s, errors %.0f%%)",
+            key, old, new,
+            "n/a" if latency is None else f"{latency * 1000:.0f} ms",
+            error_rate * 100,
+        )
+
+
+class _SlotState:
+    """一个下载槽的并发名额和当前窗口内的样本"""
+
+    __slots__ = (
+        "concurrency", "active", "waiters",
+        "samples", "errors", "latency_total", "latency_count", "saturated",
+    )
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.active = 0
+        self.waiters = deque()
+        self.reset_window()
+
+    def reset_window(self):
+        self.samples = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_count = 0
+        self.saturated = False
+
+
+class LatencySpiderMiddleware:
+    """记录每个回调的执行时间，并登记回调产出的数据项用于端到端计时
+
+    只累计回调生成器内部的执行时间，不包括下游消费产出对象的时间；
+    async 回调中 await 工作池的时间也计算在内。
+    应配置在较大的顺序号上（靠近爬虫），例如 950。
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("LATENCY_STATS_ENABLED", False):
+            raise NotConfigured
+        return cls()
+
+    @staticmethod
+    def _stage(response):
+        callback = response.request.callback if response.request else None
+        return f"callback/{getattr(callback, '__name__', 'parse')}"
+
+    def _track(self, response, output):
+        if is_item(output):
+            recorder.track_item(output, response.request.meta.get(START_META_KEY))
+
+    def process_spider_output(self, response, result, spider):
+        elapsed = 0.0
+        iterator = iter(result)
+        while True:
+            start = time.perf_counter()
+            try:
+                output = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            self._track(response, output)
+            yield output
+        recorder.record(self._stage(response), elapsed)
+
+    async def process_spider_output_async(self, response, result, spider):
+        elapsed = 0.0
+        iterator = result.__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                output = await iterator.__anext__()
+            except StopAsyncIteration:
+                elapsed += time.perf_counter() - start
+                break
+            elapsed += time.perf_counter() - start
+            self._track(response, output)
+            yield output
+        recorder.record(self._stage(response), elapsed)
@@ -1,98 +1,257 @@
+import lxml.html
 from itemadapter import ItemAdapter
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.asyncio import create_looping_call
+from scrapy.utils.reactor import is_reactor_installed
 
-import sqlite3
-from datetime import datetime
-from openpyxl import Workbook
-import lxml.html
-from urllib.parse import urljoin
+from datetime import date, datetime
+import logging
 import re
 import os
+import sqlite3
+import time
+
+from newscraper import signals as newscraper_signals
+from newscraper.archive import HtmlArchive, compress_html
+from newscraper.cleaning import Cleaner, SecondClock
+from newscraper.dedup import DedupStore, fingerprint_page
+from newscraper.extraction import parse_document
+from newscraper.latency import recorder, timed_stage
+from newscraper.linkrewriter import LinkRewriter
+from newscraper.search import SearchIndex, extract_text, normalize_title
+from newscraper.workers import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+# 每个进程共享一个链接改写器，以便复用按目录缓存的解析结果
+LINK_REWRITER = LinkRewriter()
+
+
+def start_flush_timer(func, max_age, *args):
+    """每隔 max_age / 2 秒调用一次 func(*args)，由 func 检查缓冲区是否已超过 max_age 秒
+
+    只在 process_item 中检查的话，数据项停止到达后缓冲区会一直留到爬虫关闭。
+    没有安装反应器时（例如基准测试直接调用管道）不启动定时器，返回 None。
+    """
+    if max_age <= 0 or not is_reactor_installed():
+        return None
+    timer = create_looping_call(_flush_on_timer, func, *args)
+    timer.start(max_age / 2, now=False)
+    return timer
+
+
+def stop_flush_timer(timer):
+    if timer is not None and timer.running:
+        timer.stop()
+
+
+def _flush_on_timer(func, *args):
+    # 写入失败时数据留在缓冲区，下一次写入时重试；异常不能抛给定时器，否则定时器会停止
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("定时批量写入失败，数据保留在缓冲区中")
+
 
 class NewsPipeline:
-    def process_item(self, item, spider):
-        """处理每个抓取的新闻项"""
-        adapter = ItemAdapter(item)
+    """清洗字段并记录爬取时间
 
-        # 清洗数据
-        # 1. 标题清洗：删除多余空格
-        if adapter.get("title"):
-            adapter["title"] = adapter["title"].strip()
+    清洗规则由 CLEANING_RULES 设置声明（见 newscraper/cleaning.py），爬虫启动时编译一次。
+    publish_date 会被规范为 ISO 日期（"2025-03-18"），无法识别时为 None。
+    """
 
-        # 2. 发布日期清洗与格式化
-        if adapter.get("publish_date"):
-            adapter["publish_date"] = adapter["publish_date"].strip()
-            # 可以添加日期格式化逻辑，例如将 "2025-03-18" 转为标准日期格式
+    def __init__(self, rules=None, stats=None):
+        self.cleaner = Cleaner(rules)
+        self.clock = SecondClock()
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(rules=crawler.settings.getdict("CLEANING_RULES") or None, stats=crawler.stats)
+
+    def close_spider(self, spider):
+        if self.stats is None:
+            return
+        detections, unparsed = self.cleaner.date_stats()
+        for name, count in detections.items():
+            self.stats.set_value(f"cleaning/date_format/{name}", count)
+        self.stats.set_value("cleaning/date_unparsed", unparsed)
 
-        # 3. 作者/来源清洗
-        if adapter.get("author"):
-            adapter["author"] = adapter["author"].strip()
+    @timed_stage
+    def process_item(self, item, spider):
+        """处理每个抓取的新闻项"""
+        self.cleaner.clean_item(item)
 
         # 添加爬取时间
-        adapter["created_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ItemAdapter(item)["created_at"] = self.clock.now()
         return item
 
 
 class SQLitePipeline:
-    def __init__(self):
+    """SQLite 存储管道
+
+    数据项先进入内存缓冲区，满足以下任一条件时用 executemany 批量写入并提交一次：
+    1. 缓冲区达到 SQLITE_BATCH_SIZE 条
+    2. 缓冲区中最早的数据项已等待超过 SQLITE_BATCH_MAX_AGE 秒（process_item 和每隔
+       SQLITE_BATCH_MAX_AGE / 2 秒运行的定时器都会检查，没有新数据项到达时也会写入）
+    3. 爬虫关闭
+    这样磁盘同步次数取决于批大小，而不是数据项数量。
+    每次提交后发送 newscraper.signals.items_stored 信号，FrontierScheduler 据此确认请求已完成，
+    LatencyStats 据此记录缓冲区中数据项的端到端时间。
+    """
+
+    CREATE_SQL = """
+        CREATE TABLE IF NOT EXISTS news (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            publish_date TEXT,
+            author TEXT,
+            url TEXT UNIQUE,
+            created_at TEXT
+        )
+    """
+
+    INSERT_SQL = (
+        "INSERT OR IGNORE INTO news (title, publish_date, author, url, created_at) "
+        "VALUES (?, ?, ?, ?, ?)"
+    )
+
+    def __init__(
+        self,
+        db_path="news.db",
+        batch_size=100,
+        batch_max_age=5.0,
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        stats=None,
+        signals=None,
+    ):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self.batch_max_age = float(batch_max_age)
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.stats = stats
+        self.signals = signals
+
         # 数据库连接和游标
         self.conn = None
         self.cur = None
 
+        # 写入缓冲区及其中最早一条数据的入队时间
+        self.buffer = []
+        self.buffer_started = None
+        self.flush_timer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            db_path=settings.get("SQLITE_DB_PATH", "news.db"),
+            batch_size=settings.getint("SQLITE_BATCH_SIZE", 100),
+            batch_max_age=settings.getfloat("SQLITE_BATCH_MAX_AGE", 5.0),
+            journal_mode=settings.get("SQLITE_JOURNAL_MODE", "WAL"),
+            synchronous=settings.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+            stats=crawler.stats,
+            signals=crawler.signals,
+        )
+
     def open_spider(self, spider):
         """当爬虫启动时创建数据库连接"""
-        self.conn = sqlite3.connect("news.db")
+        self.conn = sqlite3.connect(self.db_path)
         self.cur = self.conn.cursor()
 
-        # 创建表（如果不存在）·
-        self.cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS news (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                publish_date TEXT,
-                author TEXT,
-                url TEXT UNIQUE,
-                created_at TEXT
-            )
-        """
-        )
+        # 设置日志模式与同步级别，WAL + NORMAL 下每次提交不再强制 fsync 主库文件
+        if self.journal_mode:
+            self.cur.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            self.cur.execute(f"PRAGMA synchronous={self.synchronous}")
+
+        # 创建表（如果不存在）
+        self.cur.execute(self.CREATE_SQL)
         self.conn.commit()
 
+        self.flush_timer = start_flush_timer(self.flush_expired, self.batch_max_age, spider)
+
     def close_spider(self, spider):
-        """当爬虫关闭时关闭数据库连接"""
+        """当爬虫关闭时写入剩余数据并关闭数据库连接"""
+        stop_flush_timer(self.flush_timer)
+        self.flush(spider)
         self.conn.close()
 
+    @timed_stage
     def process_item(self, item, spider):
-        """将数据项插入数据库"""
+        """将数据项加入写入缓冲区"""
         adapter = ItemAdapter(item)
 
-        # 准备SQL语句和参数
-        self.cur.execute(
-            "INSERT OR IGNORE INTO news (title, publish_date, author, url, created_at) VALUES (?, ?, ?, ?, ?)",
+        if not self.buffer:
+            self.buffer_started = time.monotonic()
+        self.buffer.append(
             (
                 adapter.get("title", ""),
                 adapter.get("publish_date", ""),
                 adapter.get("author", ""),
                 adapter.get("url", ""),
                 adapter.get("created_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-            ),
+            )
         )
-        self.conn.commit()
+        recorder.buffer_item(item)
+
+        if (
+            len(self.buffer) >= self.batch_size
+            or time.monotonic() - self.buffer_started >= self.batch_max_age
+        ):
+            self.flush(spider)
 
         return item
 
+    def flush_expired(self, spider):
+        """缓冲区中最早的数据项已等待超过 batch_max_age 秒时写入，由定时器调用"""
+        if self.buffer and time.monotonic() - self.buffer_started >= self.batch_max_age:
+            self.flush(spider)
+
+    def flush(self, spider):
+        """用一个事务把缓冲区中的数据全部写入数据库
+
+        提交成功后才清空缓冲区，写入失败时回滚，数据留在缓冲区中等下一次写入。
+        """
+        if not self.buffer:
+            return
+
+        rows = self.buffer
+        start = time.perf_counter()
+        try:
+            self.cur.executemany(self.INSERT_SQL, rows)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.buffer = []
+        self.buffer_started = None
+
+        if self.stats is not None:
+            self.stats.inc_value("sqlite/flush_count")
+            self.stats.inc_value("sqlite/rows_flushed", len(rows))
+            self.stats.inc_value("sqlite/flush_time_ms", elapsed_ms)
+            self.stats.max_value("sqlite/flush_max_ms", elapsed_ms)
+        if self.signals is not None:
+            self.signals.send_catch_log(signal=newscraper_signals.items_stored, count=len(rows))
+
 
 class ExcelPipeline:
     def __init__(self):
+        from openpyxl import Workbook
+
+        self.Workbook = Workbook
         self.workbook = None
         self.sheet = None
         self.file_name = "news.xlsx"
         self.current_row = 1  # Start from row 2 (after header)
-        print("ExcelPipeline init")
 
     def open_spider(self, spider):
         """当爬虫启动时创建Excel文件"""
-        self.workbook = Workbook()
+        self.workbook = self.Workbook()
         self.sheet = self.workbook.active
         self.sheet.title = "新闻数据"
 
@@ -104,6 +263,7 @@ class ExcelPipeline:
     def close_spider(self, spider):
         self.workbook.save(self.file_name)
 
+    @timed_stage
     def process_item(self, item, spider):
         """将数据项添加到Excel文件"""
         adapter = ItemAdapter(item)
@@ -126,69 +286,752 @@ class ExcelPipeline:
 
 
 
-class HtmlSavePipeline:
-    def __init__(self):
-        # 创建保存目录
-        self.output_dir = "html_files"
-        os.makedirs(self.output_dir, exist_ok=True)
-        
+
+class StreamingExcelPipeline:
+    """流式 Excel 导出管道
+
+    与 ExcelPipeline 不同，这里使用 openpyxl 的 write_only 模式逐行追加，
+    内存占用不随数据量增长：
+    1. 单个工作表写满 EXCEL_MAX_ROWS_PER_SHEET 行后切换到新工作表（Excel 上限 1048576 行）
+    2. 单个文件写满 EXCEL_ROWS_PER_FILE 行后保存并切换到新文件，
+       已保存的文件即使爬虫中途崩溃也能保留
+    """
+
+    HEADERS = ["标题", "发布日期", "作者/来源", "URL", "爬取时间"]
+    EXCEL_MAX_ROWS = 1048576
+
+    def __init__(
+        self,
+        file_name="news.xlsx",
+        max_rows_per_sheet=EXCEL_MAX_ROWS - 1,
+        rows_per_file=100000,
+        stats=None,
+    ):
+        from openpyxl import Workbook
+
+        self.Workbook = Workbook
+        self.file_name = file_name
+        # 表头占一行，数据行不能超过 Excel 上限减一
+        self.max_rows_per_sheet = max(1, min(int(max_rows_per_sheet), self.EXCEL_MAX_ROWS - 1))
+        self.rows_per_file = max(1, int(rows_per_file))
+        self.stats = stats
+
+        self.workbook = None
+        self.sheet = None
+        self.file_index = 0
+        self.sheet_index = 0
+        self.sheet_rows = 0
+        self.file_rows = 0
+        self.saved_files = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            file_name=settings.get("EXCEL_FILE_NAME", "news.xlsx"),
+            max_rows_per_sheet=settings.getint(
+                "EXCEL_MAX_ROWS_PER_SHEET", cls.EXCEL_MAX_ROWS - 1
+            ),
+            rows_per_file=settings.getint("EXCEL_ROWS_PER_FILE", 100000),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        """当爬虫启动时创建第一个 Excel 文件"""
+        self._new_workbook()
+
+    def close_spider(self, spider):
+        """当爬虫关闭时保存最后一个文件"""
+        if self.workbook is not None and (self.file_rows or not self.saved_files):
+            self._save_workbook(spider)
+
+    @timed_stage
+    def process_item(self, item, spider):
+        """将数据项追加到当前工作表"""
+        adapter = ItemAdapter(item)
+
+        if self.file_rows >= self.rows_per_file:
+            self._save_workbook(spider)
+            self._new_workbook()
+        elif self.sheet_rows >= self.max_rows_per_sheet:
+            self._new_sheet()
+
+        self.sheet.append(
+            [
+                adapter.get("title", ""),
+                adapter.get("publish_date", ""),
+                adapter.get("author", ""),
+                adapter.get("url", ""),
+                adapter.get("created_at", ""),
+            ]
+        )
+        self.sheet_rows += 1
+        self.file_rows += 1
+
+        return item
+
+    def _file_path(self):
+        """第一个文件沿用原文件名，之后依次为 news_2.xlsx、news_3.xlsx ..."""
+        if self.file_index == 1:
+            return self.file_name
+        base, ext = os.path.splitext(self.file_name)
+        return f"{base}_{self.file_index}{ext}"
+
+    def _new_workbook(self):
+        self.workbook = self.Workbook(write_only=True)
+        self.file_index += 1
+        self.file_rows = 0
+        self.sheet_index = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheet_index += 1
+        title = "新闻数据" if self.sheet_index == 1 else f"新闻数据_{self.sheet_index}"
+        self.sheet = self.workbook.create_sheet(title=title)
+        self.sheet.append(self.HEADERS)
+        self.sheet_rows = 0
+
+    def _save_workbook(self, spider):
+        """先写入临时文件再重命名，避免留下写了一半的 xlsx"""
+        path = self._file_path()
+        tmp_path = f"{path}.part"
+        self.workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+        self.saved_files.append(path)
+        self.workbook = None
+        self.sheet = None
+
+        spider.logger.info(f"Excel 文件已保存: {path} ({self.file_rows} 行)")
+        if self.stats is not None:
+            self.stats.inc_value("excel/files_saved")
+            self.stats.inc_value("excel/rows_written", self.file_rows)
+
+
+class ParquetPipeline:
+    """列式 Parquet 导出管道
+
+    数据项按列缓存在内存中，每满 PARQUET_BATCH_SIZE 条写出一个 Parquet 文件，内存占用有上限。
+    数据集按爬取日期分区（PARQUET_DIR/crawl_date=YYYY-MM-DD/part-*.parquet），
+    publish_date 为 NewsPipeline 清洗后的 ISO 日期，转换为日期类型；author 使用字典编码。
+
+    依赖 pyarrow，未安装时该管道自动停用。
+    """
+
+    def __init__(self, root="news_parquet", batch_size=10000, stats=None):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.root = root
+        self.batch_size = max(1, int(batch_size))
+        self.stats = stats
+        self.schema = pa.schema(
+            [
+                ("title", pa.string()),
+                ("publish_date", pa.date32()),
+                ("author", pa.dictionary(pa.int32(), pa.string())),
+                ("url", pa.string()),
+                ("created_at", pa.timestamp("s")),
+                ("html_saved_path", pa.string()),
+                ("crawl_date", pa.string()),
+            ]
+        )
+        self.columns = {name: [] for name in self.schema.names}
+        self.run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+        self.flushes = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise NotConfigured("ParquetPipeline 需要安装 pyarrow")
+        settings = crawler.settings
+        return cls(
+            root=settings.get("PARQUET_DIR", "news_parquet"),
+            batch_size=settings.getint("PARQUET_BATCH_SIZE", 10000),
+            stats=crawler.stats,
+        )
+
+    def close_spider(self, spider):
+        self.flush(spider)
+
+    @timed_stage
+    def process_item(self, item, spider):
+        """把数据项的字段追加到各列缓冲区"""
+        adapter = ItemAdapter(item)
+        created_at = self._to_datetime(adapter.get("created_at"))
+
+        columns = self.columns
+        columns["title"].append(adapter.get("title"))
+        columns["publish_date"].append(self._to_date(adapter.get("publish_date")))
+        columns["author"].append(adapter.get("author"))
+        columns["url"].append(adapter.get("url"))
+        columns["created_at"].append(created_at)
+        columns["html_saved_path"].append(adapter.get("html_saved_path"))
+        columns["crawl_date"].append((created_at or datetime.now()).strftime("%Y-%m-%d"))
+
+        if len(columns["url"]) >= self.batch_size:
+            self.flush(spider)
+        return item
+
+    def flush(self, spider):
+        """把缓冲区写成 Parquet 文件，每个分区一个文件"""
+        if not self.columns["url"]:
+            return
+        import pyarrow.parquet as pq
+
+        table = self.pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.columns = {name: [] for name in self.schema.names}
+        self.flushes += 1
+
+        pq.write_to_dataset(
+            table,
+            root_path=self.root,
+            partition_cols=["crawl_date"],
+            # 文件名带上进程号，多个分片进程写入同一目录时不会冲突
+            basename_template=f"part-{self.run_id}-{os.getpid()}-{self.flushes:05d}-{{i}}.parquet",
+        )
+        if self.stats is not None:
+            self.stats.inc_value("parquet/batches_written")
+            self.stats.inc_value("parquet/rows_written", table.num_rows)
+
+    @staticmethod
+    def _to_date(value):
+        """把 ISO 日期转换为 date，其他写法已由 NewsPipeline 的 date 规则统一，无法识别时返回 None"""
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _to_datetime(value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+
+
+class JsonLinesPipeline:
+    """流式 JSON Lines 导出管道
+
+    每个数据项序列化为一行 JSON，追加写入压缩文件，可以边抓取边被下游逐行读取，
+    不像单个 JSON 数组（scrapy crawl -o output.json）那样要读完整个文件才能解析，崩溃后也只丢最后一批。
+    1. 只导出 JSONL_FIELDS 中的字段（默认同 FEED_EXPORT_FIELDS），响应体和文档树不会被序列化
+    2. 序列化优先使用 orjson，未安装时退回标准库 json
+    3. 文件写满 JSONL_MAX_ITEMS 条或压缩后达到 JSONL_MAX_BYTES 字节时切换到新文件
+    4. 写入中的文件名带 .part 后缀，写完后才重命名为 news-<运行时间>-<进程号>-<序号>.jsonl.gz，
+       下游只读取不带 .part 的文件，不会读到写了一半的文件
+    """
+
+    COMPRESSIONS = {"gzip": ".gz", None: ""}
+    EXCLUDED_FIELDS = {"response", "body", "document"}
+
+    def __init__(
+        self,
+        root="news_jsonl",
+        fields=("title", "publish_date", "author", "url", "created_at", "html_saved_path"),
+        compression="gzip",
+        compression_level=3,
+        max_items=100000,
+        max_bytes=64 * 1024 * 1024,
+        buffer_bytes=256 * 1024,
+        stats=None,
+    ):
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(f"JSONL_COMPRESSION 必须是 'gzip' 或 None，而不是 {compression!r}")
+        excluded = self.EXCLUDED_FIELDS.intersection(fields)
+        if excluded:
+            raise ValueError(f"JSONL_FIELDS 不能包含 {', '.join(sorted(excluded))}")
+        self.root = root
+        self.fields = tuple(fields)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.max_items = max(1, int(max_items))
+        self.max_bytes = max(1, int(max_bytes))
+        self.buffer_bytes = max(1, int(buffer_bytes))
+        self.stats = stats
+        self.dumps = self._serializer()
+
+        self.run_id = datetime.now().strftime("%Y%m%d%H%M%S")
+        self.file_index = 0
+        # 当前文件：原始文件对象、（压缩时）压缩流、.part 路径和已写入的条数
+        self.raw = None
+        self.stream = None
+        self.part_path = None
+        self.file_items = 0
+        # 还没有写入文件的行
+        self.buffer = []
+        self.buffered = 0
+        self.saved_files = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        compression = settings.get("JSONL_COMPRESSION", "gzip")
+        # 命令行 -s JSONL_COMPRESSION=None 传入的是字符串
+        if not compression or compression == "None":
+            compression = None
+        return cls(
+            root=settings.get("JSONL_DIR", "news_jsonl"),
+            fields=settings.getlist("JSONL_FIELDS") or settings.getlist("FEED_EXPORT_FIELDS")
+            or ["title", "publish_date", "author", "url", "created_at", "html_saved_path"],
+            compression=compression,
+            compression_level=settings.getint("JSONL_COMPRESSION_LEVEL", 3),
+            max_items=settings.getint("JSONL_MAX_ITEMS", 100000),
+            max_bytes=settings.getint("JSONL_MAX_BYTES", 64 * 1024 * 1024),
+            stats=crawler.stats,
+        )
+
+    @staticmethod
+    def _serializer():
+        """返回把 dict 序列化为一行 UTF-8 字节（含换行符）的函数"""
+        try:
+            import orjson
+        except ImportError:
+            import json
+
+            return lambda row: (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        option = orjson.OPT_APPEND_NEWLINE
+        return lambda row: orjson.dumps(row, default=str, option=option)
+
+    def open_spider(self, spider):
+        os.makedirs(self.root, exist_ok=True)
+
+    def close_spider(self, spider):
+        self._close_file(spider)
+
+    @timed_stage
+    def process_item(self, item, spider):
+        """把数据项的导出字段序列化为一行，攒够 buffer_bytes 后写入文件"""
+        if hasattr(type(item), "__dataclass_fields__"):
+            # dataclass 数据项直接读属性，省去每次构造 ItemAdapter
+            row = {name: getattr(item, name, None) for name in self.fields}
+        else:
+            adapter = ItemAdapter(item)
+            row = {name: adapter.get(name) for name in self.fields}
+        line = self.dumps(row)
+        self.buffer.append(line)
+        self.buffered += len(line)
+        self.file_items += 1
+
+        if self.buffered >= self.buffer_bytes:
+            self._write_buffer()
+        if self.file_items >= self.max_items or (self.raw is not None and self.raw.tell() >= self.max_bytes):
+            self._close_file(spider)
+        return item
+
+    def _open_file(self):
+        import gzip
+
+        self.file_index += 1
+        self.part_path = os.path.join(self.root, f"{self._file_name()}.part")
+        self.raw = open(self.part_path, "wb")
+        if self.compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode="wb", compresslevel=self.compression_level, mtime=0)
+        else:
+            self.stream = self.raw
+
+    def _file_name(self):
+        # 文件名带上进程号，多个分片进程写入同一目录时不会冲突
+        return f"news-{self.run_id}-{os.getpid()}-{self.file_index:05d}.jsonl{self.COMPRESSIONS[self.compression]}"
+
+    def _write_buffer(self):
+        if not self.buffer:
+            return
+        if self.raw is None:
+            self._open_file()
+        self.stream.write(b"".join(self.buffer))
+        self.buffer = []
+        self.buffered = 0
+
+    def _close_file(self, spider):
+        """写完当前文件，重命名为正式文件名"""
+        self._write_buffer()
+        if self.raw is None:
+            return
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        size = self.raw.tell()
+        self.raw.close()
+        path = self.part_path[: -len(".part")]
+        os.replace(self.part_path, path)
+        self.saved_files.append(path)
+
+        spider.logger.info(f"JSON Lines 文件已保存: {path} ({self.file_items} 条, {size / 1024 / 1024:.1f} MB)")
+        if self.stats is not None:
+            self.stats.inc_value("jsonl/files_written")
+            self.stats.inc_value("jsonl/items_written", self.file_items)
+            self.stats.inc_value("jsonl/bytes_written", size)
+        self.raw = self.stream = self.part_path = None
+        self.file_items = 0
+
+
+class DedupPipeline:
+    """近似重复检测管道（见 newscraper/dedup.py）
+
+    排在 SearchIndexPipeline 和 HtmlSavePipeline 之前，重复的文章不再建索引、归档和入库。
+    正文指纹在工作池中计算，与指纹索引比较后按 DEDUP_ACTION 处理:
+    "drop" 丢弃数据项，"link" 保留数据项并在 canonical_url 中填写原文 URL。
+    两种方式都在 news_duplicates 表中记录 (URL, 原文 URL, 距离)。
+    新指纹和重复记录按 DEDUP_BATCH_SIZE / DEDUP_BATCH_MAX_AGE 成批写入数据库。
+    """
+
+    ACTIONS = ("drop", "link")
+
+    def __init__(
+        self,
+        db_path="news.db",
+        action="drop",
+        max_distance=3,
+        text_xpath="//p",
+        min_chars=50,
+        batch_size=200,
+        batch_max_age=5.0,
+        pool=None,
+        stats=None,
+    ):
+        if action not in self.ACTIONS:
+            raise ValueError(f"DEDUP_ACTION 必须是 {self.ACTIONS} 之一，而不是 {action!r}")
+        self.db_path = db_path
+        self.action = action
+        self.max_distance = max_distance
+        self.text_xpath = text_xpath
+        self.min_chars = min_chars
+        self.batch_size = max(1, int(batch_size))
+        self.batch_max_age = float(batch_max_age)
+        # 计算指纹的工作池，为 None 时在反应器线程内直接执行
+        self.pool = pool
+        self.stats = stats
+        self.store = None
+        self.buffer_started = None
+        self.flush_timer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            db_path=settings.get("DEDUP_DB_PATH") or settings.get("SQLITE_DB_PATH", "news.db"),
+            action=settings.get("DEDUP_ACTION", "drop"),
+            max_distance=settings.getint("DEDUP_MAX_DISTANCE", 3),
+            text_xpath=settings.get("DEDUP_TEXT_XPATH", "//p"),
+            min_chars=settings.getint("DEDUP_MIN_CHARS", 50),
+            batch_size=settings.getint("DEDUP_BATCH_SIZE", 200),
+            batch_max_age=settings.getfloat("DEDUP_BATCH_MAX_AGE", 5.0),
+            pool=WorkerPool.from_crawler(crawler),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        self.store = DedupStore(self.db_path, self.max_distance)
+        if self.stats is not None:
+            self.stats.set_value("dedup/fingerprints_loaded", len(self.store.index))
+            self.stats.set_value("dedup/load_ms", self.store.load_seconds * 1000)
+        self.flush_timer = start_flush_timer(self.flush_expired, self.batch_max_age)
+
+    def close_spider(self, spider):
+        stop_flush_timer(self.flush_timer)
+        self.store.close()
+
+    @timed_stage
+    async def process_item(self, item, spider):
+        """计算正文指纹并查找近似重复"""
+        adapter = ItemAdapter(item)
+        page = (adapter.get("document"), adapter.get("body"), adapter.get("encoding"))
+        if page[0] is None and page[1] is None:
+            return item
+
+        args = (*page, self.text_xpath, self.min_chars)
+        if self.pool is None:
+            fingerprint = fingerprint_page(*args)
+        else:
+            fingerprint = await self.pool.run("dedup", fingerprint_page, *args)
+        if fingerprint is None:
+            if self.stats is not None:
+                self.stats.inc_value("dedup/too_short")
+            return item
+
+        url = adapter.get("url")
+        canonical_url, distance, compared = self.store.check(url, fingerprint)
+        if self.stats is not None:
+            self.stats.inc_value("dedup/checked")
+            self.stats.inc_value("dedup/compared", compared)
+            self.stats.max_value("dedup/compared_max", compared)
+        if canonical_url is not None:
+            self.store.add_duplicate(url, canonical_url, distance)
+            if self.stats is not None:
+                self.stats.inc_value("dedup/duplicates")
+        self._maybe_flush()
+
+        if canonical_url is None:
+            return item
+        if self.action == "drop":
+            adapter["document"] = None
+            adapter["body"] = None
+            raise DropItem(f"近似重复: {url} 与 {canonical_url} 相差 {distance} 位")
+        adapter["canonical_url"] = canonical_url
+        return item
+
+    def _maybe_flush(self):
+        pending = self.store.pending_count()
+        if not pending:
+            return
+        if self.buffer_started is None:
+            self.buffer_started = time.monotonic()
+        if pending >= self.batch_size:
+            self._flush()
+        else:
+            self.flush_expired()
+
+    def flush_expired(self):
+        """缓冲的指纹和重复记录已等待超过 batch_max_age 秒时写入，由定时器调用"""
+        if self.buffer_started is not None and time.monotonic() - self.buffer_started >= self.batch_max_age:
+            self._flush()
+
+    def _flush(self):
+        self.store.flush()
+        self.buffer_started = None
+
+
+class SearchIndexPipeline:
+    """全文索引管道（见 newscraper/search.py）
+
+    需要排在 ReleasePagePipeline 之前，它会释放文档树和响应体。正文提取在工作池中执行，
+    写入与 SQLitePipeline 一样，满足 SEARCH_INDEX_BATCH_SIZE / SEARCH_INDEX_BATCH_MAX_AGE
+    之一或爬虫关闭时在一个事务中批量提交。已建过索引的 URL 不会重复写入。
+    """
+
+    def __init__(self, db_path="news.db", batch_size=200, batch_max_age=5.0, pool=None, stats=None):
+        self.db_path = db_path
+        self.batch_size = max(1, int(batch_size))
+        self.batch_max_age = float(batch_max_age)
+        # 执行正文提取的工作池，为 None 时在反应器线程内直接执行
+        self.pool = pool
+        self.stats = stats
+        self.index = None
+        self.buffer = []
+        self.buffer_started = None
+        self.flush_timer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            db_path=settings.get("SEARCH_INDEX_DB_PATH") or settings.get("SQLITE_DB_PATH", "news.db"),
+            batch_size=settings.getint("SEARCH_INDEX_BATCH_SIZE", 200),
+            batch_max_age=settings.getfloat("SEARCH_INDEX_BATCH_MAX_AGE", 5.0),
+            pool=WorkerPool.from_crawler(crawler),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        self.index = SearchIndex(self.db_path)
+        self.flush_timer = start_flush_timer(self.flush_expired, self.batch_max_age, spider)
+
+    def close_spider(self, spider):
+        stop_flush_timer(self.flush_timer)
+        self.flush(spider)
+        self.index.close()
+
+    @timed_stage
+    async def process_item(self, item, spider):
+        """提取正文纯文本并加入写入缓冲区"""
+        adapter = ItemAdapter(item)
+        page = (adapter.get("document"), adapter.get("body"), adapter.get("encoding"))
+        if page[0] is None and page[1] is None:
+            return item
+
+        if self.pool is None:
+            text = extract_text(*page)
+        else:
+            text = await self.pool.run("search_text", extract_text, *page)
+
+        if not self.buffer:
+            self.buffer_started = time.monotonic()
+        self.buffer.append((adapter.get("url"), normalize_title(adapter.get("title")), text))
+
+        if (
+            len(self.buffer) >= self.batch_size
+            or time.monotonic() - self.buffer_started >= self.batch_max_age
+        ):
+            self.flush(spider)
+
+        return item
+
+    def flush_expired(self, spider):
+        """缓冲区中最早的文章已等待超过 batch_max_age 秒时写入，由定时器调用"""
+        if self.buffer and time.monotonic() - self.buffer_started >= self.batch_max_age:
+            self.flush(spider)
+
+    def flush(self, spider):
+        """用一个事务把缓冲区中的文章全部写入索引，写入成功后才清空缓冲区"""
+        if not self.buffer:
+            return
+
+        start = time.perf_counter()
+        added = self.index.add_batch(self.buffer)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.buffer = []
+        self.buffer_started = None
+
+        if self.stats is not None:
+            self.stats.inc_value("search_index/flush_count")
+            self.stats.inc_value("search_index/docs_added", added)
+            self.stats.inc_value("search_index/flush_time_ms", elapsed_ms)
+            self.stats.max_value("search_index/flush_max_ms", elapsed_ms)
+
+
+
+class ReleasePagePipeline:
+    """释放数据项中的文档树和响应体
+
+    document / body 只有去重、全文索引和 HTML 归档用到。SinkPipelineManager 总是把这个管道
+    排在它们之后（见 newscraper/sinks.py），不论 SINKS 选了哪些输出目标，
+    后续管道和它们的写入缓冲区都只持有字段，不再持有整页的大对象。
+    """
+
     def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        adapter["document"] = None
+        adapter["body"] = None
+        return item
+
+def rewrite_html(doc, body, encoding, url):
+    """把相对路径转换为绝对路径，返回修改后的 HTML 文本
+
+    doc 为 parse_detail 已解析好的文档树时直接改写它，为 None 时才解析 body。
+    纯函数，不依赖管道状态，可以在工作线程或工作进程中执行。
+    """
+    if doc is None:
+        doc = parse_document(body, encoding)
+
+    # 一次遍历改写 img/a/link/script 以及 srcset、style 中的所有地址
+    LINK_REWRITER.rewrite(doc, url)
+
+    # 获取修改后的 HTML
+    return lxml.html.tostring(doc, encoding='unicode', method='html')
+
+
+def archive_html(doc, body, encoding, url, file_path):
+    """改写链接并写入文件，整个过程在工作池中执行"""
+    html_content = rewrite_html(doc, body, encoding, url)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+
+def archive_page(doc, body, encoding, url):
+    """改写链接并压缩，返回 (内容哈希, 压缩数据)，整个过程在工作池中执行"""
+    return compress_html(rewrite_html(doc, body, encoding, url))
+
+
+class HtmlSavePipeline:
+    """HTML 保存管道
+
+    HTML_STORAGE = "archive" 时写入按内容寻址的压缩归档（见 newscraper/archive.py），
+    html_saved_path 形如 "html_archive#<sha256>"；
+    HTML_STORAGE = "files" 时沿用每篇文章一个 html_files/<标题>.html 文件的方式。
+    """
+
+    def __init__(
+        self,
+        pool=None,
+        storage="archive",
+        output_dir=None,
+        max_segment_bytes=256 * 1024 * 1024,
+        stats=None,
+    ):
+        if storage not in ("archive", "files"):
+            raise ValueError(f"HTML_STORAGE 必须是 'archive' 或 'files'，而不是 {storage!r}")
+        self.storage = storage
+        # 保存目录
+        self.output_dir = output_dir or ("html_archive" if storage == "archive" else "html_files")
+        self.max_segment_bytes = max_segment_bytes
+        self.archive = None
+        # 执行解析与改写的工作池，为 None 时在反应器线程内直接执行
+        self.pool = pool
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            pool=WorkerPool.from_crawler(crawler),
+            storage=settings.get("HTML_STORAGE", "archive"),
+            output_dir=settings.get("HTML_OUTPUT_DIR"),
+            max_segment_bytes=settings.getint("HTML_ARCHIVE_SEGMENT_BYTES", 256 * 1024 * 1024),
+            stats=crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        if self.storage == "archive":
+            self.archive = HtmlArchive(self.output_dir, self.max_segment_bytes)
+        else:
+            os.makedirs(self.output_dir, exist_ok=True)
+
+    def close_spider(self, spider):
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+    async def _run(self, func, *args):
+        if self.pool is None:
+            return func(*args)
+        return await self.pool.run("html_save", func, *args)
+
+    @timed_stage
+    async def process_item(self, item, spider):
         """保存 HTML 并将相对路径转换为绝对路径"""
         adapter = ItemAdapter(item)
             
-        response = adapter["response"]
-        url = response.url
+        url = adapter["url"]
+        # 优先使用 parse_detail 解析好的文档树，没有时（工作进程模式）再解析原始响应体
+        page = (adapter["document"], adapter["body"], adapter["encoding"], url)
         
         try:
-            # 解析 HTML
-            doc = lxml.html.fromstring(response.text)
-            
-            # 转换 img 标签的 src
-            for img in doc.xpath('//img'):
-                src = img.get('src')
-                if src and not src.startswith(('http://', 'https://', '//')):
-                    img.set('src', urljoin(url, src))
-            
-            # 转换 a 标签的 href
-            for a in doc.xpath('//a'):
-                href = a.get('href')
-                if href and not href.startswith(('http://', 'https://', '//', '#', 'javascript:')):
-                    a.set('href', urljoin(url, href))
-            
-            # 转换 link 标签的 href
-            for link in doc.xpath('//link'):
-                href = link.get('href')
-                if href and not href.startswith(('http://', 'https://', '//')):
-                    link.set('href', urljoin(url, href))
-            
-            # 转换 script 标签的 src
-            for script in doc.xpath('//script'):
-                src = script.get('src')
-                if src and not src.startswith(('http://', 'https://', '//')):
-                    script.set('src', urljoin(url, src))
-            
-            # 获取修改后的 HTML
-            html_content = lxml.html.tostring(doc, encoding='unicode', method='html')
-            
-            # 生成文件名 (使用标题或 URL 中的一部分)
-            title = adapter.get('title', '')
-            if not title:
-                # 从 URL 创建文件名
-                title = url.split('/')[-1].split('.')[0]
-            
-            # 清理文件名中的非法字符
-            filename = re.sub(r'[\\/*?:"<>|]', "_", title)
-            filename = filename[:100]  # 限制文件名长度
-            
-            # 保存 HTML 文件
-            file_path = os.path.join(self.output_dir, f"{filename}.html")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            # 将保存路径添加到 item 中
-            adapter['html_saved_path'] = file_path
+            # 改写并保存 HTML，反应器在此期间继续下载
+            if self.archive is not None:
+                adapter['html_saved_path'] = await self._save_to_archive(adapter, page)
+            else:
+                adapter['html_saved_path'] = await self._save_to_file(adapter, page)
             
         except Exception as e:
             spider.logger.error(f"保存 HTML 时发生错误: {e}")
             
-        return item
\ No newline at end of file
+        return item
+
+    async def _save_to_archive(self, adapter, page):
+        url = page[-1]
+        digest, data = await self._run(archive_page, *page)
+        is_new = self.archive.put(url, digest, data, adapter.get('title'))
+
+        if self.stats is not None:
+            self.stats.inc_value("html_archive/pages")
+            if is_new:
+                self.stats.inc_value("html_archive/bytes_written", len(data))
+            else:
+                self.stats.inc_value("html_archive/duplicates")
+
+        return self.archive.location(digest)
+
+    async def _save_to_file(self, adapter, page):
+        url = page[-1]
+
+        # 生成文件名 (使用标题或 URL 中的一部分)
+        title = adapter.get('title', '')
+        if not title:
+            # 从 URL 创建文件名
+            title = url.split('/')[-1].split('.')[0]
+        
+        # 清理文件名中的非法字符
+        filename = re.sub(r'[\\/*?:"<>|]', "_", title)
+        filename = filename[:100]  # 限制文件名长度
+        
+        # 保存 HTML 文件
+        file_path = os.path.join(self.output_dir, f"{filename}.html")
+        await self._run(archive_html, *page, file_path)
+        return file_path
@@ -0,0 +1,247 @@
+"""
+多进程分片抓取
+
+单个 Scrapy 进程受 GIL 限制，解析和改写 HTML 时只能用满一个 CPU 核。
+这里把列表页按页码分成 N 片（第 i 个进程负责 page % N == i 的列表页），
+每片启动一个独立的 scrapy crawl 子进程，写入各自目录下的 news.db 和 html_archive，
+全部结束后按 URL 去重合并到主目录。
+
+各分片的近似重复检测只能看到本片的文章，合并时把各分片的指纹依次与主库的指纹索引比较，
+跨分片的转载记入主库的 news_duplicates 表；DEDUP_ACTION 为 "drop" 时这些文章不合并到 news 表和 HTML 归档。
+全文索引（SINKS 中有 search 时）不保存正文，无法从分片复制，合并归档后为主库中还没有建索引的页面补建。
+
+    python -m newscraper.runner --workers 4
+    python -m newscraper.runner --workers 4 --list-url http://127.0.0.1:8000/xwdt/zhxw/ -s LOG_LEVEL=INFO
+
+目录结构:
+    news.db, html_archive/       合并后的结果（news、dedup_fingerprints、news_duplicates、search_* 表），
+                                 也是下次增量抓取用来跳过已入库 URL 和已知转载的数据库
+    shards/shard-<i>/            第 i 片的工作目录（日志、分片数据库、Excel 等），合并后保留
+    news_parquet/                各分片直接写入同一目录，文件名带进程号，不需要合并
+"""
+
+import argparse
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from scrapy.utils.project import get_project_settings
+
+from newscraper.archive import HtmlArchive
+from newscraper.dedup import MASK64, DedupStore
+from newscraper.pipelines import SQLitePipeline
+from newscraper.search import index_archive
+from newscraper.sinks import item_pipelines
+
+NEWS_COLUMNS = "title, publish_date, author, url, created_at"
+
+
+def shard_command(shard, shards, list_url=None, settings=()):
+    """构造第 shard 片的 scrapy crawl 命令"""
+    cmd = [sys.executable, "-m", "scrapy", "crawl", "newsspider", "-a", f"shard={shard}", "-a", f"shards={shards}"]
+    if list_url:
+        cmd += ["-a", f"list_url={list_url}"]
+    for setting in settings:
+        cmd += ["-s", setting]
+    return cmd
+
+
+def crawl_settings(overrides=()):
+    """项目设置加上传给分片进程的 NAME=VALUE 设置"""
+    settings = get_project_settings()
+    for setting in overrides:
+        name, _, value = setting.partition("=")
+        settings.set(name, value, priority="cmdline")
+    return settings
+
+
+def _shard_rows(source, sql):
+    if not os.path.exists(source):
+        return []
+    conn = sqlite3.connect(source)
+    try:
+        return conn.execute(sql).fetchall()
+    except sqlite3.OperationalError:
+        # 分片没有启用近似重复检测，表不存在
+        return []
+    finally:
+        conn.close()
+
+
+def merge_dedup(target, sources, max_distance=3, flush_every=10000):
+    """把各分片的指纹合并到 target 的指纹索引，返回 (合并的指纹数, 新发现的跨分片重复篇数, target 中全部重复 URL)
+
+    分片内已判定的重复记录直接复制；各分片的指纹按分片顺序、入库顺序与 target 中已有的指纹比较，
+    与其他 URL 的指纹近似的记为重复（URL 相同的是重新抓取，只更新指纹）。
+    分片目录在多次运行之间保留，已经记为重复的 URL 不再比较。
+    """
+    store = DedupStore(target, max_distance)
+    merged = found = 0
+    try:
+        known = {url for (url,) in store.conn.execute("SELECT url FROM news_duplicates")}
+        for source in sources:
+            for url, canonical_url, distance in _shard_rows(
+                source, "SELECT url, canonical_url, distance FROM news_duplicates"
+            ):
+                store.add_duplicate(url, canonical_url, distance)
+            for url, value in _shard_rows(source, "SELECT url, simhash FROM dedup_fingerprints ORDER BY id"):
+                if url in known:
+                    continue
+                canonical_url, distance, _ = store.check(url, value & MASK64)
+                if canonical_url is not None:
+                    store.add_duplicate(url, canonical_url, distance)
+                    known.add(url)
+                    found += 1
+                merged += 1
+                if store.pending_count() >= flush_every:
+                    store.flush()
+        store.flush()
+        duplicates = {url for (url,) in store.conn.execute("SELECT url FROM news_duplicates")}
+    finally:
+        store.close()
+    return merged, found, duplicates
+
+
+def merge_databases(target, sources, exclude=()):
+    """把各分片的 news 表按 URL 去重合并到 target，exclude 中的 URL 不合并，返回新增行数"""
+    conn = sqlite3.connect(target)
+    conn.execute(SQLitePipeline.CREATE_SQL)
+    conn.execute("CREATE TEMP TABLE excluded (url TEXT PRIMARY KEY)")
+    conn.executemany("INSERT OR IGNORE INTO excluded (url) VALUES (?)", ((url,) for url in exclude))
+    before = conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+        conn.execute("ATTACH DATABASE ? AS shard", (source,))
+        try:
+            conn.execute(
+                f"INSERT OR IGNORE INTO news ({NEWS_COLUMNS}) "
+                f"SELECT {NEWS_COLUMNS} FROM shard.news WHERE url NOT IN (SELECT url FROM excluded) ORDER BY id"
+            )
+            conn.commit()
+        except sqlite3.OperationalError:
+            # 分片没有写入任何数据，表不存在
+            conn.rollback()
+        finally:
+            conn.execute("DETACH DATABASE shard")
+    after = conn.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+    conn.close()
+    return after - before
+
+
+def merge_archives(target, sources, exclude=()):
+    """把各分片的 HTML 归档合并到 target，相同内容只保存一份，exclude 中的 URL 不合并，返回 (页面数, 新内容数)"""
+    archive = HtmlArchive(target)
+    pages = new_blobs = 0
+    try:
+        for source in sources:
+            if not os.path.exists(os.path.join(source, "index.db")):
+                continue
+            shard_archive = HtmlArchive(source)
+            try:
+                for url, digest, data, title in shard_archive.raw_pages():
+                    if url in exclude:
+                        continue
+                    pages += 1
+                    new_blobs += archive.put(url, digest, data, title)
+            finally:
+                shard_archive.close()
+    finally:
+        archive.close()
+    return pages, new_blobs
+
+
+def run(workers, list_url=None, settings=(), output_dir=".", shards_dir="shards"):
+    """启动 workers 个分片进程并合并结果，返回统计信息字典"""
+    output_dir = os.path.abspath(output_dir)
+    shards_dir = os.path.join(output_dir, shards_dir)
+    db_path = os.path.join(output_dir, "news.db")
+    archive_dir = os.path.join(output_dir, "html_archive")
+
+    # 每个进程自己的工作池只分到一部分 CPU 核，避免超额订阅
+    pool_size = max(1, (os.cpu_count() or 1) // workers)
+    common = [
+        f"INCREMENTAL_DB_PATH={db_path}",
+        f"PARQUET_DIR={os.path.join(output_dir, 'news_parquet')}",
+        f"WORKER_POOL_SIZE={pool_size}",
+        *settings,
+    ]
+
+    env = dict(os.environ)
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [project_dir, env.get("PYTHONPATH")]))
+    env.setdefault("SCRAPY_SETTINGS_MODULE", "newscraper.settings")
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", env["SCRAPY_SETTINGS_MODULE"])
+    crawl = crawl_settings(settings)
+    pipelines = item_pipelines(crawl)
+
+    started = time.perf_counter()
+    processes = []
+    for shard in range(workers):
+        cwd = os.path.join(shards_dir, f"shard-{shard}")
+        os.makedirs(cwd, exist_ok=True)
+        log = open(os.path.join(cwd, "crawl.log"), "wb")
+        cmd = shard_command(shard, workers, list_url, common)
+        processes.append((shard, subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT), log))
+
+    failed = []
+    for shard, process, log in processes:
+        if process.wait() != 0:
+            failed.append(shard)
+        log.close()
+    crawl_seconds = time.perf_counter() - started
+
+    shard_dirs = [os.path.join(shards_dir, f"shard-{shard}") for shard in range(workers)]
+    merge_started = time.perf_counter()
+    shard_dbs = [os.path.join(d, "news.db") for d in shard_dirs]
+    fingerprints, found, duplicates = 0, 0, set()
+    if "newscraper.pipelines.DedupPipeline" in pipelines:
+        fingerprints, found, duplicates = merge_dedup(db_path, shard_dbs, crawl.getint("DEDUP_MAX_DISTANCE", 3))
+    # "link" 模式下重复文章本来就保留，只记录原文 URL
+    exclude = duplicates if crawl.get("DEDUP_ACTION", "drop") == "drop" else set()
+    rows = merge_databases(db_path, shard_dbs, exclude)
+    pages, new_blobs = merge_archives(archive_dir, [os.path.join(d, "html_archive") for d in shard_dirs], exclude)
+    indexed = 0
+    if "newscraper.pipelines.SearchIndexPipeline" in pipelines and os.path.exists(archive_dir):
+        indexed, _ = index_archive(archive_dir, db_path)
+    merge_seconds = time.perf_counter() - merge_started
+
+    return {
+        "workers": workers,
+        "failed_shards": failed,
+        "rows_merged": rows,
+        "fingerprints_merged": fingerprints,
+        "cross_shard_duplicates": found,
+        "pages_indexed": indexed,
+        "archive_pages": pages,
+        "archive_new_blobs": new_blobs,
+        "crawl_seconds": round(crawl_seconds, 3),
+        "merge_seconds": round(merge_seconds, 3),
+        "total_seconds": round(crawl_seconds + merge_seconds, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程分片抓取并合并结果")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="分片进程数，默认 CPU 核数")
+    parser.add_argument("--list-url", help="列表页地址，默认使用爬虫中的 list_url")
+    parser.add_argument("--output-dir", default=".", help="合并结果所在目录")
+    parser.add_argument("-s", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                        help="传给每个分片进程的 Scrapy 设置，可重复")
+    args = parser.parse_args()
+
+    result = run(max(1, args.workers), args.list_url, args.settings, args.output_dir)
+    print(f"分片进程: {result['workers']}，失败: {result['failed_shards'] or '无'}")
+    print(f"合并新增 {result['rows_merged']} 条记录，归档页面 {result['archive_pages']} 个"
+          f"（新内容 {result['archive_new_blobs']} 个）")
+    print(f"合并指纹 {result['fingerprints_merged']} 个，跨分片近似重复 {result['cross_shard_duplicates']} 篇，"
+          f"新建全文索引 {result['pages_indexed']} 篇")
+    print(f"抓取 {result['crawl_seconds']:.2f}s，合并 {result['merge_seconds']:.2f}s，"
+          f"总计 {result['total_seconds']:.2f}s")
+    return 1 if result["failed_shards"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+文章全文检索：news.db 中的 SQLite FTS5 索引
+
+SearchIndexPipeline（见 pipelines.py）在 HtmlSavePipeline 归档之前从文档树中提取正文纯文本，
+缓存到一批后在一个事务中追加写入索引，与 SQLitePipeline 的批量写入方式相同。
+已归档但还没有建索引的页面（例如打开索引之前抓取的）可以用命令行补建:
+
+    python -m newscraper.search index                     # 从 html_archive 增量补建 news.db 的索引
+    python -m newscraper.search query "光机所 合作" -n 10  # 按相关度返回前 10 篇文章
+
+表结构:
+    search_docs   已建索引的文章 (id, url, title)，url 唯一，重复抓取的文章不会重复建索引
+    search_fts    FTS5 全文索引，rowid 对应 search_docs.id；只保存倒排索引，不保存正文副本
+
+FTS5 的 unicode61 分词器把连续的汉字当作一个词，而中文不用空格分词，所以写入前把连续的汉字
+切分为重叠的二字词（"光机所" -> 光机 机所 所），查询时检索词转换为二字词短语，不需要分词词典，
+任意长度的检索词都能命中。与每个汉字一个词相比，词数相同，但常见汉字组成的检索词要读的倒排表短得多。
+单个汉字的检索词是前缀查询，要合并所有以它开头的二字词，在大索引上较慢。
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import lxml.etree
+
+from newscraper.archive import HtmlArchive
+from newscraper.extraction import parse_document
+
+# 连续的 CJK 统一汉字（含扩展 A）和兼容汉字
+_CJK_RUN = re.compile("[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_CJK_SPLIT = re.compile(f"({_CJK_RUN.pattern})")
+_SPACES = re.compile(r"\s+")
+_local = threading.local()
+
+
+def _text_xpath():
+    # lxml 的 XPath 对象不宜跨线程共享，每个线程编译一次
+    xpath = getattr(_local, "text_xpath", None)
+    if xpath is None:
+        xpath = _local.text_xpath = lxml.etree.XPath(
+            "//body//text()[not(ancestor::script or ancestor::style or ancestor::noscript)]"
+        )
+    return xpath
+
+
+def extract_text(doc, body=None, encoding=None):
+    """返回页面正文的纯文本，连续空白合并为一个空格
+
+    doc 为 None 时解析 body。只读取文档树，不修改它，之后仍可交给 HtmlSavePipeline 归档。
+    纯函数，可以在工作线程或工作进程中执行。
+    """
+    if doc is None:
+        doc = parse_document(body, encoding)
+    return _SPACES.sub(" ", " ".join(_text_xpath()(doc))).strip()
+
+
+def normalize_title(title):
+    return _SPACES.sub(" ", title or "").strip()
+
+
+def _bigrams(run):
+    """连续汉字切分为重叠的二字词，最后一个汉字再单独作为一个词："光机所" -> 光机 机所 所"""
+    return " ".join([run[i : i + 2] for i in range(len(run) - 1)] + [run[-1]])
+
+
+def segment(text):
+    """把连续的汉字切分为二字词，使 unicode61 分词器可以按词建索引"""
+    return _CJK_RUN.sub(lambda m: f" {_bigrams(m.group())} ", text) if text else ""
+
+
+def match_query(query):
+    """把用户输入的检索词转换为 FTS5 MATCH 表达式
+
+    以空白分隔的检索词之间为 AND。检索词中连续的汉字转换为二字词短语（"光机所" -> "光机 机所"），
+    单个汉字转换为前缀查询（"光"* 匹配所有以 "光" 开头的二字词和单独的 "光"），
+    其余部分（字母、数字）按原样作为短语。
+    """
+    parts = []
+    for term in query.split():
+        for piece in _CJK_SPLIT.split(term):
+            if not piece.strip():
+                continue
+            if not _CJK_RUN.fullmatch(piece):
+                parts.append('"' + piece.replace('"', '""') + '"')
+            elif len(piece) == 1:
+                parts.append(f'"{piece}"*')
+            else:
+                parts.append('"' + " ".join(piece[i : i + 2] for i in range(len(piece) - 1)) + '"')
+    return " ".join(parts)
+
+
+class SearchIndex:
+    """news.db 中的全文索引，写入按批提交"""
+
+    CREATE_SQL = [
+        """
+        CREATE TABLE IF NOT EXISTS search_docs (
+            id INTEGER PRIMARY KEY,
+            url TEXT UNIQUE,
+            title TEXT
+        )
+        """,
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(title, body, content='')",
+    ]
+
+    def __init__(self, db_path="news.db", journal_mode="WAL", synchronous="NORMAL"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        if journal_mode:
+            self.conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        if synchronous:
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
+        for sql in self.CREATE_SQL:
+            self.conn.execute(sql)
+        self.conn.commit()
+
+    def add_batch(self, docs):
+        """在一个事务中为 [(url, title, text)] 建索引，已建过索引的 URL 跳过，返回新增的篇数"""
+        cur = self.conn.cursor()
+        added = 0
+        try:
+            for url, title, text in docs:
+                cur.execute("INSERT OR IGNORE INTO search_docs (url, title) VALUES (?, ?)", (url, title))
+                if cur.rowcount:
+                    cur.execute(
+                        "INSERT INTO search_fts (rowid, title, body) VALUES (?, ?, ?)",
+                        (cur.lastrowid, segment(title), segment(text)),
+                    )
+                    added += 1
+            self.conn.commit()
+        except Exception:
+            # 回滚后整批都没有写入，调用方可以原样重试
+            self.conn.rollback()
+            raise
+        return added
+
+    def indexed_urls(self):
+        return {url for (url,) in self.conn.execute("SELECT url FROM search_docs")}
+
+    def optimize(self):
+        """把索引的各个段合并为一个，批量补建之后执行可以加快查询"""
+        self.conn.execute("INSERT INTO search_fts (search_fts) VALUES ('optimize')")
+        self.conn.commit()
+
+    def query(self, query, limit=10, max_candidates=2000):
+        """返回 [(url, 标题, 发布日期, 分数)]，发布日期来自 news 表，文章还没有写入 news 表时为 None
+
+        命中不超过 max_candidates 篇时按 bm25 相关度排序（标题的权重是正文的 10 倍），分数越大越相关。
+        FTS5 的 bm25 要统计每个短语在整个索引中命中的篇数，耗时与命中篇数成正比，
+        常见词在百万篇文章中几乎篇篇命中，这时 bm25 的区分度也很低，所以命中超过 max_candidates 篇时
+        改为标题命中的文章在前、各自按入库顺序从新到旧返回，分数为 None；两种方式的耗时都与文章总数无关。
+        max_candidates 为 0 表示总是按 bm25 排序。
+        """
+        expression = match_query(query)
+        if not expression:
+            return []
+
+        columns = f"d.url, d.title, {self._publish_date_column()}"
+        source = f"search_fts JOIN search_docs AS d ON d.id = search_fts.rowid {self._news_join()}"
+        if max_candidates and self.conn.execute(
+            "SELECT 1 FROM search_fts WHERE search_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (expression, max_candidates),
+        ).fetchone():
+            sql = (
+                f"SELECT {columns}, NULL FROM {source} WHERE search_fts MATCH ? "
+                "ORDER BY search_fts.rowid DESC LIMIT ?"
+            )
+            rows = self.conn.execute(sql, (f"{{title}} : ({expression})", limit)).fetchall()
+            if len(rows) < limit:
+                seen = {row[0] for row in rows}
+                for row in self.conn.execute(sql, (expression, limit)):
+                    if row[0] not in seen and len(rows) < limit:
+                        rows.append(row)
+            return rows
+
+        sql = (
+            f"SELECT {columns}, -bm25(search_fts, 10.0, 1.0) AS score FROM {source} "
+            "WHERE search_fts MATCH ? ORDER BY score DESC LIMIT ?"
+        )
+        return self.conn.execute(sql, (expression, limit)).fetchall()
+
+    def _has_news(self):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'news'"
+        ).fetchone() is not None
+
+    def _publish_date_column(self):
+        return "news.publish_date" if self._has_news() else "NULL"
+
+    def _news_join(self):
+        return "LEFT JOIN news ON news.url = d.url" if self._has_news() else ""
+
+    def close(self):
+        self.conn.close()
+
+
+def index_archive(archive_root="html_archive", db_path="news.db", batch_size=1000):
+    """为归档中还没有建索引的页面补建索引，返回 (新增篇数, 耗时秒数)"""
+    archive = HtmlArchive(archive_root)
+    index = SearchIndex(db_path)
+    start = time.perf_counter()
+    added = 0
+    try:
+        done = index.indexed_urls()
+        batch = []
+        for url, _, data, title in archive.raw_pages():
+            if url in done:
+                continue
+            text = extract_text(None, zlib.decompress(data), "utf-8")
+            batch.append((url, normalize_title(title), text))
+            if len(batch) >= batch_size:
+                added += index.add_batch(batch)
+                batch = []
+        added += index.add_batch(batch)
+        if added:
+            index.optimize()
+    finally:
+        index.close()
+        archive.close()
+    return added, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m newscraper.search", description="文章全文检索")
+    parser.add_argument("--db", default="news.db", help="数据库路径（默认 news.db）")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="为归档中还没有建索引的页面补建索引")
+    index_parser.add_argument("--archive", default="html_archive", help="HTML 归档目录（默认 html_archive）")
+    index_parser.add_argument("--batch-size", type=int, default=1000, help="每个事务写入的篇数")
+
+    query_parser = commands.add_parser("query", help="按相关度检索文章")
+    query_parser.add_argument("terms", nargs="+", help="检索词，多个检索词之间为 AND")
+    query_parser.add_argument("-n", "--limit", type=int, default=10, help="返回的篇数（默认 10）")
+    query_parser.add_argument(
+        "--candidates", type=int, default=2000, help="命中超过多少篇时改为按入库顺序从新到旧返回（默认 2000，0 表示总是按相关度排序）"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "index":
+        added, elapsed = index_archive(args.archive, args.db, args.batch_size)
+        print(f"{args.db}: 新增索引 {added} 篇，耗时 {elapsed:.2f}s")
+        return
+
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} 不存在")
+    index = SearchIndex(args.db)
+    try:
+        start = time.perf_counter()
+        rows = index.query(" ".join(args.terms), args.limit, args.candidates)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    finally:
+        index.close()
+    for rank, (url, title, publish_date, score) in enumerate(rows, 1):
+        score = "" if score is None else f"  ({score:.2f})"
+        print(f"{rank:>3}. {title}  {publish_date or ''}{score}\n     {url}")
+    print(f"{len(rows)} 条结果，{elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,110 @@ SPIDER_MODULES = ["newscraper.spiders"]
 NEWSPIDER_MODULE = "newscraper.spiders"
 
 ITEM_PIPELINES = {
+   'newscraper.pipelines.DedupPipeline': 3,       # 近似重复检测管道（需在全文索引和 HTML 保存管道之前）
    'newscraper.pipelines.NewsPipeline': 300,      # 数据清洗管道
-   'newscraper.pipelines.HtmlSavePipeline': 10,   # HTML保存管道
-   'newscraper.pipelines.ExcelPipeline': 500,     # Excel导出管道
-   'newscraper.pipelines.SQLitePipeline': 800,    # 数据库存储管道
 }
 
+# 输出目标，按次选择，例如 -s SINKS=sqlite,archive；可选值和对应的管道见 newscraper/sinks.py
+# search 全文索引，archive HTML 归档，excel Excel 导出，parquet Parquet 导出，jsonl JSON Lines 导出，sqlite 数据库存储
+SINKS = ["search", "archive", "excel", "parquet", "sqlite"]
+ITEM_PROCESSOR = "newscraper.sinks.SinkPipelineManager"
+
+# NewsPipeline 的字段清洗规则（可用规则见 newscraper/cleaning.py），publish_date 规范为 ISO 日期
+CLEANING_RULES = {
+    "title": ["whitespace"],
+    "publish_date": ["halfwidth", "whitespace", "date"],
+    "author": ["halfwidth", "whitespace"],
+}
+
+# SQLite 存储管道：批量写入与 PRAGMA 设置
+SQLITE_DB_PATH = "news.db"
+SQLITE_BATCH_SIZE = 100         # 缓冲区达到多少条时批量写入
+SQLITE_BATCH_MAX_AGE = 5.0      # 缓冲区最早数据等待的最长秒数，空闲时由定时器每隔一半时间检查一次
+SQLITE_JOURNAL_MODE = "WAL"     # 日志模式，设为 None 则保持 SQLite 默认
+SQLITE_SYNCHRONOUS = "NORMAL"   # 同步级别，设为 None 则保持 SQLite 默认
+
+# 近似重复检测管道：正文 SimHash 指纹与已入库文章比较，汉明距离不超过 DEDUP_MAX_DISTANCE 即为重复
+DEDUP_ACTION = "drop"        # "drop" 丢弃重复文章，"link" 保留并在 canonical_url 中记录原文 URL
+DEDUP_MAX_DISTANCE = 3       # 0~3，越大越容易判为重复
+DEDUP_TEXT_XPATH = "//p"     # 参与计算指纹的正文元素
+DEDUP_MIN_CHARS = 50         # 正文少于多少个字符时不做去重
+#DEDUP_DB_PATH = "news.db"   # 指纹和重复记录所在的数据库，默认同 SQLITE_DB_PATH
+DEDUP_BATCH_SIZE = 200
+DEDUP_BATCH_MAX_AGE = 5.0
+
+# 全文索引管道：正文写入 FTS5 索引，查询用 python -m newscraper.search query <检索词>
+#SEARCH_INDEX_DB_PATH = "news.db"   # 默认同 SQLITE_DB_PATH
+SEARCH_INDEX_BATCH_SIZE = 200      # 缓冲区达到多少篇时批量写入
+SEARCH_INDEX_BATCH_MAX_AGE = 5.0   # 缓冲区最早文章等待的最长秒数
+
+# 流式 Excel 导出管道
+EXCEL_FILE_NAME = "news.xlsx"
+EXCEL_MAX_ROWS_PER_SHEET = 1048575  # 单个工作表的最大数据行数（不含表头）
+EXCEL_ROWS_PER_FILE = 100000        # 每写满多少行保存一次并切换到新文件
+
+# Parquet 列式导出管道：按爬取日期分区
+PARQUET_DIR = "news_parquet"
+PARQUET_BATCH_SIZE = 10000      # 每缓存多少条写出一个 Parquet 文件
+
+# JSON Lines 导出管道（SINKS 中加上 jsonl 启用）：每行一条，gzip 压缩，写满后切换到新文件
+JSONL_DIR = "news_jsonl"
+JSONL_COMPRESSION = "gzip"          # "gzip"，设为 None 则不压缩
+JSONL_COMPRESSION_LEVEL = 3         # 1~9，越大文件越小、写入越慢
+JSONL_MAX_ITEMS = 100000            # 每个文件最多多少条
+JSONL_MAX_BYTES = 64 * 1024 * 1024  # 每个文件压缩后最多多少字节
+#JSONL_FIELDS = ["title", "url"]    # 导出的字段，默认同 FEED_EXPORT_FIELDS
+
+# CPU 密集型步骤（详情页提取、HTML 改写）的工作池
+WORKER_POOL_MODE = "thread"     # "thread"、"process" 或 "off"
+WORKER_POOL_SIZE = 0            # 0 表示使用 CPU 核数
+
+# HTML 保存方式："archive" 为按内容寻址的压缩归档，"files" 为每篇文章一个 HTML 文件
+HTML_STORAGE = "archive"
+#HTML_OUTPUT_DIR = "html_archive"              # 默认 archive 为 html_archive，files 为 html_files
+HTML_ARCHIVE_SEGMENT_BYTES = 256 * 1024 * 1024  # 单个段文件的最大字节数
+
+# 增量抓取：跳过 SQLITE_DB_PATH 中已入库的详情页
+INCREMENTAL_ENABLED = True
+#INCREMENTAL_DB_PATH = "news.db"   # 读取已入库 URL 的数据库，默认同 SQLITE_DB_PATH；分片抓取时指向合并后的主库
+
+# 可恢复的请求队列：待抓取、下载中和已完成的请求都保存在 <JOBDIR>/frontier.db，
+# 进程被中断后用相同的 JOBDIR 重新运行即可继续（未设置 JOBDIR 时使用临时文件）
+SCHEDULER = "newscraper.frontier.FrontierScheduler"
+#JOBDIR = "crawls/newsspider"
+
+# 自适应分页：逐页抓取列表页，连续若干页没有新文章时停止
+PAGINATION_ADAPTIVE = True
+PAGINATION_STOP_AFTER_EMPTY = 2    # 连续多少个列表页没有新文章后停止（上一次分页中途结束时本次不按此停止）
+PAGINATION_MAX_FAILED_PAGES = 3    # 连续多少个列表页下载失败后停止，失败的页跳过
+#PAGINATION_OLDEST_DATE = "2025-01-01"  # 早于该发布日期的文章不再抓取
+
+# 条件请求缓存：保存 ETag / Last-Modified，未修改的页面（304）不再解析
+CONDITIONAL_GET_ENABLED = True
+CONDITIONAL_GET_DB = "validators.db"
+
+# 各阶段延迟直方图（下载、回调、管道、端到端），关闭时写入 stats 和 JSON 报告
+LATENCY_STATS_ENABLED = True
+LATENCY_REPORT_PATH = "latency_report.json"
+
+# 内存水位背压：RSS 或管道中的数据项数超过高水位时暂停取新请求，都降到低水位以下后恢复（需要 psutil）
+BACKPRESSURE_ENABLED = True
+BACKPRESSURE_HIGH_RSS_MB = 1024     # 0 表示不按 RSS 暂停
+BACKPRESSURE_LOW_RSS_MB = 768
+BACKPRESSURE_HIGH_ITEMS = 1000      # 正在管道中处理的数据项数，0 表示不按数据项数暂停
+BACKPRESSURE_LOW_ITEMS = 500
+BACKPRESSURE_CHECK_INTERVAL = 0.5   # 采样间隔（秒）
+
+# 按域名自适应调整并发数（AIMD）：平均下载延迟超过目标或出错时减半，有余量时逐步加 1
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = 2.0   # 目标平均下载延迟（秒）
+ADAPTIVE_CONCURRENCY_START = 4              # 每个域名的初始并发数
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 16               # 超过 CONCURRENT_REQUESTS_PER_DOMAIN 或 CONCURRENT_REQUESTS 时按较小者截断
+ADAPTIVE_CONCURRENCY_WINDOW = 20            # 每多少个响应调整一次
+ADAPTIVE_CONCURRENCY_MAX_ERROR_RATE = 0.05  # 窗口内 429/5xx/下载异常的比例超过该值时减少并发
+ADAPTIVE_CONCURRENCY_DECREASE_FACTOR = 0.5
+
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
 #USER_AGENT = "newscraper (+http://www.yourdomain.com)"
 
@@ -26,14 +124,17 @@ ITEM_PIPELINES = {
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
+# 全局上限，需不小于 ADAPTIVE_CONCURRENCY_MAX，每个域名的实际并发由自适应并发控制决定
+CONCURRENT_REQUESTS = 32
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
+# 下载器槽的上限（默认 8），需不小于 ADAPTIVE_CONCURRENCY_MAX，否则超出的请求在槽队列中等待，
+# 等待时间不计入 download_latency，自适应并发控制看不到
+CONCURRENT_REQUESTS_PER_DOMAIN = 16
 #CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -50,21 +151,27 @@ ROBOTSTXT_OBEY = True
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
+SPIDER_MIDDLEWARES = {
 #    "newscraper.middlewares.NewscraperSpiderMiddleware": 543,
-#}
+    "newscraper.frontier.FrontierSpiderMiddleware": 940,
+    "newscraper.middlewares.LatencySpiderMiddleware": 950,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    "newscraper.middlewares.NewscraperDownloaderMiddleware": 543,
-#}
+    "newscraper.middlewares.ConditionalGetMiddleware": 560,
+    "newscraper.middlewares.AdaptiveConcurrencyMiddleware": 950,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
+EXTENSIONS = {
 #    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+    "newscraper.extensions.LatencyStats": 500,
+    "newscraper.extensions.MemoryBackpressure": 510,
+}
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -91,8 +198,11 @@ ROBOTSTXT_OBEY = True
 #HTTPCACHE_EXPIRATION_SECS = 0
 #HTTPCACHE_DIR = "httpcache"
 #HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# 单文件压缩缓存，支持录制后离线回放（加 -s HTTPCACHE_IGNORE_MISSING=True），用法见 newscraper/httpcache.py
+HTTPCACHE_STORAGE = "newscraper.httpcache.SingleFileCacheStorage"
 
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 FEED_EXPORT_ENCODING = "utf-8"
+# 导出文件只包含文章字段，不包含原始响应体
+FEED_EXPORT_FIELDS = ["title", "publish_date", "author", "url", "created_at", "html_saved_path"]
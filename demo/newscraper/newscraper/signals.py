@@ -0,0 +1,8 @@
+"""
+项目自定义的信号，用法与 scrapy.signals 相同:
+
+    crawler.signals.connect(handler, signal=newscraper.signals.items_stored)
+"""
+
+# SQLitePipeline 把缓冲区中的数据项提交到数据库之后发送，参数: count（本次写入的条数）
+items_stored = object()
@@ -0,0 +1,64 @@
+"""
+可按次选择的输出目标（sink）
+
+每个输出目标对应 pipelines.py 中的一个管道，由 SINKS 设置选择，不再全部写在 ITEM_PIPELINES 中:
+
+    scrapy crawl newsspider -s SINKS=sqlite,archive      # 只写数据库和 HTML 归档
+    scrapy crawl newsspider -s SINKS=                    # 不写任何输出（例如只测抓取速度）
+
+这些管道的重量级依赖（openpyxl、pyarrow 等）在管道构造时才导入，没有选中的输出目标
+不会导入它的依赖，也不会打开文件或数据库。清洗、去重等处理管道仍然写在 ITEM_PIPELINES 中，
+ITEM_PIPELINES 中显式写出的管道优先（包括设为 None 来禁用某个输出目标的管道）。
+
+不论选了哪些输出目标，都会加入 ReleasePagePipeline，在去重、全文索引和 HTML 归档之后
+释放数据项中的文档树和响应体，之后的输出目标和它们的写入缓冲区不再持有这些大对象。
+
+SinkPipelineManager 通过 ITEM_PROCESSOR 设置替换 Scrapy 默认的管道管理器，
+在构建管道列表时把选中的输出目标合并进去。
+"""
+
+from scrapy.pipelines import ItemPipelineManager
+from scrapy.utils.conf import build_component_list
+
+# {名称: (管道类路径, 顺序号)}，顺序号决定管道的先后，与原来 ITEM_PIPELINES 中的相同
+SINKS = {
+    "search": ("newscraper.pipelines.SearchIndexPipeline", 5),     # 全文索引（需在 HTML 归档之前）
+    "archive": ("newscraper.pipelines.HtmlSavePipeline", 10),      # HTML 归档
+    "excel": ("newscraper.pipelines.StreamingExcelPipeline", 500),  # Excel 导出（需要 openpyxl）
+    "parquet": ("newscraper.pipelines.ParquetPipeline", 700),      # Parquet 导出（需要 pyarrow）
+    "jsonl": ("newscraper.pipelines.JsonLinesPipeline", 750),      # 压缩的 JSON Lines 导出
+    "sqlite": ("newscraper.pipelines.SQLitePipeline", 800),        # 数据库存储
+}
+
+# 释放文档树和响应体的管道，排在用到它们的管道（去重 3、全文索引 5、HTML 归档 10）之后
+RELEASE_PIPELINE = ("newscraper.pipelines.ReleasePagePipeline", 20)
+
+
+def selected_sinks(settings):
+    """SINKS 设置中的输出目标名称，未知名称抛出 ValueError"""
+    names = [name.strip() for name in settings.getlist("SINKS", list(SINKS)) if name.strip()]
+    unknown = [name for name in names if name not in SINKS]
+    if unknown:
+        raise ValueError(f"未知的输出目标 {', '.join(unknown)}，可选: {', '.join(SINKS)}")
+    return names
+
+
+def item_pipelines(settings):
+    """ITEM_PIPELINES 与选中的输出目标合并后的 {管道类路径: 顺序号}，顺序号为 None 的管道已去掉"""
+    pipelines = settings.getwithbase("ITEM_PIPELINES")
+    for name in selected_sinks(settings):
+        path, order = SINKS[name]
+        if path not in pipelines:
+            pipelines.set(path, order)
+    path, order = RELEASE_PIPELINE
+    if path not in pipelines:
+        pipelines.set(path, order)
+    return {path: order for path, order in pipelines.items() if order is not None}
+
+
+class SinkPipelineManager(ItemPipelineManager):
+    """把 SINKS 选中的输出目标加入管道列表的管道管理器"""
+
+    @classmethod
+    def _get_mwlist_from_settings(cls, settings):
+        return build_component_list(item_pipelines(settings))
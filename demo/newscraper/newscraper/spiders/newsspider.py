@@ -1,51 +1,273 @@
 
 import scrapy
 from newscraper.items import NewsItem
-from urllib.parse import urljoin
+from scrapy.spidermiddlewares.httperror import HttpError
+from urllib.parse import urljoin, urlsplit
+import re
+import sqlite3
+
+from newscraper.extraction import FieldExtractor, extract_document
+from newscraper.urlindex import UrlIndex
+from newscraper.workers import WorkerPool
+
+# 详情页 URL 中的发布日期，如 202501/t20250123_7522301.html
+URL_DATE_RE = re.compile(r"/t(\d{8})_\d+\.html")
+
+# 自适应分页走到了列表末尾的停止原因；其他原因（出错、被过滤）或中途关闭说明有列表页没有处理
+COMPLETE_STOP_REASONS = ("no_links", "oldest_date", "no_new_links", "not_found")
+
+# 列表页不存在：已翻过最后一页
+NOT_FOUND_STATUSES = (404, 410)
 
 
 class newsspider(scrapy.Spider):
     name = "newsspider"
     allowed_domains = ["cas.cn"]
-    start_urls = ["http://www.ciomp.cas.cn/xwdt/zhxw/"] + [
-        f"http://www.ciomp.cas.cn/xwdt/zhxw/index_{i}.html" for i in range(1, 38)
-    ]
+    # 列表页：第 0 页为栏目首页，之后为 index_1.html、index_2.html ...
+    list_url = "http://www.ciomp.cas.cn/xwdt/zhxw/"
+    # 关闭自适应分页时一次性抓取的列表页数；自适应分页一直翻到没有文章链接或页面不存在为止
+    list_pages = 38
+
+    # 详情页字段选择器，爬虫创建时编译一次，对每个响应只解析一次文档树
+    fields = {
+        "title": "//title/text()",
+        "publish_date": '//tr[@align="right"]/td[@width="20%" and @class="hui12_sj2"]/text()',
+        "author": '//tr[@align="right"]/td[@align="center" and @width="22%"]/text()',
+    }
+
+    # 增量抓取：已入库的 URL 索引及本次下载的详情页统计，用于估算节省的流量和时间
+    known_urls = None
+    # 增量模式下上一次自适应分页是否完整结束；没有的话本次不因"没有新文章"而停止，见 parse
+    pagination_complete = True
+    detail_downloads = 0
+    detail_bytes = 0
+    detail_latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extractor = FieldExtractor(self.fields)
+        # 多进程分片抓取（见 newscraper/runner.py）：本进程只负责 page % shards == shard 的列表页
+        self.shard = int(getattr(self, "shard", 0))
+        self.shards = max(1, int(getattr(self, "shards", 1)))
+        self.list_pages = int(self.list_pages)
+        # 通过 -a list_url=... 指向其他站点（如本地测试站点）时，同时放行该域名
+        host = urlsplit(self.list_url).hostname
+        if host and not any(host == d or host.endswith("." + d) for d in self.allowed_domains):
+            self.allowed_domains = self.allowed_domains + [host]
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider.spider_opened, signal=scrapy.signals.spider_opened)
+        crawler.signals.connect(spider.request_dropped, signal=scrapy.signals.request_dropped)
+        return spider
+
+    def spider_opened(self, spider):
+        """读取分页设置；开启增量模式时，把 news.db 中已有的 URL 加载到紧凑索引"""
+        settings = self.crawler.settings
+        self.adaptive = settings.getbool("PAGINATION_ADAPTIVE", False)
+        self.stop_after_empty = max(1, settings.getint("PAGINATION_STOP_AFTER_EMPTY", 2))
+        self.max_failed_pages = max(1, settings.getint("PAGINATION_MAX_FAILED_PAGES", 3))
+        oldest = settings.get("PAGINATION_OLDEST_DATE")
+        self.oldest_date = oldest.replace("-", "") if oldest else None
+
+        if not settings.getbool("INCREMENTAL_ENABLED", False):
+            return
+        self.db_path = settings.get("INCREMENTAL_DB_PATH") or settings.get("SQLITE_DB_PATH", "news.db")
+        # 被 DedupPipeline 判定为近似重复的文章（news_duplicates 表）同样不再下载
+        self.known_urls = UrlIndex.from_sqlite(self.db_path, tables=("news", "news_duplicates"))
+        self.crawler.stats.set_value("incremental/known_urls", len(self.known_urls))
+        self.logger.info(f"增量模式：已加载 {len(self.known_urls)} 个已入库的 URL")
+
+        if self.adaptive:
+            # 先记为未完成，本次正常走到列表末尾后在 closed 中改为完成
+            self.pagination_complete = self._pagination_state(complete=False)
+            self.crawler.stats.set_value("pagination/previous_complete", self.pagination_complete)
+            if not self.pagination_complete:
+                self.logger.info("上一次分页没有完整结束，本次不因已入库的列表页而停止翻页")
+
+    def list_page_url(self, page):
+        return self.list_url if page == 0 else urljoin(self.list_url, f"index_{page}.html")
+
+    def list_page_request(self, page):
+        # 列表页优先于详情页调度，分页判断不必等详情页下载完。
+        # 列表页不带条件请求头：它返回 200 时校验值就已保存，而它链接的文章可能还没有入库，
+        # 下次运行得到 304 会让分页在第一页就停下；已入库的文章由增量模式跳过
+        return scrapy.Request(
+            self.list_page_url(page),
+            callback=self.parse,
+            errback=self.list_page_failed,
+            cb_kwargs={"page": page},
+            priority=1,
+            meta={"dont_conditional_get": True},
+        )
+
+    def _pagination_state(self, complete):
+        """读取本列表（和分片）上一次自适应分页是否完整结束，再把它改为 complete；没有记录时视为完成"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pagination_state ("
+                "list_url TEXT, shard INTEGER, shards INTEGER, complete INTEGER, "
+                "PRIMARY KEY (list_url, shard, shards))"
+            )
+            key = (self.list_url, self.shard, self.shards)
+            row = conn.execute(
+                "SELECT complete FROM pagination_state WHERE list_url = ? AND shard = ? AND shards = ?", key
+            ).fetchone()
+            conn.execute("INSERT OR REPLACE INTO pagination_state VALUES (?, ?, ?, ?)", (*key, int(complete)))
+            conn.commit()
+        finally:
+            conn.close()
+        return row is None or bool(row[0])
+
+    async def start(self):
+        # Scrapy 2.13+ 的入口，沿用 start_requests 的逻辑
+        for request in self.start_requests():
+            yield request
 
     def start_requests(self):
-        for url in self.start_urls:
-            yield scrapy.Request(url, callback=self.parse)
+        if self.adaptive:
+            # 自适应分页：从本分片的第一页开始逐页向后，由 parse 决定是否继续
+            self.empty_pages = 0
+            self.failed_pages = 0
+            yield self.list_page_request(self.shard)
+        else:
+            for page in range(self.shard, self.list_pages, self.shards):
+                yield scrapy.Request(
+                    self.list_page_url(page), callback=self.parse, meta={"dont_conditional_get": True}
+                )
 
-    def parse(self, response):
+    def parse(self, response, page=None):
         """解析新闻列表页"""
+        stats = self.crawler.stats
+        links = 0
+        new_links = 0
+        too_old = 0
+
         # 处理所有新闻条目
         for item in response.css("a.font06"):
             link = item.css("::attr(href)").get()
 
             # 如果 link 是完整的 URL，则直接使用，否则拼接为完整 URL
             if link:
+                links += 1
                 detail_url = (
                     link if link.startswith("http") else urljoin(response.url, link)
                 )
 
+                # 文章 URL 中带有发布日期（如 t20250123_7522301.html），早于截止日期的不再抓取
+                match = URL_DATE_RE.search(detail_url)
+                if self.oldest_date and match and match.group(1) < self.oldest_date:
+                    too_old += 1
+                    stats.inc_value("pagination/too_old")
+                    continue
+
+                # 增量模式下跳过已入库的文章，不发出请求
+                if self.known_urls is not None and detail_url in self.known_urls:
+                    stats.inc_value("incremental/skipped")
+                    continue
+
+                new_links += 1
                 yield scrapy.Request(detail_url, callback=self.parse_detail)
 
-    def parse_detail(self, response):
-        """解析每个新闻详情页，仅提取原始数据，不进行处理"""
-        # 创建NewsItem对象
-        news_item = NewsItem()
+        if page is None:
+            return
+
+        # 自适应分页：当前页还有新文章才继续，连续若干页没有新文章即停止。
+        # 上一次分页中途结束时，已入库的列表页后面可能还有没抓取的文章，这次一直翻到列表末尾
+        stats.inc_value("pagination/pages")
+        self.failed_pages = 0
+        self.empty_pages = 0 if new_links else self.empty_pages + 1
+
+        if not links:
+            reason = "no_links"
+        elif too_old == links:
+            reason = "oldest_date"
+        elif self.empty_pages >= self.stop_after_empty and self.pagination_complete:
+            reason = "no_new_links"
+        else:
+            yield self.list_page_request(page + self.shards)
+            return
+
+        self.stop_pagination(page, reason)
+
+    def list_page_failed(self, failure):
+        """列表页下载失败、被忽略或返回错误状态时决定是否继续翻页
+
+        404/410 说明已翻过最后一页；其他错误（RetryMiddleware 重试后仍失败的超时、5xx 等）
+        跳过这一页继续翻页，连续 PAGINATION_MAX_FAILED_PAGES 页失败时停止。
+        """
+        request = failure.request
+        page = request.cb_kwargs["page"]
+        stats = self.crawler.stats
+        if failure.check(HttpError) and failure.value.response.status in NOT_FOUND_STATUSES:
+            self.stop_pagination(page, "not_found")
+            return
 
-        # 提取原始数据，不做任何清洗处理
-        news_item["title"] = response.css("title::text").get()
-        news_item["publish_date"] = response.xpath(
-            '//tr[@align="right"]/td[@width="20%" and @class="hui12_sj2"]/text()'
-        ).get()
-        news_item["author"] = response.xpath(
-            '//tr[@align="right"]/td[@align="center" and @width="22%"]/text()'
-        ).get()
-        news_item["url"] = response.url
+        stats.inc_value("pagination/failed_pages")
+        self.failed_pages += 1
+        self.logger.warning(f"列表页 {request.url} 失败: {failure.getErrorMessage()}")
+        if self.failed_pages >= self.max_failed_pages:
+            self.stop_pagination(page, "list_page_error")
+            return
+        yield self.list_page_request(page + self.shards)
 
-        # 保存响应对象，以便在 pipeline 中使用
-        news_item["response"] = response
+    def request_dropped(self, request, spider):
+        """列表页被调度器过滤（例如用同一个 JOBDIR 恢复时已完成的页）时记下原因"""
+        if request.callback == self.parse and "page" in request.cb_kwargs:
+            self.crawler.stats.inc_value("pagination/filtered_pages")
+            if self.crawler.stats.get_value("pagination/stop_reason") is None:
+                self.crawler.stats.set_value("pagination/stop_reason", "list_page_filtered")
+
+    def stop_pagination(self, page, reason):
+        self.crawler.stats.set_value("pagination/stop_reason", reason)
+        self.logger.info(f"在第 {page} 页停止翻页: {reason}")
+
+    async def parse_detail(self, response):
+        """解析每个新闻详情页，仅提取原始数据，不进行处理
+
+        解析和选择器在工作池中执行，反应器线程可以继续处理其他下载。
+        解析得到的文档树随数据项交给 HtmlSavePipeline，不再重复解析；
+        工作进程模式下文档树无法传回，只保存原始响应体。
+        """
+        self.detail_downloads += 1
+        self.detail_bytes += len(response.body)
+        self.detail_latency += response.meta.get("download_latency", 0.0)
+
+        pool = WorkerPool.from_crawler(self.crawler)
+        keep_document = pool.mode != "process"
+        fields, document = await pool.run(
+            "parse_detail", extract_document, self.extractor, response.body, response.encoding, keep_document
+        )
+
+        # 创建NewsItem对象，只保存文档树或原始响应体，供 HtmlSavePipeline 使用，不持有整个响应对象
+        news_item = NewsItem(
+            url=response.url,
+            body=None if document is not None else response.body,
+            encoding=response.encoding,
+            document=document,
+            **fields,
+        )
 
         # 直接yield原始数据，让pipeline处理清洗和存储
-        yield news_item
\ No newline at end of file
+        yield news_item
+
+    def closed(self, reason):
+        """记录分页是否完整结束；按本次下载的详情页平均大小和延迟，估算增量模式节省的流量和时间"""
+        stats = self.crawler.stats
+        if (
+            self.known_urls is not None
+            and self.adaptive
+            and reason == "finished"
+            and stats.get_value("pagination/stop_reason") in COMPLETE_STOP_REASONS
+        ):
+            self._pagination_state(complete=True)
+
+        skipped = stats.get_value("incremental/skipped", 0)
+        if not skipped or not self.detail_downloads:
+            return
+        bytes_saved = skipped * self.detail_bytes // self.detail_downloads
+        seconds_saved = skipped * self.detail_latency / self.detail_downloads
+        stats.set_value("incremental/bytes_saved_estimate", bytes_saved)
+        stats.set_value("incremental/seconds_saved_estimate", round(seconds_saved, 3))
@@ -0,0 +1,57 @@
+"""
+紧凑的 URL 成员索引
+
+把已入库的 URL 哈希为 64 位整数，排序后存入 array('Q')，每个 URL 只占 8 字节，
+用二分查找判断是否存在。64 位哈希在百万级 URL 下的误判概率可以忽略。
+"""
+
+import hashlib
+import os
+import sqlite3
+from array import array
+from bisect import bisect_left
+
+
+def url_hash(url):
+    """把 URL 映射为 64 位无符号整数"""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class UrlIndex:
+    """只读的排序哈希数组，运行期间新增的 URL 放在一个小集合中"""
+
+    def __init__(self, urls=()):
+        self.hashes = array("Q", sorted({url_hash(url) for url in urls}))
+        self.added = set()
+
+    @classmethod
+    def from_sqlite(cls, db_path, tables=("news",), column="url"):
+        """从 SQLitePipeline 写入的数据库加载各表的 URL，数据库或表不存在时跳过"""
+        if not os.path.exists(db_path):
+            return cls()
+        conn = sqlite3.connect(db_path)
+        try:
+            urls = []
+            for table in tables:
+                try:
+                    rows = conn.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL")
+                    urls.extend(url for (url,) in rows)
+                except sqlite3.OperationalError:
+                    # 表还没有创建
+                    continue
+            return cls(urls)
+        finally:
+            conn.close()
+
+    def add(self, url):
+        self.added.add(url_hash(url))
+
+    def __contains__(self, url):
+        h = url_hash(url)
+        if h in self.added:
+            return True
+        i = bisect_left(self.hashes, h)
+        return i < len(self.hashes) and self.hashes[i] == h
+
+    def __len__(self):
+        return len(self.hashes) + len(self.added)
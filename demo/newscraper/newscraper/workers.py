@@ -0,0 +1,108 @@
+"""
+把 CPU 密集型的步骤（HTML 解析、链接改写、序列化、选择器提取）放到线程池或进程池中执行，
+避免阻塞 Twisted/asyncio 反应器线程，让下载在处理文档的同时继续进行。
+
+相关设置:
+    WORKER_POOL_MODE = "thread"   # "thread"、"process" 或 "off"（在反应器线程内直接执行）
+    WORKER_POOL_SIZE = 0          # 工作线程/进程数，0 表示使用 CPU 核数
+
+每个阶段的排队深度、等待时间和执行时间都会写入 stats，便于按核数调整池大小:
+    workers/<stage>/tasks            提交的任务数
+    workers/<stage>/queue_depth_max  同时在途（排队 + 执行中）的最大任务数
+    workers/<stage>/wait_ms_total    任务从提交到开始执行的累计等待时间
+    workers/<stage>/wait_ms_max      单个任务的最大等待时间
+    workers/<stage>/run_ms_total     任务在池中的累计执行时间
+"""
+
+import asyncio
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from scrapy import signals
+
+
+def _timed_call(submitted_at, func, args):
+    """在工作线程/进程中执行，返回 (结果, 等待秒数, 执行秒数)
+
+    Linux 下 time.monotonic 是系统级时钟，跨进程比较同样有效。
+    """
+    started_at = time.monotonic()
+    result = func(*args)
+    return result, started_at - submitted_at, time.monotonic() - started_at
+
+
+class WorkerPool:
+    """按爬虫共享的工作池，由 from_crawler 创建并缓存在 crawler 上"""
+
+    MODES = ("thread", "process", "off")
+
+    def __init__(self, mode="thread", size=0, stats=None):
+        if mode not in self.MODES:
+            raise ValueError(f"WORKER_POOL_MODE 必须是 {self.MODES} 之一，而不是 {mode!r}")
+        self.mode = mode
+        self.size = size or os.cpu_count() or 1
+        self.stats = stats
+        self.in_flight = defaultdict(int)
+
+        if mode == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="newscraper")
+        elif mode == "process":
+            self.executor = ProcessPoolExecutor(max_workers=self.size)
+        else:
+            self.executor = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        """同一个 crawler 只创建一个工作池，爬虫关闭时关闭它"""
+        pool = getattr(crawler, "_newscraper_worker_pool", None)
+        if pool is None:
+            settings = crawler.settings
+            pool = cls(
+                mode=settings.get("WORKER_POOL_MODE", "thread"),
+                size=settings.getint("WORKER_POOL_SIZE", 0),
+                stats=crawler.stats,
+            )
+            crawler._newscraper_worker_pool = pool
+            crawler.signals.connect(pool.shutdown, signal=signals.engine_stopped)
+        return pool
+
+    async def run(self, stage, func, *args):
+        """在工作池中执行 func(*args)，返回其结果
+
+        process 模式下 func 和参数必须可以被 pickle（模块级函数、bytes、str 等）。
+        """
+        if self.executor is None:
+            start = time.monotonic()
+            result = func(*args)
+            self._record(stage, 0.0, time.monotonic() - start)
+            return result
+
+        self.in_flight[stage] += 1
+        if self.stats is not None:
+            self.stats.inc_value(f"workers/{stage}/tasks")
+            self.stats.max_value(f"workers/{stage}/queue_depth_max", self.in_flight[stage])
+        try:
+            future = self.executor.submit(_timed_call, time.monotonic(), func, args)
+            result, waited, ran = await asyncio.wrap_future(future)
+        finally:
+            self.in_flight[stage] -= 1
+
+        self._record(stage, waited, ran)
+        return result
+
+    def _record(self, stage, waited, ran):
+        if self.stats is None:
+            return
+        if self.executor is None:
+            self.stats.inc_value(f"workers/{stage}/tasks")
+        waited_ms = waited * 1000
+        self.stats.inc_value(f"workers/{stage}/wait_ms_total", waited_ms)
+        self.stats.max_value(f"workers/{stage}/wait_ms_max", waited_ms)
+        self.stats.inc_value(f"workers/{stage}/run_ms_total", ran * 1000)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
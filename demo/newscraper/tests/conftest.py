@@ -0,0 +1,61 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+# 本地测试站点的文章数和每页文章数
+SITE_ARTICLES = 60
+SITE_PER_PAGE = 10
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def fixture_site():
+    """在子进程中启动 benchmarks/fixture_site.py，返回列表页 URL"""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.join(PROJECT_DIR, "benchmarks", "fixture_site.py"),
+            "--articles", str(SITE_ARTICLES),
+            "--per-page", str(SITE_PER_PAGE),
+            "--port", str(_free_port()),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # 站点启动后第一行输出列表页 URL
+        url = process.stdout.readline().strip()
+        if not url:
+            pytest.fail("测试站点启动失败")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture
+def crawl(fixture_site, tmp_path):
+    """在 tmp_path 中对测试站点运行一次 scrapy crawl，返回日志（含统计信息）"""
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR, SCRAPY_SETTINGS_MODULE="newscraper.settings")
+
+    def run(*settings):
+        args = [sys.executable, "-m", "scrapy", "crawl", "newsspider", "-a", f"list_url={fixture_site}"]
+        for setting in ("ROBOTSTXT_OBEY=False", "LOG_LEVEL=INFO", *settings):
+            args += ["-s", setting]
+        result = subprocess.run(args, cwd=tmp_path, env=env, capture_output=True, text=True, timeout=300)
+        assert result.returncode == 0, result.stderr[-2000:]
+        return result.stderr
+
+    return run
@@ -0,0 +1,58 @@
+import pytest
+
+from newscraper.cleaning import Cleaner, DateRule
+
+
+@pytest.mark.parametrize(
+    "value, expected, name",
+    [
+        ("2025-03-18", "2025-03-18", "iso"),
+        ("发布时间：2025-3-8 10:21", "2025-03-08", "iso"),
+        ("2025年03月18日", "2025-03-18", "cjk"),
+        ("2025 年 3 月 8 日", "2025-03-08", "cjk"),
+        ("2025/3/18", "2025-03-18", "slash"),
+        ("2025.03.18", "2025-03-18", "dot"),
+        ("20250318", "2025-03-18", "compact"),
+    ],
+)
+def test_date_formats(value, expected, name):
+    rule = DateRule()
+    assert rule(value) == expected
+    assert rule.detections == {name: 1}
+    assert rule.unparsed == 0
+
+
+@pytest.mark.parametrize("value", ["", "未知", "2025-13-40", "123456789"])
+def test_date_unparsed(value):
+    rule = DateRule()
+    assert rule(value) is None
+    assert not rule.detections
+    assert rule.unparsed == 1
+
+
+def test_date_detections_count_every_parsed_value():
+    rule = DateRule()
+    for value in ["2025-03-18", "2025-03-19", "2025/3/20", "2025/3/21", "2025-03-22"]:
+        rule(value)
+    assert rule.detections == {"iso": 3, "slash": 2}
+
+
+def test_date_cached_values_not_recounted():
+    rule = DateRule()
+    assert rule("2025.03.18") == rule("2025.03.18") == "2025-03-18"
+    assert rule("未知") is None and rule("未知") is None
+    assert rule.detections == {"dot": 1}
+    assert rule.unparsed == 1
+
+
+def test_cleaner_date_stats():
+    cleaner = Cleaner()
+    items = [
+        {"title": " 标题 ", "publish_date": "２０２５－０３－１８"},
+        {"title": "标题", "publish_date": "2025年3月19日"},
+        {"title": "标题", "publish_date": "无"},
+    ]
+    cleaner.clean_batch(items)
+    assert [item["publish_date"] for item in items] == ["2025-03-18", "2025-03-19", None]
+    assert items[0]["title"] == "标题"
+    assert cleaner.date_stats() == ({"iso": 1, "cjk": 1}, 1)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import lxml.html
+import pytest
+
+from conftest import PROJECT_DIR
+from newscraper.linkrewriter import LinkRewriter
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, "benchmarks"))
+from bench_link_rewrite import SRCSET_BASE, SRCSET_CASES, check_srcset  # noqa: E402
+
+BASE = "http://www.example.cn/a/b/page.html"
+
+
+def rewrite_srcset(value, base=BASE):
+    return LinkRewriter._rewrite_srcset(value, LinkRewriter()._resolver(base))
+
+
+def test_bench_srcset_cases():
+    assert check_srcset(LinkRewriter()) == []
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("", ""),
+        (" , ", " , "),
+        ("a.jpg", "http://www.example.cn/a/b/a.jpg"),
+        # 规范中 URL 是连续的非空白字符，中间的逗号不是分隔符
+        ("a.jpg,b.jpg 2x", "http://www.example.cn/a/b/a.jpg,b.jpg 2x"),
+        # 括号内的逗号不结束描述符
+        ("a.jpg foo(1,2), b.jpg 2x", "http://www.example.cn/a/b/a.jpg foo(1,2), http://www.example.cn/a/b/b.jpg 2x"),
+        ("#frag 1x, ?q=1 2x", "#frag 1x, http://www.example.cn/a/b/page.html?q=1 2x"),
+    ],
+)
+def test_srcset_edge_cases(value, expected):
+    assert rewrite_srcset(value) == expected
+
+
+def test_rewrite_document_with_srcset_and_base():
+    doc = lxml.html.fromstring(
+        '<html><head><base href="/img/"></head><body>'
+        '<img src="x.png" srcset="data:image/gif;base64,R0lG,OD 1x,\ty.png\n2x">'
+        "</body></html>"
+    )
+    LinkRewriter().rewrite(doc, SRCSET_BASE)
+    img = doc.find(".//img")
+    assert img.get("src") == "http://www.ciomp.cas.cn/img/x.png"
+    assert img.get("srcset") == "data:image/gif;base64,R0lG,OD 1x,\thttp://www.ciomp.cas.cn/img/y.png\n2x"
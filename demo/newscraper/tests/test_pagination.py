@@ -0,0 +1,118 @@
+import re
+import sqlite3
+
+import pytest
+from scrapy.http import HtmlResponse
+from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+
+from conftest import SITE_ARTICLES
+from newscraper.spiders.newsspider import newsspider
+from newscraper.urlindex import UrlIndex
+
+LIST_URL = "http://news.example/xwdt/zhxw/"
+
+
+def make_spider(**settings):
+    crawler = get_crawler(newsspider, {"PAGINATION_ADAPTIVE": True, **settings})
+    spider = newsspider.from_crawler(crawler, list_url=LIST_URL)
+    spider.spider_opened(spider)
+    list(spider.start_requests())
+    return spider
+
+
+def list_response(page, links):
+    request = make_spider().list_page_request(page)
+    body = "".join(f'<a class="font06" href="{link}">新闻</a>' for link in links)
+    return HtmlResponse(request.url, body=f"<html><body>{body}</body></html>", encoding="utf-8", request=request)
+
+
+def failure_for(request, exception):
+    failure = Failure(exception)
+    failure.request = request
+    return failure
+
+
+def stop_reason(spider):
+    return spider.crawler.stats.get_value("pagination/stop_reason")
+
+
+def test_list_pages_skip_conditional_get():
+    assert make_spider().list_page_request(0).meta["dont_conditional_get"]
+
+
+def test_not_found_list_page_ends_pagination():
+    spider = make_spider()
+    request = spider.list_page_request(3)
+    response = HtmlResponse(request.url, status=404, request=request)
+    assert list(spider.list_page_failed(failure_for(request, HttpError(response, "404")))) == []
+    assert stop_reason(spider) == "not_found"
+
+
+def test_failed_list_page_is_skipped_until_limit():
+    spider = make_spider(PAGINATION_MAX_FAILED_PAGES=2)
+    request = spider.list_page_request(1)
+    [next_request] = spider.list_page_failed(failure_for(request, TimeoutError()))
+    assert next_request.cb_kwargs == {"page": 2}
+    assert stop_reason(spider) is None
+
+    assert list(spider.list_page_failed(failure_for(next_request, TimeoutError()))) == []
+    assert stop_reason(spider) == "list_page_error"
+    assert spider.crawler.stats.get_value("pagination/failed_pages") == 2
+
+
+def test_known_pages_stop_only_after_complete_pagination():
+    links = [f"http://news.example/a/t20250101_{i}.html" for i in range(3)]
+    response = list_response(0, links)
+
+    spider = make_spider(PAGINATION_STOP_AFTER_EMPTY=1)
+    spider.known_urls = UrlIndex(links)
+    assert list(spider.parse(response, page=0)) == []
+    assert stop_reason(spider) == "no_new_links"
+
+    # 上一次分页中途结束：已入库的列表页后面还可能有没抓取的文章，继续翻页
+    spider = make_spider(PAGINATION_STOP_AFTER_EMPTY=1)
+    spider.known_urls = UrlIndex(links)
+    spider.pagination_complete = False
+    [next_request] = spider.parse(response, page=0)
+    assert next_request.cb_kwargs == {"page": 1}
+
+
+def test_pagination_state_round_trip(tmp_path):
+    spider = make_spider()
+    spider.db_path = str(tmp_path / "news.db")
+    # 没有记录时视为完成
+    assert spider._pagination_state(complete=False) is True
+    assert spider._pagination_state(complete=True) is False
+    assert spider._pagination_state(complete=True) is True
+    conn = sqlite3.connect(spider.db_path)
+    assert conn.execute("SELECT list_url, shard, shards, complete FROM pagination_state").fetchall() == [
+        (LIST_URL, 0, 1, 1)
+    ]
+
+
+def count_news(path):
+    return sqlite3.connect(path / "news.db").execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+
+def logged_stop_reason(log):
+    match = re.search(r"'pagination/stop_reason': '(\w+)'", log)
+    return match and match.group(1)
+
+
+@pytest.mark.parametrize("jobdir", [False, True], ids=["new_run", "jobdir_resume"])
+def test_interrupted_crawl_is_finished_by_next_run(crawl, tmp_path, jobdir):
+    """第一次运行中途关闭（校验值已保存、文章只入库了一部分），第二次运行要抓完剩下的文章"""
+    extra = ["JOBDIR=job"] if jobdir else []
+    crawl("CLOSESPIDER_ITEMCOUNT=5", *extra)
+    assert count_news(tmp_path) < SITE_ARTICLES
+
+    log = crawl(*extra)
+    assert "conditional_get/not_modified" not in log
+    assert logged_stop_reason(log) == "not_found"
+    assert count_news(tmp_path) == SITE_ARTICLES
+
+    if not jobdir:
+        # 分页已完整结束，之后的运行在已入库的列表页停止
+        assert logged_stop_reason(crawl()) == "no_new_links"